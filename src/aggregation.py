@@ -0,0 +1,270 @@
+"""Aggregate functions and the grouping of rows for GROUP BY.
+
+Every group of rows gets one accumulator per aggregate call of the query,
+which is fed the value of the call's argument for each row of the group
+and holds just what the result needs (a count, a running sum, the least
+value so far), so aggregating takes memory proportional to the number of
+groups rather than of rows.
+
+A Grouping collects the aggregate calls of a query while rewriting its
+result columns, HAVING and ORDER BY to read each call's result, and each
+GROUP BY key, from the group rows the operators.HashAggregate and
+operators.StreamAggregate operators produce."""
+from dataclasses import dataclass
+from typing import Any, Callable, Hashable, Optional, Sequence
+
+from baseexecuter import ExecutingException
+from ordering import sort_key
+from statements import ColumnAddress, Expression, children, map_expression
+from subexpressions import expression_key
+
+
+class Count:
+    """COUNT(x), the number of values that are not NULL. COUNT(*) is fed
+    the row itself, so that every row counts."""
+    __slots__ = ("count",)
+
+    def __init__(self):
+        self.count = 0
+
+    def add(self, value: Any):
+        if value is not None:
+            self.count += 1
+
+    def result(self) -> int:
+        return self.count
+
+
+class Sum:
+    """SUM(x): the sum of the values that are not NULL, an integer if they
+    all are, and NULL if there are none."""
+    __slots__ = ("total",)
+
+    def __init__(self):
+        self.total = None
+
+    def add(self, value: Any):
+        if value is not None:
+            value = _number(value)
+            self.total = value if self.total is None else self.total + value
+
+    def result(self) -> Any:
+        return self.total
+
+
+class Total:
+    """TOTAL(x): like SUM, but always a float, and 0.0 without values."""
+    __slots__ = ("total",)
+
+    def __init__(self):
+        self.total = 0.0
+
+    def add(self, value: Any):
+        if value is not None:
+            self.total += _number(value)
+
+    def result(self) -> float:
+        return self.total
+
+
+class Avg:
+    """AVG(x): the average of the values that are not NULL, as a float,
+    or NULL if there are none."""
+    __slots__ = ("total", "count")
+
+    def __init__(self):
+        self.total = 0.0
+        self.count = 0
+
+    def add(self, value: Any):
+        if value is not None:
+            self.total += _number(value)
+            self.count += 1
+
+    def result(self) -> Optional[float]:
+        return self.total / self.count if self.count else None
+
+
+class Min:
+    """MIN(x): the least value that is not NULL, as ORDER BY orders values
+    (see ordering.sort_key), or NULL if there is none."""
+    __slots__ = ("value", "key")
+
+    def __init__(self):
+        self.value = None
+        self.key = None
+
+    def add(self, value: Any):
+        if value is not None:
+            key = sort_key(value)
+            if self.key is None or key < self.key:
+                self.value, self.key = value, key
+
+    def result(self) -> Any:
+        return self.value
+
+
+class Max(Min):
+    """MAX(x): the greatest value that is not NULL, or NULL if there is
+    none."""
+    __slots__ = ()
+
+    def add(self, value: Any):
+        if value is not None:
+            key = sort_key(value)
+            if self.key is None or key > self.key:
+                self.value, self.key = value, key
+
+
+class AnyValue:
+    """The value of a column read outside of any aggregate call and not
+    grouped by, which SQLite takes from one row of the group: here the
+    last one."""
+    __slots__ = ("value",)
+
+    def __init__(self):
+        self.value = None
+
+    def add(self, value: Any):
+        self.value = value
+
+    def result(self) -> Any:
+        return self.value
+
+
+class Distinct:
+    """An aggregate over DISTINCT values: accumulator is only fed each
+    value the first time it is seen."""
+    __slots__ = ("accumulator", "seen")
+
+    def __init__(self, accumulator: Any):
+        self.accumulator = accumulator
+        self.seen: set = set()
+
+    def add(self, value: Any):
+        if value is not None and value not in self.seen:
+            self.seen.add(value)
+            self.accumulator.add(value)
+
+    def result(self) -> Any:
+        return self.accumulator.result()
+
+
+# The aggregate functions SQL can call, by name
+AGGREGATE_FUNCTIONS: dict[str, Callable[[], Any]] = {
+    "COUNT": Count,
+    "SUM": Sum,
+    "TOTAL": Total,
+    "AVG": Avg,
+    "MIN": Min,
+    "MAX": Max,
+}
+# Stands for the accumulator of a column read outside of any aggregate
+ANY_VALUE = "ANY_VALUE"
+
+
+def _number(value: Any) -> Any:
+    """value as a number for SUM, TOTAL and AVG: text and blobs count as
+    the number they spell, or 0, as in SQLite."""
+    if isinstance(value, (int, float)):
+        return value
+    if isinstance(value, bytes):
+        value = value.decode(errors="replace")
+    for convert in (int, float):
+        try:
+            return convert(value.strip())
+        except ValueError:
+            pass
+    return 0
+
+
+@dataclass
+class AggregateCall:
+    """An aggregate function applied to argument, None for COUNT(*)."""
+    function: str
+    argument: Optional[Expression]
+    distinct: bool = False
+
+    def accumulator(self) -> Any:
+        if self.function == ANY_VALUE:
+            return AnyValue()
+        accumulator = AGGREGATE_FUNCTIONS[self.function]()
+        return Distinct(accumulator) if self.distinct else accumulator
+
+
+def is_aggregate(expr: Expression) -> bool:
+    return expr.route == 7 and expr.unary_op in AGGREGATE_FUNCTIONS
+
+
+def contains_aggregate(expr: Expression) -> bool:
+    """True if expr calls an aggregate function anywhere."""
+    return is_aggregate(expr) or any(contains_aggregate(child) for child in children(expr))
+
+
+class Grouping:
+    """The groups of a query: rows are grouped by the values of keys, and
+    each group becomes one row holding those values followed by the result
+    of every aggregate call found by rewrite, its fields named by names.
+
+    Without keys, all rows form a single group, which exists even when
+    there are no rows at all."""
+
+    def __init__(self, keys: Sequence[Expression] = ()):
+        self.keys = list(keys)
+        self.calls: list[AggregateCall] = []
+        self._key_names = {expression_key(key): f"key{index}" for index, key in enumerate(self.keys)}
+        self._call_names: dict[Hashable, str] = {}
+
+    @property
+    def names(self) -> list[str]:
+        """The field names of the group rows: key0, key1, ... for the keys
+        and agg0, agg1, ... for the aggregate calls."""
+        return [f"key{index}" for index in range(len(self.keys))] + [
+            f"agg{index}" for index in range(len(self.calls))
+        ]
+
+    def accumulators(self) -> list[Any]:
+        """A fresh accumulator for each aggregate call, for a new group."""
+        return [call.accumulator() for call in self.calls]
+
+    def rewrite(self, expr: Expression) -> Expression:
+        """expr computed from a group row: with each GROUP BY key and
+        aggregate call in it replaced by a read of its field, and any
+        other column read replaced by the column's value in one row of the
+        group. The aggregate calls are added to calls as they are found."""
+        name = self._key_names.get(expression_key(expr))
+        if name is not None:
+            return _field(name)
+        if expr.route == 7:
+            return _field(self._call_name(_aggregate_call(expr)))
+        if expr.route == 3:
+            return _field(self._call_name(AggregateCall(ANY_VALUE, expr)))
+        return map_expression(expr, self.rewrite)
+
+    def _call_name(self, call: AggregateCall) -> str:
+        key = (call.function, expression_key(call.argument), call.distinct)
+        name = self._call_names.get(key)
+        if name is None:
+            name = self._call_names[key] = f"agg{len(self.calls)}"
+            self.calls.append(call)
+        return name
+
+
+def _aggregate_call(expr: Expression) -> AggregateCall:
+    function = expr.unary_op
+    if function not in AGGREGATE_FUNCTIONS:
+        raise ExecutingException(f"No such function: {function}")
+    arguments = expr.expr_array
+    if arguments is None:
+        if function != "COUNT":
+            raise ExecutingException(f"{function}(*) is not allowed, only COUNT(*)")
+        return AggregateCall(function, None)
+    if len(arguments) != 1:
+        raise ExecutingException(f"Wrong number of arguments to function {function}()")
+    if contains_aggregate(arguments[0]):
+        raise ExecutingException(f"Misuse of aggregate function {function}(): aggregates cannot be nested")
+    return AggregateCall(function, arguments[0], expr.binary_op == "DISTINCT")
+
+
+def _field(name: str) -> Expression:
+    return Expression(route=3, lead_expr=ColumnAddress(name))
@@ -0,0 +1,68 @@
+"""The only access to the internals of avltree's AvlTree.
+
+data.build_balanced_tree wires up the nodes of a tree directly and
+data.tree_items walks them, neither of which AvlTree supports through its
+public methods. Both rely on the layout of avltree 1.1, pinned in
+requirements.txt: the tree holds a dict of AvlTreeNode by key, in the
+name-mangled attribute __nodes, and the key of its root in __root_key;
+each node holds its value, the keys of its lesser and greater children
+and its height, 0 for a leaf.
+
+check_layout verifies that layout on a tree built through the public
+methods when this module is imported, so that a release of avltree laid
+out differently fails loudly here instead of corrupting every Column."""
+from typing import Any, Optional
+
+from avltree import AvlTree
+from avltree._avl_tree_node import AvlTreeNode
+
+
+def nodes(tree: AvlTree) -> dict[Any, AvlTreeNode]:
+    """The nodes of tree by key. Modifying the dict modifies the tree."""
+    return tree._AvlTree__nodes  # type: ignore[attr-defined]
+
+
+def root_key(tree: AvlTree) -> Optional[Any]:
+    """The key of the root of tree, None if it is empty."""
+    return tree._AvlTree__root_key  # type: ignore[attr-defined]
+
+
+def set_root_key(tree: AvlTree, key: Optional[Any]):
+    tree._AvlTree__root_key = key  # type: ignore[attr-defined]
+
+
+def new_node(value: Any, lesser_key: Optional[Any], greater_key: Optional[Any], height: int) -> AvlTreeNode:
+    """A node holding value, with children of the given keys."""
+    node = AvlTreeNode(value=value)
+    node.lesser_child_key = lesser_key
+    node.greater_child_key = greater_key
+    node.height = height
+    return node
+
+
+def check_layout():
+    """Raises ImportError unless a tree holding 1, 2 and 3, inserted in
+    that order, is laid out as this module expects: rotated so that 2 is
+    the root, a node of height 1 over the leaves 1 and 3."""
+    tree = AvlTree({1: "a", 2: "b", 3: "c"})
+    try:
+        tree_nodes = nodes(tree)
+        root = tree_nodes[root_key(tree)]
+        layout = (
+            type(tree_nodes) is dict,
+            sorted(tree_nodes),
+            root_key(tree),
+            root.value,
+            root.lesser_child_key,
+            root.greater_child_key,
+            root.height,
+            [tree_nodes[key].height for key in (1, 3)],
+            [tree_nodes[key].lesser_child_key for key in (1, 3)],
+        )
+    except (AttributeError, KeyError, TypeError) as error:
+        raise ImportError(f"Unsupported avltree node layout: {error!r}") from error
+    if layout != (True, [1, 2, 3], 2, "b", 1, 3, 1, [0, 0], [None, None]):
+        raise ImportError(f"Unsupported avltree node layout: {layout!r}")
+
+
+check_layout()
@@ -1,39 +1,117 @@
-from typing import Callable, List, Optional
+from typing import Callable, Iterator, List, Optional, Sequence, Union
 from sqltoken import Token, TokenType
 
 class ParsingException(Exception):
     pass
 
+class TokenCursor:
+    """A read position into an immutable sequence of tokens.
+
+    The cursor behaves like the list of tokens still left to parse:
+    len(), truthiness, iteration and indexing are all relative to the
+    current position, so cursor[0] is the next token. Consuming a token
+    only moves the position forward, which keeps it O(1) where popping
+    the head of a list would shift every remaining token.
+
+    Parsers that hand their cursor to a sub-parser share it, so the
+    sub-parser's progress is visible to the caller. mark() and reset()
+    allow backtracking to an earlier position."""
+
+    __slots__ = ("_tokens", "position")
+
+    def __init__(self, tokens: Sequence[Token], position: int = 0):
+        self._tokens = tuple(tokens)
+        self.position = position
+
+    def peek(self, offset: int = 0) -> Optional[Token]:
+        """Returns the token offset places ahead without consuming it,
+        or None if there is no such token."""
+        index = self.position + offset
+        if index < len(self._tokens):
+            return self._tokens[index]
+        return None
+
+    def advance(self) -> Token:
+        """Consumes and returns the next token."""
+        if self.position >= len(self._tokens):
+            raise ParsingException('no token to consume')
+        token = self._tokens[self.position]
+        self.position += 1
+        return token
+
+    def mark(self) -> int:
+        """Returns the current position, to be passed to reset()."""
+        return self.position
+
+    def reset(self, mark: int) -> None:
+        """Moves the cursor back to a position returned by mark()."""
+        self.position = mark
+
+    def since(self, mark: int) -> tuple[Token, ...]:
+        """The tokens consumed since a position returned by mark()."""
+        return self._tokens[mark:self.position]
+
+    def __len__(self) -> int:
+        return len(self._tokens) - self.position
+
+    def __bool__(self) -> bool:
+        return self.position < len(self._tokens)
+
+    def __getitem__(self, index: Union[int, slice]):
+        if isinstance(index, slice):
+            return self._tokens[self.position:][index]
+        if index < 0:
+            index += len(self)
+        if index < 0:
+            raise IndexError('token cursor index out of range')
+        return self._tokens[self.position + index]
+
+    def __iter__(self) -> Iterator[Token]:
+        for index in range(self.position, len(self._tokens)):
+            yield self._tokens[index]
+
+    def __repr__(self) -> str:
+        return f'TokenCursor({list(self)!r})'
+
+
 class BaseParser:
-    def __init__(self, tokens: List[Token]):
-        self.tokens = tokens
+    def __init__(self, tokens: Union[List[Token], TokenCursor]):
+        # Sub-parsers constructed from another parser's cursor share it
+        self.tokens = tokens if isinstance(tokens, TokenCursor) else TokenCursor(tokens)
 
     def typeMatches(self, tokenType: TokenType):
-        if not self.tokens:
+        token = self.tokens.peek()
+        if token is None:
             raise ParsingException('no token to match with')
-        return self.tokens[0].type == tokenType
-    
+        return token.type == tokenType
+
     def valueMatches(self, value: str):
-        if not self.tokens:
+        token = self.tokens.peek()
+        if token is None:
             raise ParsingException('no token to match with')
-        return self.tokens[0].value == value
+        return token.value == value
 
     def isValueOneOf(self, values: list[str]) -> bool:
-        if not self.tokens:
+        token = self.tokens.peek()
+        if token is None:
             raise ParsingException('no token to match with')
-        return self.tokens[0].value in values
+        return token.value in values
 
     def consume(self, type: TokenType, value: Optional[str] = None) -> Token:
-        if not self.tokens:
+        current_token = self.tokens.peek()
+        if current_token is None:
             raise ParsingException('no token to consume')
-        current_token = self.tokens[0]
-        if self.typeMatches(type):
-            if value is None:
-                return self.tokens.pop(0)
+        if current_token.type == type:
+            if value is None or current_token.value == value:
+                return self.tokens.advance()
             else:
-                if self.valueMatches(value):
-                    return self.tokens.pop(0)
-                else:
-                    raise ParsingException(f'unexpected token value {current_token.value} (expected {value})')
+                raise ParsingException(f'unexpected token value {current_token.value} (expected {value})')
         else:
             raise ParsingException(f'unexpected token type {current_token.type} (expected {type})')
+
+    def expectStatementEnd(self):
+        """Checks that the statement parsed so far is followed by nothing but
+        EOF, or a SEMICOLON separating it from the next statement. Neither
+        is consumed."""
+        if not (self.typeMatches(TokenType.EOF) or self.typeMatches(TokenType.SEMICOLON)):
+            raise ParsingException(f'unexpected token {self.tokens[0].value!r} after the end of the statement')
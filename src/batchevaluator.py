@@ -0,0 +1,194 @@
+from itertools import islice
+from operator import itemgetter
+from typing import Any, Iterable, Iterator, Mapping, Optional, Sequence, TypeAlias
+
+import numpyengine
+from baseexecuter import ExecutingException
+from constantfolding import fold_constants
+from data import Entry
+from expressioncompiler import IS_FUNCTIONS, constant_pattern, has_constant_pattern
+from patternmatching import match_pattern, value_matcher
+from statements import (
+    BETWEEN_FUNCTIONS,
+    BINARY_FUNCTIONS,
+    BINARY_OPERATIONS,
+    UNARY_FUNCTIONS,
+    BinaryOperator,
+    Expression,
+    children,
+)
+
+# Rows per batch when scans filter with evaluate_batch
+BATCH_SIZE = 1024
+# Converting to arrays has a fixed cost per batch, so NumPy gets larger ones
+NUMPY_BATCH_SIZE = 1 << 16
+
+# A batch result: the value for each row, and whether each value is NULL
+Batch: TypeAlias = tuple[list[Any], list[bool]]
+
+
+def evaluate_batch(expr: Expression, columns: Mapping[str, Sequence[Any]], n: int) -> Batch:
+    """Evaluates expr for n rows at once.
+
+    columns maps each column name the expression references to a vector
+    of its n values (a list, tuple or array slice). Returns the n results,
+    equal to what Expression.evaluate gives row by row, along with a mask
+    that is True where the result is NULL.
+
+    Each node of the expression is dispatched on once per batch instead
+    of once per row, and the work for a node runs as a single loop or
+    map over its operand vectors. Operands without NULLs skip the
+    NULL checks entirely."""
+    route = expr.route
+    if route == 1:
+        value = expr.lead_expr.value
+        return [value] * n, [value is None] * n
+    if route == 2:
+        raise ValueError(f"Attempted to evaluate unbound parameter {expr.lead_expr}")
+    if route == 3:
+        name = expr.lead_expr.column_name
+        if name not in columns:
+            raise ExecutingException(f"Expression references column {name} which does not exist")
+        values = list(columns[name])
+        return values, [value is None for value in values]
+    if route == 5:
+        values, nulls = evaluate_batch(expr.lead_expr, columns, n)
+        function = UNARY_FUNCTIONS[expr.unary_op]
+        if not any(nulls):
+            return list(map(function, values)), nulls
+        return [None if null else function(value) for value, null in zip(values, nulls)], nulls
+    if route == 6:
+        return _binary_batch(expr, columns, n)
+    if route == 8:
+        # Do not expect to evaluate across a sequence of expressions
+        return evaluate_batch(expr.expr_array[0], columns, n)
+    if route == 11:
+        return _pattern_batch(expr, columns, n)
+    if route == 12:
+        _, nulls = evaluate_batch(expr.lead_expr, columns, n)
+        if expr.unary_op == "ISNULL":
+            return list(nulls), [False] * n
+        return [not null for null in nulls], [False] * n
+    if route == 13:
+        if expr.binary_op not in IS_FUNCTIONS:
+            raise ValueError(f"Found expression from Route 13 with an invalid comparison operator '{expr.binary_op}'")
+        lead, _ = evaluate_batch(expr.lead_expr, columns, n)
+        second, _ = evaluate_batch(expr.second_expr, columns, n)
+        return list(map(IS_FUNCTIONS[expr.binary_op], lead, second)), [False] * n
+    if route == 14:
+        lead, _ = evaluate_batch(expr.lead_expr, columns, n)
+        low, _ = evaluate_batch(expr.second_expr, columns, n)
+        high, _ = evaluate_batch(expr.third_expr, columns, n)
+        values = list(map(BETWEEN_FUNCTIONS[expr.binary_op], lead, low, high))
+        return values, [value is None for value in values]
+    raise ValueError(f"Attempted to evaluate Expression on invalid route {route}")
+
+
+def _binary_batch(expr: Expression, columns: Mapping[str, Sequence[Any]], n: int) -> Batch:
+    if expr.binary_op in (BinaryOperator.AND, BinaryOperator.OR):
+        return _logical_batch(expr, columns, n)
+    lead, lead_nulls = evaluate_batch(expr.lead_expr, columns, n)
+    second, second_nulls = evaluate_batch(expr.second_expr, columns, n)
+    function = BINARY_FUNCTIONS[expr.binary_op]
+    if not (any(lead_nulls) or any(second_nulls)):
+        return list(map(function, lead, second)), [False] * n
+    nulls = [a or b for a, b in zip(lead_nulls, second_nulls)]
+    values = [None if null else function(a, b) for a, b, null in zip(lead, second, nulls)]
+    return values, nulls
+
+
+def _logical_batch(expr: Expression, columns: Mapping[str, Sequence[Any]], n: int) -> Batch:
+    """AND/OR, evaluating the second operand only for the rows the first
+    does not decide on its own, as Expression.evaluate does row by row."""
+    lead, lead_nulls = evaluate_batch(expr.lead_expr, columns, n)
+    # TRUE decides an OR on its own, FALSE an AND (see short_circuits)
+    decisive = expr.binary_op == BinaryOperator.OR
+    pending = [i for i, a in enumerate(lead) if a is not decisive]
+    if not pending:
+        return lead, lead_nulls
+    logical = BINARY_OPERATIONS[expr.binary_op]
+    if len(pending) == n:
+        second, _ = evaluate_batch(expr.second_expr, columns, n)
+        values = list(map(logical, lead, second))
+    else:
+        subset = {name: [vector[i] for i in pending] for name, vector in columns.items()}
+        second, _ = evaluate_batch(expr.second_expr, subset, len(pending))
+        values = list(lead)
+        for i, b in zip(pending, second):
+            values[i] = logical(lead[i], b)
+    return values, [value is None for value in values]
+
+
+def _pattern_batch(expr: Expression, columns: Mapping[str, Sequence[Any]], n: int) -> Batch:
+    lead, _ = evaluate_batch(expr.lead_expr, columns, n)
+    if has_constant_pattern(expr):
+        values = list(map(value_matcher(expr.binary_op, *constant_pattern(expr)), lead))
+    else:
+        patterns, _ = evaluate_batch(expr.second_expr, columns, n)
+        if expr.third_expr is None:
+            values = [match_pattern(expr.binary_op, a, b) for a, b in zip(lead, patterns)]
+        else:
+            escapes, _ = evaluate_batch(expr.third_expr, columns, n)
+            values = [
+                None if escape is None else match_pattern(expr.binary_op, a, b, escape)
+                for a, b, escape in zip(lead, patterns, escapes)
+            ]
+    return values, [value is None for value in values]
+
+
+def filter_entries(
+    entries: Iterable[Entry],
+    where: Expression,
+    column_names: Sequence[str],
+    batch_size: int = BATCH_SIZE,
+    column_types: Optional[Mapping[str, type]] = None,
+) -> Iterator[Entry]:
+    """Yields the entries for which where is true, evaluating it over
+    batch_size entries at a time. column_names are the names of the
+    fields of every entry, in order (Table.ordered_columns).
+
+    entries may be any iterable, such as a lazy scan: it is consumed one
+    batch at a time, and matches are yielded before the next is read.
+
+    Given the type of every column, filters over INTEGER and REAL columns
+    are evaluated with NumPy when it is installed (see numpyengine)."""
+    where = fold_constants(where)
+    # only the columns the filter reads are gathered into vectors
+    referenced = referenced_columns(where)
+    getters = {name: itemgetter(position) for position, name in enumerate(column_names) if name in referenced}
+    use_numpy = column_types is not None and numpyengine.supports(where, column_types)
+    if use_numpy:
+        batch_size = max(batch_size, NUMPY_BATCH_SIZE)
+    entries = iter(entries)
+    while chunk := list(islice(entries, batch_size)):
+        rows = [entry.row for entry in chunk]
+        columns = {name: list(map(getter, rows)) for name, getter in getters.items()}
+        if use_numpy:
+            try:
+                yield from _numpy_filter(where, chunk, columns, column_types)
+                continue
+            except numpyengine.Unsupported:
+                pass
+        values, _ = evaluate_batch(where, columns, len(chunk))
+        for entry, value in zip(chunk, values):
+            if value:
+                yield entry
+
+
+def _numpy_filter(
+    where: Expression, chunk: Sequence[Entry], columns: Mapping[str, list[Any]], column_types: Mapping[str, type]
+) -> list[Entry]:
+    arrays = {name: numpyengine.to_array(vector, column_types[name]) for name, vector in columns.items()}
+    values, nulls = numpyengine.evaluate(where, arrays, len(chunk))
+    matches = values.astype(bool) & ~nulls
+    return [chunk[index] for index in numpyengine.np.flatnonzero(matches).tolist()]
+
+
+def referenced_columns(expr: Expression) -> set[str]:
+    """Names of all columns referenced anywhere in expr."""
+    if expr.route == 3:
+        return {expr.lead_expr.column_name}
+    names = set()
+    for child in children(expr):
+        names |= referenced_columns(child)
+    return names
@@ -0,0 +1,94 @@
+from typing import Optional
+
+from statements import COMPARISON_OPERATORS, BinaryOperator, Expression, Literal, UnaryOperator, map_expression
+
+# Routes whose value is computed from their operands alone, so a node of
+# one of these routes with only literal operands can be evaluated once.
+FOLDABLE_ROUTES = (5, 6, 11, 12, 13, 14)
+
+
+def fold_constants(expr: Expression) -> Expression:
+    """Returns an equivalent Expression with constant work done up front.
+
+    Unary and binary operators (and LIKE, ISNULL, IS, BETWEEN) applied only to
+    literals are replaced by the literal they evaluate to, AND/OR with a
+    TRUE or FALSE operand are simplified, and parentheses around a single
+    expression are removed. Operations that fail on their constant
+    operands, such as division by zero, are left in place so the error
+    still happens if and when they are evaluated.
+
+    The input is never modified. Unchanged subtrees are shared with it
+    rather than copied, so folding a cached statement is safe."""
+    return _fold(expr, top_level=True)
+
+
+def _fold(expr: Expression, top_level: bool = False) -> Expression:
+    expr = map_expression(expr, _fold)
+
+    # A parenthesized single expression inside another expression is just
+    # that expression. At the top a route-8 list may be meaningful (e.g. the
+    # value list of a column-list assignment), so it is kept there.
+    if expr.route == 8 and not top_level and len(expr.expr_array) == 1:
+        return expr.expr_array[0]
+    if expr.route not in FOLDABLE_ROUTES:
+        return expr
+    if all(_is_literal(child) for child in _operands(expr)):
+        try:
+            value = expr.evaluate({})
+        except Exception:
+            return expr
+        return Expression(route=1, lead_expr=Literal(type(value), value))
+    if expr.route == 6 and expr.binary_op in (BinaryOperator.AND, BinaryOperator.OR):
+        return _simplify_logical(expr)
+    return expr
+
+
+def _simplify_logical(expr: Expression) -> Expression:
+    """Simplifies AND/OR with a constant boolean operand.
+
+    BinaryOperator.execute_op returns the other operand itself for
+    TRUE AND x and FALSE OR x, but x AND TRUE and x OR FALSE are only
+    equal to x when x is known to be boolean (5 AND TRUE is TRUE)."""
+    lead, second = expr.lead_expr, expr.second_expr
+    # TRUE decides an OR on its own, FALSE an AND
+    absorbing = expr.binary_op == BinaryOperator.OR
+    if _boolean_value(lead) == (not absorbing):
+        return second
+    if _boolean_value(lead) == absorbing:
+        return lead
+    if _boolean_value(second) == (not absorbing) and _is_boolean(lead):
+        return lead
+    if _boolean_value(second) == absorbing and _is_boolean(lead):
+        return second
+    return expr
+
+
+def _operands(expr: Expression) -> list[Expression]:
+    return [child for child in (expr.lead_expr, expr.second_expr, expr.third_expr) if child is not None]
+
+
+def _is_literal(expr: object) -> bool:
+    return isinstance(expr, Expression) and expr.route == 1
+
+
+def _boolean_value(expr: Expression) -> Optional[bool]:
+    """The value of a TRUE or FALSE literal, otherwise None."""
+    if _is_literal(expr) and expr.lead_expr.dtype is bool:
+        return expr.lead_expr.value
+    return None
+
+
+def _is_boolean(expr: Expression) -> bool:
+    """True if expr always evaluates to TRUE, FALSE or NULL."""
+    if expr.route == 1:
+        return expr.lead_expr.dtype in (bool, type(None))
+    if expr.route in (11, 12, 13, 14):
+        return True
+    if expr.route == 5:
+        return expr.unary_op == UnaryOperator.NOT
+    if expr.route == 6:
+        if expr.binary_op in COMPARISON_OPERATORS:
+            return True
+        if expr.binary_op in (BinaryOperator.AND, BinaryOperator.OR):
+            return _is_boolean(expr.lead_expr) and _is_boolean(expr.second_expr)
+    return False
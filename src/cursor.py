@@ -0,0 +1,52 @@
+from itertools import islice
+from typing import Any, Iterable, Iterator, Optional
+
+from baseexecuter import ExecutingException
+
+
+class Cursor:
+    """Result rows of a query, pulled from its operators on demand.
+
+    Rows are only computed as they are fetched, so a caller reading a
+    large result in pieces with fetchone or fetchmany (or by iterating
+    the cursor) holds a bounded number of rows at a time. columns are the
+    names of the result columns, in order."""
+
+    def __init__(self, rows: Iterable[Any], columns: list[str], arraysize: int = 1):
+        self.columns = columns
+        self.arraysize = arraysize
+        self._rows: Optional[Iterator[Any]] = iter(rows)
+
+    def _source(self) -> Iterator[Any]:
+        if self._rows is None:
+            raise ExecutingException("Cannot fetch from a closed cursor")
+        return self._rows
+
+    def fetchone(self) -> Optional[Any]:
+        """The next row, or None when there are no more."""
+        return next(self._source(), None)
+
+    def fetchmany(self, size: Optional[int] = None) -> list[Any]:
+        """Up to size (by default arraysize) more rows."""
+        size = self.arraysize if size is None else size
+        return list(islice(self._source(), max(size, 0)))
+
+    def fetchall(self) -> list[Any]:
+        """All remaining rows."""
+        return list(self._source())
+
+    def close(self):
+        """Stops the query; its remaining rows are never computed."""
+        self._rows = None
+
+    def __iter__(self) -> Iterator[Any]:
+        return self
+
+    def __next__(self) -> Any:
+        return next(self._source())
+
+    def __enter__(self) -> "Cursor":
+        return self
+
+    def __exit__(self, *exc_info) -> None:
+        self.close()
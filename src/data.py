@@ -1,7 +1,11 @@
-from typing import Any, Generic, ItemsView, Iterator, KeysView, Literal, Mapping, NamedTuple, Optional, TypeVar, ValuesView
+from typing import Any, Generic, ItemsView, Iterable, Iterator, KeysView, Literal, Mapping, NamedTuple, Optional, TypeVar, ValuesView
 from avltree import AvlTree
+from heapq import merge
+from operator import itemgetter
 import itertools
+from types import NoneType
 
+import avlnodes
 from baseexecuter import ExecutingException
 from statements import Expression, LiteralType, Literal as LitExpr
 from collections import namedtuple
@@ -14,18 +18,26 @@ class Entry(Mapping):
     contains a constructor for an Entry with the appropriate
     columns which are the same as the namedtuple's fields.
     Entry implements both indexing on the position of a field
-    and on the field's name."""
+    and on the field's name.
+
+    rowid identifies the Entry within its Table, which assigns it when
+    the Entry is inserted, and is None for Entries not stored in a Table
+    such as joined rows. Rows holding the same values are still told
+    apart by their rowids."""
     row: NamedTuple
+    rowid: Optional[int]
 
-    def __init__(self, row: NamedTuple):
+    def __init__(self, row: NamedTuple, rowid: Optional[int] = None):
         self.row = row
+        self.rowid = rowid
 
     def _replace(self, **kwargs: dict[str, Any]) -> "Entry":
         """Construct a new row using an existing Entry
         and a map of Entry fields to their new values
         to replace the existing values. The existing
-        Entry is not mutated and a new Entry is created."""
-        return Entry(row=self.row._replace(**kwargs))
+        Entry is not mutated and a new Entry is created,
+        with the same rowid."""
+        return Entry(row=self.row._replace(**kwargs), rowid=self.rowid)
 
     def __getitem__(self, key: int | str):
         """Implements indexing on both position indices
@@ -69,6 +81,106 @@ class Entry(Mapping):
 
 C = TypeVar("C", bound=LiteralType)
 
+
+class ColumnStatistics(NamedTuple):
+    """Summary of the values in a Column, for estimating how many rows a
+    filter on it will match. minimum and maximum are None for a Column
+    without any non-None values."""
+    rows: int
+    distinct: int
+    nulls: int
+    minimum: Any
+    maximum: Any
+
+
+# Column.extend rebuilds its tree once the batch brings at least one new
+# key per BULK_LOAD_RATIO keys already in the tree.
+BULK_LOAD_RATIO = 8
+
+# What Column.entries returns for a key without Entries
+_NO_ENTRIES: ValuesView[Entry] = {}.values()
+
+
+def build_balanced_tree(items: list[tuple[C, Any]]) -> AvlTree:
+    """Builds an AvlTree from (key, value) pairs sorted by strictly
+    increasing key in O(n), by wiring up the tree's nodes directly
+    instead of inserting and rebalancing one key at a time.
+
+    The subtree rooted at each middle item holds the items on either
+    side of it, so the result is balanced without any rotations. The
+    nodes are reached through avlnodes."""
+    tree: AvlTree = AvlTree()
+    nodes = avlnodes.nodes(tree)
+
+    def build(lo: int, hi: int) -> tuple[Optional[C], int]:
+        if lo >= hi:
+            return None, -1
+        mid = (lo + hi) // 2
+        key, value = items[mid]
+        lesser_key, lesser_height = build(lo, mid)
+        greater_key, greater_height = build(mid + 1, hi)
+        height = 1 + max(lesser_height, greater_height)
+        nodes[key] = avlnodes.new_node(value, lesser_key, greater_key, height)
+        return key, height
+
+    avlnodes.set_root_key(tree, build(0, len(items))[0])
+    return tree
+
+def tree_items(
+    tree: AvlTree,
+    start: Optional[C] = None,
+    stop: Optional[C] = None,
+    treatment: Literal["inclusive", "exclusive"] = "inclusive",
+    reverse: bool = False,
+) -> Iterator[tuple[C, Any]]:
+    """The (key, value) pairs of tree with keys between start and stop, as
+    AvlTree.between would find the keys, or from the greatest key down
+    when reverse is set.
+
+    The tree's nodes (see build_balanced_tree) are walked directly, with
+    an explicit stack of the keys still to visit. This is about twice as
+    fast as AvlTree.between, which can only iterate in ascending order and
+    leaves each value to be looked up by key."""
+    nodes = avlnodes.nodes(tree)
+    inclusive = treatment == "inclusive"
+    stack = []
+    key = avlnodes.root_key(tree)
+    if reverse:
+        # the path down to the greatest key within stop
+        while key is not None:
+            if stop is None or key < stop or (inclusive and key == stop):
+                stack.append(key)
+                key = nodes[key].greater_child_key
+            else:
+                key = nodes[key].lesser_child_key
+        while stack:
+            node = nodes[key := stack.pop()]
+            if start is not None and (key < start or (not inclusive and key == start)):
+                return
+            yield key, node.value
+            child = node.lesser_child_key
+            while child is not None:
+                stack.append(child)
+                child = nodes[child].greater_child_key
+    else:
+        # the path down to the least key within start
+        while key is not None:
+            if start is None or start < key or (inclusive and key == start):
+                stack.append(key)
+                key = nodes[key].lesser_child_key
+            else:
+                key = nodes[key].greater_child_key
+        while stack:
+            node = nodes[key := stack.pop()]
+            if stop is not None and (stop < key or (not inclusive and key == stop)):
+                return
+            yield key, node.value
+            child = node.greater_child_key
+            while child is not None:
+                stack.append(child)
+                child = nodes[child].lesser_child_key
+
+
 class Column(Generic[C]):
     """A column for a DB table containing data of some type C,
     where C is a LiteralType.
@@ -84,27 +196,78 @@ class Column(Generic[C]):
     will not appear in the between, minimum, or maximum methods
     but will appear when iterating over the class.
 
+    The Entries of each key are held in a dict by rowid, in the order
+    they were added, so one Entry is found and removed in time
+    logarithmic in the number of keys however many Entries share its
+    key.
+
     Altering the entries associated with a Column should not be
     done at the Column level. This should instead be managed by
     methods at the Table-level to ensure all Columns under a table
     contain references to the same set of rows."""
-    tree: AvlTree[C, list[Entry]]
-    none_entries: list[Entry]
+    tree: AvlTree[C, dict[int, Entry]]
+    none_entries: dict[int, Entry]
 
     def __init__(self, type: type[C], default: Optional[C] = None):
         self.type = type
         self.default: Optional[C] = default
         self.tree = AvlTree()
-        self.none_entries = []
+        self.none_entries = {}
+        # number of Entries in the Column, kept up to date by every method
+        # adding or removing Entries so it never has to be counted
+        self.rows = 0
 
     def append(self, key: C, entry: Entry):
         """Adds an Entry to the Column."""
+        self.rows += 1
         if key is None:
-            self.none_entries.append(entry)
+            self.none_entries[entry.rowid] = entry
             return
-        if key not in self.tree:
-            self.tree[key] = list()
-        self.tree[key].append(entry)
+        group = self.tree.get(key)
+        if group is None:
+            self.tree[key] = {entry.rowid: entry}
+        else:
+            group[entry.rowid] = entry
+
+    def extend(self, keys: Iterable[C], entries: Iterable[Entry]):
+        """Adds many Entries to the Column, keys[i] being the Column
+        value of entries[i].
+
+        Entries are grouped by key first so the binary tree is searched
+        once per distinct key rather than once per Entry."""
+        groups: dict[C, dict[int, Entry]] = {}
+        count = 0
+        for count, (key, entry) in enumerate(zip(keys, entries), 1):
+            if key is None:
+                self.none_entries[entry.rowid] = entry
+                continue
+            group = groups.get(key)
+            if group is None:
+                groups[key] = {entry.rowid: entry}
+            else:
+                group[entry.rowid] = entry
+        self.rows += count
+        if len(self.tree) == 0:
+            new_keys = list(groups)
+        else:
+            new_keys = []
+            for key, group in groups.items():
+                existing = self.tree.get(key)
+                if existing is None:
+                    new_keys.append(key)
+                else:
+                    existing.update(group)
+        if len(new_keys) * BULK_LOAD_RATIO < len(self.tree):
+            for key in new_keys:
+                self.tree[key] = groups[key]
+            return
+        # Many new keys: rebuilding the whole tree balanced is cheaper
+        # than rebalancing it after every single insertion.
+        new_keys.sort()
+        items = [(key, groups[key]) for key in new_keys]
+        if len(self.tree) > 0:
+            items = list(merge(self.tree.items(), items, key=itemgetter(0)))
+        self.tree = build_balanced_tree(items)
 
     def __iter__(self) -> Iterator[C]:
         if len(self.none_entries) > 0:
@@ -113,24 +276,59 @@ class Column(Generic[C]):
 
     def __getitem__(self, key: C) -> list[Entry]:
         if key is None:
-            return self.none_entries
-        return self.tree[key]
+            return list(self.none_entries.values())
+        return list(self.tree[key].values())
 
     def get(self, key: C) -> list[Entry]:
         """Safe method for retrieving all entries indexed by a given key.
 
         If a no entries are associated with a given key yet in the Column's
         binary tree, will return an empty list instead of raising a KeyError."""
-        if key is None:
-            return self.none_entries
-        return self.tree.get(key, list())
+        return list(self.entries(key))
+
+    def entries(self, key: C) -> ValuesView[Entry]:
+        """Like get, but a view of the Entries held by the Column rather
+        than a copy of them, for reading them without copying."""
+        group = self.none_entries if key is None else self.tree.get(key)
+        return _NO_ENTRIES if group is None else group.values()
 
     def __delitem__(self, key: C):
         if key is None:
-            self.none_entries = []
+            self.rows -= len(self.none_entries)
+            self.none_entries = {}
         else:
+            self.rows -= len(self.tree[key])
             del self.tree[key]
 
+    def remove(self, key: C, entry: Entry) -> bool:
+        """Removes the Entry with the rowid of entry, whose value in this
+        Column is key, returning False if it is not in the Column. A key
+        left without Entries is removed from the tree, so the tree only
+        holds keys in use."""
+        group = self.none_entries if key is None else self.tree.get(key)
+        if group is None or group.pop(entry.rowid, None) is None:
+            return False
+        self.rows -= 1
+        if not group and key is not None:
+            del self.tree[key]
+        return True
+
+    def replace(self, old_key: C, key: C, entry: Entry) -> bool:
+        """Replaces the Entry with the rowid of entry, whose value in this
+        Column is old_key, by entry, whose value is key, returning False
+        if there is no such Entry. The Entry keeps its place among those
+        of its key if the value did not change."""
+        if old_key != key:
+            if not self.remove(old_key, entry):
+                return False
+            self.append(key, entry)
+            return True
+        group = self.none_entries if key is None else self.tree.get(key)
+        if group is None or entry.rowid not in group:
+            return False
+        group[entry.rowid] = entry
+        return True
+
     def between(
         self,
         start: C = None,
@@ -139,12 +337,33 @@ class Column(Generic[C]):
     ) -> Iterator[C]:
         return self.tree.between(start, stop, treatment)
 
+    def items_between(
+        self,
+        start: C = None,
+        stop: C = None,
+        treatment: Literal["inclusive", "exclusive"] = "inclusive",
+        reverse: bool = False,
+    ) -> Iterator[tuple[C, ValuesView[Entry]]]:
+        """Like between, but yields each key with its Entries, from the
+        greatest key down when reverse is set (see tree_items)."""
+        for key, group in tree_items(self.tree, start, stop, treatment, reverse):
+            yield key, group.values()
+
     def minimum(self) -> C:
         return self.tree.minimum()
 
     def maximum(self) -> C:
         return self.tree.maximum()
 
+    def statistics(self) -> ColumnStatistics:
+        """Current ColumnStatistics of the Column. Only the minimum and
+        maximum are searched for, in time logarithmic in the number of
+        distinct keys; the counts are kept up to date as Entries change."""
+        nulls = len(self.none_entries)
+        if len(self.tree) == 0:
+            return ColumnStatistics(self.rows, 0, nulls, None, None)
+        return ColumnStatistics(self.rows, len(self.tree), nulls, self.minimum(), self.maximum())
+
 
 class Table:
     """Dict-like class aggregating a set of columns.
@@ -155,15 +374,21 @@ class Table:
     new entries should be created by submitting data to
     Table's add_entry method which will add a reference
     to the entry to every Column in the table, handle
-    data type validation, and apply Column defaults."""
+    data type validation, and apply Column defaults.
+
+    Every Entry added is given the next rowid, and entries
+    maps each rowid to its Entry. Rowids are never reused."""
     tbl: dict[str, Column]
     ordered_columns: list[str]
     entry_type: type
+    entries: dict[int, Entry]
 
     def __init__(self, column_list: list[str], map: Optional[dict[str, Column]] = None):
         self.tbl = {} if map is None else map
         self.ordered_columns = column_list
         self.entry_type = namedtuple("Entry", column_list)
+        self.entries = {}
+        self.next_rowid = 1
 
     def __setitem__(self, key: str, value: Column):
         self.tbl[key] = value
@@ -217,28 +442,85 @@ class Table:
         entry = self.create_entry(entry_data)
         self.insert_entry(entry)
 
+    def add_rows(self, column_data: dict[str, list[LiteralType]]) -> list[Entry]:
+        """Bulk counterpart of add_row, taking one vector of raw values
+        per column, all of the same length.
+
+        The column set is validated and each vector is type checked once
+        for the whole batch, columns missing from column_data get their
+        defaults, and every Column index is extended in a single pass.
+        Nothing is inserted if any value fails validation. Returns the
+        new Entries."""
+        if len(set(column_data.keys()) - set(self.ordered_columns)) != 0:
+            raise ExecutingException(
+                f"Columns {list(set(column_data.keys()) - set(self.ordered_columns))} included in INSERT statement but do not exist in Table."
+            )
+        lengths = {len(vector) for vector in column_data.values()}
+        if len(lengths) > 1:
+            raise ExecutingException(f"Column vectors of different lengths {sorted(lengths)} passed to add_rows")
+        n = lengths.pop() if lengths else 0
+        vectors = []
+        for col in self.ordered_columns:
+            column = self[col]
+            if col not in column_data:
+                vectors.append([column.default] * n)
+                continue
+            vector = column_data[col]
+            # one pass over the distinct types rather than a check per value
+            for value_type in set(map(type, vector)):
+                if value_type is not NoneType and not issubclass(value_type, column.type):
+                    value = next(v for v in vector if type(v) is value_type)
+                    raise ExecutingException(
+                        f"Attempted to add value of type {value_type}: value {value} to column expecting type {column.type}"
+                    )
+            vectors.append(vector)
+        rowids = range(self.next_rowid, self.next_rowid + n)
+        self.next_rowid += n
+        entries = list(map(Entry, map(self.entry_type, *vectors), rowids))
+        self.entries.update(zip(rowids, entries))
+        for col, vector in zip(self.ordered_columns, vectors):
+            self[col].extend(vector, entries)
+        return entries
+
     def insert_entry(self, entry: Entry):
+        """Adds entry to every Column, giving it the next rowid."""
+        entry.rowid = self.next_rowid
+        self.next_rowid += 1
+        self.entries[entry.rowid] = entry
         for name, col in self.tbl.items():
             col.append(entry[name], entry)
 
-    # TODO: Need to add test
-    def delete_entry(self, entry: Entry):
+    def delete_entry(self, entry: Entry) -> bool:
+        """Removes the Entry with the rowid of entry from the Table,
+        returning False if there is none. Each Column finds it by its
+        value in the Column and its rowid, in logarithmic time."""
+        old = self.entries.pop(entry.rowid, None)
+        if old is None:
+            return False
         for c in self.ordered_columns:
-            column = self[c]
-            entries = column.get(entry[c])
-            idx = safe_index_entries(entries, entry)
-            if (len(entries) == 0) or (idx < 0):
-                continue
-            entries.pop(idx)
-
-    # TODO: Need to add test
-    def update_entry(self, old: Entry, new: Entry):
-        self.delete_entry(old)
-        self.insert_entry(new)
+            self[c].remove(old[c], old)
+        return True
+
+    def update_entry(self, old: Entry, new: Entry) -> bool:
+        """Replaces the Entry with the rowid of old by new, which takes
+        that rowid, returning False if there is none. Only the Columns
+        whose value changed move the Entry to another key."""
+        stored = self.entries.get(old.rowid)
+        if stored is None:
+            return False
+        new.rowid = stored.rowid
+        self.entries[new.rowid] = new
+        for name, col in self.tbl.items():
+            col.replace(stored[name], new[name], new)
+        return True
 
     def keys(self):
         return self.tbl.keys()
 
+    def row_count(self) -> int:
+        """Number of Entries in the Table, without counting them."""
+        return len(self.entries)
+
     def get_rows(self) -> list[Entry]:
         """Returns all Entries stored within the given table.
 
@@ -246,18 +528,12 @@ class Table:
         entries to retrieve the list of entries from the first column."""
         first_col = self[self.ordered_columns[0]]
         entries = []
-        for key in first_col:
-            entries.extend(first_col[key])
+        for _, group in first_col.items_between():
+            entries.extend(group)
+        entries.extend(first_col.none_entries.values())
         return entries
 
 
-
-def safe_index_entries(lst: list[Entry], entry: Entry) -> int:
-    try:
-        return lst.index(entry)
-    except ValueError:
-        return -1
-
 Schema = dict[str, Table]
 
 
@@ -0,0 +1,28 @@
+from typing import Any
+
+from baseexecuter import ExecutingException
+from data import Database
+from planner import PlanNode
+from selectexecuter import SelectExecuter
+from statements import ExplainStatement, SelectStatement, UpdateStatement
+from updateexecutor import UpdateExecutor
+
+# Executors of the statements that can be explained, each with a plan
+# method returning the PlanNode tree it would follow
+PLANNERS = {
+    SelectStatement: SelectExecuter,
+    UpdateStatement: UpdateExecutor,
+}
+
+
+class ExplainExecutor:
+    def execute(self, db: Database, input: ExplainStatement) -> list[dict[str, Any]]:
+        """The plan chosen for the statement, without running it, as one
+        row per step (see PlanNode.flatten)."""
+        return self.plan(db, input).flatten()
+
+    def plan(self, db: Database, input: ExplainStatement) -> PlanNode:
+        executor = PLANNERS.get(type(input.statement))
+        if executor is None:
+            raise ExecutingException(f"Cannot explain statement of type {type(input.statement).__name__}")
+        return executor().plan(db, input.statement)
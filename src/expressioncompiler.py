@@ -0,0 +1,214 @@
+import operator
+from operator import itemgetter
+from typing import Any, Callable, Mapping, Optional, Sequence, TypeAlias
+
+from baseexecuter import ExecutingException
+from constantfolding import fold_constants
+from patternmatching import match_pattern, value_matcher
+from statements import (
+    BETWEEN_FUNCTIONS,
+    BINARY_OPERATIONS,
+    UNARY_FUNCTIONS,
+    BinaryOperator,
+    Expression,
+    binary_function,
+    binary_result_type,
+)
+from subexpressions import SharedSubexpressions
+
+# A compiled expression takes one row and returns the expression's value
+# for it, exactly as Expression.evaluate(row) would.
+CompiledExpression: TypeAlias = Callable[[Any], Any]
+
+# IS [NOT] [DISTINCT FROM] compare NULLs like any other value
+IS_FUNCTIONS: dict[str, Callable[[Any, Any], Any]] = {
+    "IS": operator.eq,
+    "IS NOT": operator.ne,
+    "IS DISTINCT FROM": operator.ne,
+    "IS NOT DISTINCT FROM": operator.eq,
+}
+
+
+def compile_expression(
+    expr: Expression,
+    columns: Optional[Sequence[str]] = None,
+    column_types: Optional[Mapping[str, type]] = None,
+    shared: Optional[SharedSubexpressions] = None,
+) -> CompiledExpression:
+    """Compiles an Expression into a nested closure computing its value.
+
+    The route of every node is dispatched on once, here, rather than on
+    every evaluation. With columns, the names of the fields of the rows
+    the closure will be called with (e.g. Table.ordered_columns for the
+    namedtuple in Entry.row), column references become lookups by tuple
+    position; without, they look up the column name in a mapping.
+
+    column_types (the data.Column.type of each column) lets operators
+    whose operand types are then known use the variant specialized for
+    those types (see statements.binary_function).
+
+    Constants are folded first (see fold_constants), so work which does
+    not depend on the row is not repeated for every row. The expression
+    itself is left untouched.
+
+    With shared, subexpressions it found repeated read their value from
+    its slot for the current row, computing it only the first time (see
+    subexpressions). Expressions compiled with the same shared share
+    those slots; call shared.start_row() before each row."""
+    if columns is not None:
+        positions = {name: position for position, name in enumerate(columns)}
+    else:
+        positions = None
+    return _compile(fold_constants(expr), positions, column_types or {}, shared)[0]
+
+
+def _compile(
+    expr: Expression,
+    positions: Optional[dict[str, int]],
+    column_types: Mapping[str, type],
+    shared: Optional[SharedSubexpressions] = None,
+) -> tuple[CompiledExpression, Optional[type]]:
+    """Returns the closure for expr, and the type of its non-NULL values
+    when that is known without evaluating it."""
+    if shared is not None:
+        slot = shared.slot(expr)
+        if slot is not None:
+            compute, result_type = _compile_node(expr, positions, column_types, shared)
+            return shared.reader(slot, compute), result_type
+    return _compile_node(expr, positions, column_types, shared)
+
+
+def _compile_node(
+    expr: Expression,
+    positions: Optional[dict[str, int]],
+    column_types: Mapping[str, type],
+    shared: Optional[SharedSubexpressions],
+) -> tuple[CompiledExpression, Optional[type]]:
+    route = expr.route
+    if route == 1:
+        value = expr.lead_expr.value
+        return (lambda row: value), expr.lead_expr.dtype
+    if route == 2:
+        raise ValueError(f"Attempted to evaluate unbound parameter {expr.lead_expr}")
+    if route == 3:
+        name = expr.lead_expr.column_name
+        if positions is None:
+            return itemgetter(name), column_types.get(name)
+        if name not in positions:
+            raise ExecutingException(f"Expression references column {name} which does not exist")
+        return itemgetter(positions[name]), column_types.get(name)
+    if route == 5:
+        lead, _ = _compile(expr.lead_expr, positions, column_types, shared)
+        return _compile_unary(UNARY_FUNCTIONS[expr.unary_op], lead), None
+    if route == 6:
+        lead, lead_type = _compile(expr.lead_expr, positions, column_types, shared)
+        second, second_type = _compile(expr.second_expr, positions, column_types, shared)
+        if expr.binary_op in (BinaryOperator.AND, BinaryOperator.OR):
+            return _compile_logical(expr.binary_op, lead, second), None
+        function = binary_function(expr.binary_op, lead_type, second_type)
+        result_type = binary_result_type(expr.binary_op, lead_type, second_type)
+        return _compile_binary(function, lead, second), result_type
+    if route == 8:
+        # Do not expect to evaluate across a sequence of expressions
+        return _compile(expr.expr_array[0], positions, column_types, shared)
+    if route == 11:
+        return _compile_pattern_match(expr, positions, column_types, shared), bool
+    if route == 12:
+        lead, _ = _compile(expr.lead_expr, positions, column_types, shared)
+        if expr.unary_op == "ISNULL":
+            return (lambda row: lead(row) is None), bool
+        return (lambda row: lead(row) is not None), bool
+    if route == 13:
+        if expr.binary_op not in IS_FUNCTIONS:
+            raise ValueError(f"Found expression from Route 13 with an invalid comparison operator '{expr.binary_op}'")
+        compare = IS_FUNCTIONS[expr.binary_op]
+        lead, _ = _compile(expr.lead_expr, positions, column_types, shared)
+        second, _ = _compile(expr.second_expr, positions, column_types, shared)
+        return (lambda row: compare(lead(row), second(row))), bool
+    if route == 14:
+        lead, _ = _compile(expr.lead_expr, positions, column_types, shared)
+        low, _ = _compile(expr.second_expr, positions, column_types, shared)
+        high, _ = _compile(expr.third_expr, positions, column_types, shared)
+        function = BETWEEN_FUNCTIONS[expr.binary_op]
+        return (lambda row: function(lead(row), low(row), high(row))), bool
+    raise ValueError(f"Attempted to evaluate Expression on invalid route {route}")
+
+
+def _compile_logical(
+    operator: BinaryOperator, lead: CompiledExpression, second: CompiledExpression
+) -> CompiledExpression:
+    logical = BINARY_OPERATIONS[operator]
+    # TRUE decides an OR on its own, FALSE an AND (see short_circuits)
+    decisive = operator == BinaryOperator.OR
+
+    def short_circuit(row):
+        a = lead(row)
+        if a is decisive:
+            return a
+        return logical(a, second(row))
+
+    return short_circuit
+
+
+def _compile_pattern_match(
+    expr: Expression,
+    positions: Optional[dict[str, int]],
+    column_types: Mapping[str, type],
+    shared: Optional[SharedSubexpressions],
+) -> CompiledExpression:
+    lead, _ = _compile(expr.lead_expr, positions, column_types, shared)
+    if has_constant_pattern(expr):
+        # the usual case: the pattern's regex is looked up once, here
+        match = value_matcher(expr.binary_op, *constant_pattern(expr))
+        return lambda row: match(lead(row))
+    operator = expr.binary_op
+    second, _ = _compile(expr.second_expr, positions, column_types, shared)
+    if expr.third_expr is None:
+        return lambda row: match_pattern(operator, lead(row), second(row))
+    third, _ = _compile(expr.third_expr, positions, column_types, shared)
+
+    def escaped_pattern_match(row):
+        value, pattern, escape = lead(row), second(row), third(row)
+        if escape is None:
+            return None
+        return match_pattern(operator, value, pattern, escape)
+
+    return escaped_pattern_match
+
+
+def has_constant_pattern(expr: Expression) -> bool:
+    """True if the route 11 expr has a non-NULL literal pattern, and a
+    non-NULL literal ESCAPE if any."""
+    return all(
+        child is None or (child.route == 1 and child.lead_expr.value is not None)
+        for child in (expr.second_expr, expr.third_expr)
+    )
+
+
+def constant_pattern(expr: Expression) -> tuple[Any, Any]:
+    """The (pattern, escape) of a route 11 expr with has_constant_pattern."""
+    escape = expr.third_expr.lead_expr.value if expr.third_expr is not None else None
+    return expr.second_expr.lead_expr.value, escape
+
+
+def _compile_unary(function: Callable[[Any], Any], lead: CompiledExpression) -> CompiledExpression:
+    def unary(row):
+        a = lead(row)
+        if a is None:
+            return None
+        return function(a)
+
+    return unary
+
+
+def _compile_binary(
+    function: Callable[[Any, Any], Any], lead: CompiledExpression, second: CompiledExpression
+) -> CompiledExpression:
+    def binary(row):
+        a = lead(row)
+        b = second(row)
+        if a is None or b is None:
+            return None
+        return function(a, b)
+
+    return binary
@@ -1,13 +1,44 @@
 from typing import Optional
-from literalparser import LiteralParser
+from literalparser import LiteralParser, ParameterParser
 from sqltoken import TokenType
 from baseparser import BaseParser, ParsingException
 from statements import BinaryOperator, ColumnAddress, UnaryOperator, Expression
-import copy
 
 UNARIES = [k.value for k in UnaryOperator]
 BINARIES = [k.value for k in BinaryOperator]
 
+# Binding power of operators following SQLite's operator precedence, from
+# loosest to tightest. Infix operators on the same level associate left.
+OR_PRECEDENCE = 1
+AND_PRECEDENCE = 2
+NOT_PRECEDENCE = 3
+# = == <> != IS LIKE GLOB REGEXP MATCH BETWEEN ISNULL NOTNULL
+EQUALITY_PRECEDENCE = 4
+UNARY_PRECEDENCE = 10
+
+BINARY_PRECEDENCE = {
+    BinaryOperator.OR: OR_PRECEDENCE,
+    BinaryOperator.AND: AND_PRECEDENCE,
+    BinaryOperator.EQLS: EQUALITY_PRECEDENCE,
+    BinaryOperator.DBL_EQLS: EQUALITY_PRECEDENCE,
+    BinaryOperator.DIAMOND: EQUALITY_PRECEDENCE,
+    BinaryOperator.NOT_EQLS: EQUALITY_PRECEDENCE,
+    BinaryOperator.LESS: 5,
+    BinaryOperator.GREATER: 5,
+    BinaryOperator.LESS_EQ: 5,
+    BinaryOperator.GREATER_EQ: 5,
+    BinaryOperator.AMPERSAND: 6,
+    BinaryOperator.BAR: 6,
+    BinaryOperator.PLUS: 7,
+    BinaryOperator.MINUS: 7,
+    BinaryOperator.MULT: 8,
+    BinaryOperator.DIVIDE: 8,
+    BinaryOperator.MOD: 8,
+    BinaryOperator.STRING_CONCAT: 9,
+}
+
+ROUTE_11_KEYS = ["LIKE", "GLOB", "REGEXP", "MATCH"]
+
 
 class ColumnAddressParser(BaseParser):
     """Parser for (qualified) column names."""
@@ -30,9 +61,11 @@ class ColumnAddressParser(BaseParser):
         )
 
     def parseIfMatches(self) -> Optional[ColumnAddress]:
+        mark = self.tokens.mark()
         try:
             return self.parse()
         except ParsingException:
+            self.tokens.reset(mark)
             return None
 
 
@@ -40,85 +73,151 @@ class ExpressionParser(BaseParser):
     """Parser for SQL Expressions.
 
     Currently matches routes:
-    - 1, 3, 4, 5, 6, 8, 11, 12, 13, 14
+    - 1, 2, 3, 4, 5, 6, 7, 8, 11, 12, 13, 14
     of expression specification.
 
-    NOTE:
-    Routes 11/13/14/6 apply ExpressionParser recursively
-    since those routes produce nested expressions.
-    As such, keep in mind that in general expressions combining
-    multiple expressions (such as "x AND y" or "x OR y") will
-    parse sub-expressions like
-    - "x AND y OR z"
-    as
-    - "(x AND (y OR z))"
-    To specify an alternative grouping, use parentheses:
-    - "((x AND y) OR z)" or equivalently "(x AND y) OR z"
+    Operators are parsed by precedence climbing and bind according to
+    SQLite's operator precedence, e.g.
+    - "x AND y OR z" parses as "((x AND y) OR z)"
+    - "NOT a = b" parses as "NOT (a = b)"
+    - "-a * b + c" parses as "(((-a) * b) + c)"
+    Operators of equal precedence associate to the left. Runs of AND or
+    OR, which are associative, are built into balanced trees instead so
+    that long "a = 1 OR a = 2 OR ..." filters stay shallow.
     """
 
     def parse(self) -> Expression:
-        output = Expression()
+        return self._parse_expression(OR_PRECEDENCE)
+
+    def _parse_expression(self, min_precedence: int) -> Expression:
+        """Parse an operand followed by any operators binding at least as
+        tightly as min_precedence."""
+        output = self._parse_operand()
+        while True:
+            precedence = self._peek_operator_precedence()
+            if precedence is None or precedence < min_precedence:
+                return output
+            if self.isValueOneOf(["AND", "OR"]):
+                output = self._parse_logical_chain(output, precedence)
+            else:
+                output = self._parse_infix(output, precedence)
+
+    def _parse_operand(self) -> Expression:
         # ROUTE 5: unary-operator
         if self.isValueOneOf(UNARIES):
-            output.route = 5
+            output = Expression(route=5)
             if self.valueMatches("NOT"):
                 unary = self.consume(TokenType.KEYWORD).value
+                output.lead_expr = self._parse_expression(NOT_PRECEDENCE)
             else:
                 unary = self.consume(TokenType.OPERATOR).value
+                output.lead_expr = self._parse_expression(UNARY_PRECEDENCE)
             output.unary_op = UnaryOperator(unary)
-            output.lead_expr = ExpressionParser(self.tokens).parse()
             return ExpressionParser.try_flatten(output)
         # ROUTE 8: multi-expression
         if self.valueMatches("("):
             self.consume(TokenType.LPAREN)
-            next_expr = ExpressionParser(self.tokens).parse()
             expr_arr = Expression(route=8)
-            expr_arr.expr_array = [next_expr]
+            expr_arr.expr_array = [self.parse()]
             while not self.valueMatches(")"):
                 self.consume(TokenType.COMMA)
-                expr_arr.expr_array.append(ExpressionParser(self.tokens).parse())
+                expr_arr.expr_array.append(self.parse())
             self.consume(TokenType.RPAREN)
-            output.lead_expr = expr_arr
+            return expr_arr
+        # ROUTE 2: bind-parameter
+        if self.typeMatches(TokenType.PARAMETER):
+            return Expression(lead_expr=ParameterParser(self.tokens).parse(), route=2)
         # ROUTE 1: literal-value
-        elif LiteralParser(copy.deepcopy(self.tokens)).parseIfMatches():
-            literal = LiteralParser(self.tokens).parse()
-            output.lead_expr = Expression(lead_expr=literal, route=1)
+        # (a failed attempt rewinds the shared cursor, so routes are probed
+        # in place rather than on a copy of the tokens)
+        if (literal := LiteralParser(self.tokens).parseIfMatches()) is not None:
+            return Expression(lead_expr=literal, route=1)
+        # ROUTE 7: function call
+        following = self.tokens.peek(1)
+        if (
+            following is not None
+            and following.type == TokenType.LPAREN
+            and (self.typeMatches(TokenType.IDENTIFIER) or self.tokens.peek().value.upper() == "COUNT")
+        ):
+            return self._parse_function_call()
         # ROUTE 3/4: column address
-        elif ColumnAddressParser(copy.deepcopy(self.tokens)).parseIfMatches():
-            column_address = ColumnAddressParser(self.tokens).parse()
-            output.lead_expr = Expression(lead_expr=column_address, route=3)
-        else:
-            raise ParsingException("Unable to find parsing route for Expression")
+        if (column_address := ColumnAddressParser(self.tokens).parseIfMatches()) is not None:
+            return Expression(lead_expr=column_address, route=3)
+        raise ParsingException("Unable to find parsing route for Expression")
+
+    def _parse_function_call(self) -> Expression:
+        """function-name ( [DISTINCT] expr, ... ) or function-name ( * ).
+
+        The upper-cased name goes in unary_op and the arguments in
+        expr_array, which is None for *. binary_op is "DISTINCT" when
+        the arguments are preceded by DISTINCT."""
+        name = self.tokens.advance().value.upper()
+        self.consume(TokenType.LPAREN)
+        output = Expression(route=7, unary_op=name, expr_array=[])
+        if self.valueMatches("*"):
+            self.consume(TokenType.OPERATOR, "*")
+            output.expr_array = None
+        elif not self.valueMatches(")"):
+            if self.valueMatches("DISTINCT"):
+                output.binary_op = self.consume(TokenType.KEYWORD, "DISTINCT").value
+            output.expr_array.append(self.parse())
+            while self.typeMatches(TokenType.COMMA):
+                self.consume(TokenType.COMMA)
+                output.expr_array.append(self.parse())
+        self.consume(TokenType.RPAREN)
+        return output
+
+    def _peek_operator_precedence(self) -> Optional[int]:
+        """Precedence of the operator at the head of the tokens, or None if
+        the expression ends here."""
+        token = self.tokens.peek()
+        if token is None:
+            return None
+        if token.type == TokenType.KEYWORD:
+            if token.value in ["AND", "OR"]:
+                return BINARY_PRECEDENCE[BinaryOperator(token.value)]
+            if token.value in ["ISNULL", "NOTNULL", "IS", "BETWEEN"] + ROUTE_11_KEYS:
+                return EQUALITY_PRECEDENCE
+            if token.value == "NOT":
+                following = self.tokens.peek(1)
+                if following is not None and following.value in ["NULL", "BETWEEN"] + ROUTE_11_KEYS:
+                    return EQUALITY_PRECEDENCE
+            return None
+        if token.type in (TokenType.OPERATOR, TokenType.COMPARISON) and token.value in BINARIES:
+            return BINARY_PRECEDENCE[BinaryOperator(token.value)]
+        return None
+
+    def _parse_logical_chain(self, first: Expression, precedence: int) -> Expression:
+        """Parse a run of one AND/OR operator into a balanced tree."""
+        operator = BinaryOperator(self.consume(TokenType.KEYWORD).value)
+        operands = [first, self._parse_expression(precedence + 1)]
+        while self.tokens and self.valueMatches(operator.value):
+            self.consume(TokenType.KEYWORD)
+            operands.append(self._parse_expression(precedence + 1))
+        return ExpressionParser.balance(operator, operands)
+
+    def _parse_infix(self, output: Expression, precedence: int) -> Expression:
+        """Parse the operator at the head of the tokens applied to output."""
         # ROUTE 12: ISNULL/NOTNULL/NOT NULL
-        if self.isValueOneOf(["ISNULL", "NOTNULL"]) or [k.value for k in self.tokens][
-            :2
-        ] == ["NOT", "NULL"]:
+        if self.isValueOneOf(["ISNULL", "NOTNULL"]) or self._next_values_are("NOT", "NULL"):
             null_str = self.consume(TokenType.KEYWORD).value
             if null_str == "NOT":
                 null_str += " " + self.consume(TokenType.KEYWORD, "NULL").value
-            output = Expression(
-                lead_expr=Expression(
-                    unary_op=null_str, route=12, lead_expr=output.lead_expr
-                )
-            )
+            return Expression(unary_op=null_str, route=12, lead_expr=output)
+        output = Expression(lead_expr=output)
         # ROUTE 11: NOT/LIKE part
-        route_11_keys = ["LIKE", "GLOB", "REGEXP", "MATCH"]
-        if self.isValueOneOf(route_11_keys) or (
-            len(self.tokens) > 1
-            and self.valueMatches("NOT")
-            and self.tokens[1].value in route_11_keys
-        ):
+        if self.isValueOneOf(ROUTE_11_KEYS) or self.valueMatches("NOT") and self.tokens[1].value in ROUTE_11_KEYS:
             if self.valueMatches("NOT"):
                 binary_str = self.consume(TokenType.KEYWORD, "NOT").value
                 binary_str += " " + self.consume(TokenType.KEYWORD).value
             else:
                 binary_str = self.consume(TokenType.KEYWORD).value
             output.binary_op = binary_str
-            output.second_expr = ExpressionParser(self.tokens).parse()
+            output.second_expr = self._parse_expression(precedence + 1)
             output.route = 11
-            if "LIKE" in output.binary_op and self.valueMatches("ESCAPE"):
+            if "LIKE" in output.binary_op and self.tokens and self.valueMatches("ESCAPE"):
                 output.ternary_op = self.consume(TokenType.KEYWORD, "ESCAPE").value
-                output.third_expr = ExpressionParser(self.tokens).parse()
+                output.third_expr = self._parse_expression(precedence + 1)
         # ROUTE 13: IS/NOT/DISTINCT FROM
         elif self.valueMatches("IS"):
             is_str = self.consume(TokenType.KEYWORD, "IS").value
@@ -128,13 +227,10 @@ class ExpressionParser(BaseParser):
                 is_str += " " + self.consume(TokenType.KEYWORD, "DISTINCT").value
                 is_str += " " + self.consume(TokenType.KEYWORD, "FROM").value
             output.binary_op = is_str
-            output.second_expr = ExpressionParser(self.tokens).parse()
+            output.second_expr = self._parse_expression(precedence + 1)
             output.route = 13
         # ROUTE 14: BETWEEN
-        elif self.valueMatches("BETWEEN") or [k.value for k in self.tokens][:2] == [
-            "NOT",
-            "BETWEEN",
-        ]:
+        elif self.valueMatches("BETWEEN") or self._next_values_are("NOT", "BETWEEN"):
             if self.valueMatches("BETWEEN"):
                 between_op = self.consume(TokenType.KEYWORD, "BETWEEN").value
             else:
@@ -142,32 +238,40 @@ class ExpressionParser(BaseParser):
                 between_op += " " + self.consume(TokenType.KEYWORD, "BETWEEN").value
             output.binary_op = between_op
             output.route = 14
-            and_expr = ExpressionParser(self.tokens).parse()
-            if not (
-                (and_expr.route == 6) and (and_expr.binary_op == BinaryOperator.AND)
-            ):
+            output.second_expr = self._parse_expression(precedence + 1)
+            if not (self.tokens and self.valueMatches("AND")):
                 raise ParsingException("BETWEEN expression missing AND operator")
-            output.second_expr = and_expr.lead_expr
-            output.ternary_op = "AND"
-            output.third_expr = and_expr.second_expr
+            output.ternary_op = self.consume(TokenType.KEYWORD, "AND").value
+            output.third_expr = self._parse_expression(precedence + 1)
         # ROUTE 6: binary-operator
-        elif self.isValueOneOf(BINARIES):
-            if self.typeMatches(TokenType.OPERATOR):
-                binary_str = self.consume(TokenType.OPERATOR).value
-            elif self.typeMatches(TokenType.COMPARISON):
-                binary_str = self.consume(TokenType.COMPARISON).value
-            elif self.isValueOneOf(["AND", "OR"]):
-                binary_str = self.consume(TokenType.KEYWORD).value
-            else:
-                raise ParsingException(
-                    f"Found Binary Operator of unexpected token type: {self.tokens[0]}"
-                )
-            output.binary_op = BinaryOperator(binary_str)
-            output.second_expr = ExpressionParser(self.tokens).parse()
-            output.route = 6
         else:
-            output.route = output.lead_expr.route
-        return ExpressionParser.try_flatten(output)
+            output.binary_op = BinaryOperator(self.consume(self.tokens[0].type).value)
+            output.second_expr = self._parse_expression(precedence + 1)
+            output.route = 6
+        return output
+
+    @staticmethod
+    def balance(operator: BinaryOperator, operands: list[Expression]) -> Expression:
+        """Join operands with an associative operator into a balanced tree.
+
+        Up to three operands this is the same tree left association gives."""
+        if len(operands) == 1:
+            return operands[0]
+        middle = (len(operands) + 1) // 2
+        return Expression(
+            route=6,
+            lead_expr=ExpressionParser.balance(operator, operands[:middle]),
+            binary_op=operator,
+            second_expr=ExpressionParser.balance(operator, operands[middle:]),
+        )
+
+    def _next_values_are(self, *values: str) -> bool:
+        """True if the upcoming tokens have exactly the given values."""
+        for offset, value in enumerate(values):
+            token = self.tokens.peek(offset)
+            if token is None or token.value != value:
+                return False
+        return True
 
     @staticmethod
     def try_flatten(expr: Expression) -> Expression:
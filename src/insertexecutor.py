@@ -1,5 +1,6 @@
 from baseexecuter import ExecutingException
 
+from constantfolding import fold_constants
 from data import Database
 from statements import InsertStatement, Literal
 
@@ -24,16 +25,17 @@ class InsertTableExecutor:
             raise ExecutingException(
                 f"INSERT statement references column(s) `{list(set(insert_columns) - set(table.ordered_columns))}` which do not exist in table {input.table_name}"
             )
-        insert_map: dict[str, Literal] = {}
-        if len(insert_columns) != len(input.values):
-            raise ExecutingException(
-                f"INSERT statement expected exactly {len(insert_columns)} values to insert into table, received {len(input.values)} values"
-            )
-        for idx, expr in enumerate(input.values):
-            expr = expr.apply_unary_operator()[1]
-            if expr.route != 1 or not isinstance(expr.lead_expr, Literal):
+        vectors: list[list] = [[] for _ in insert_columns]
+        for row in input.values:
+            if len(insert_columns) != len(row):
                 raise ExecutingException(
-                    f"Found non-literal data {expr} in VALUE list of INSERT statement."
+                    f"INSERT statement expected exactly {len(insert_columns)} values to insert into table, received {len(row)} values"
                 )
-            insert_map[insert_columns[idx]] = expr.lead_expr
-        table.add_row(insert_map)
+            for vector, expr in zip(vectors, row):
+                expr = fold_constants(expr)
+                if expr.route != 1 or not isinstance(expr.lead_expr, Literal):
+                    raise ExecutingException(
+                        f"Found non-literal data {expr} in VALUE list of INSERT statement."
+                    )
+                vector.append(expr.lead_expr.value)
+        table.add_rows(dict(zip(insert_columns, vectors)))
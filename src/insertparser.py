@@ -5,11 +5,17 @@ from statements import InsertStatement, Expression
 from qualifiedtablenameparser import QualifiedTableNameParser
 from columnnamelistparser import ColumnNameListParser
 from expressionparser import ExpressionParser
+from literalparser import LiteralParser
+
+LITERAL_TYPES = (TokenType.NUMBER_LITERAL, TokenType.STRING_LITERAL)
+LITERAL_KEYWORDS = ("NULL", "TRUE", "FALSE")
+ROW_DELIMITERS = (TokenType.COMMA, TokenType.RPAREN)
 
 
 class InsertStatementParser(BaseParser):
     """
-    Parser for the basic INSERT ... VALUES (...) form (single row).
+    Parser for the basic INSERT ... VALUES (...), (...), ... form.
+    Every parenthesized tuple becomes one row of the statement's values.
     """
 
     def parse(self) -> InsertStatement:
@@ -29,16 +35,11 @@ class InsertStatementParser(BaseParser):
         # VALUES
         self.consume(TokenType.KEYWORD, "VALUES")
 
-        # parenthesized value list
-        if not self.typeMatches(TokenType.LPAREN):
-            got = self.tokens[0] if self.tokens else None
-            raise ParsingException(f"Expected '(' after VALUES, got {got}")
-
-        values_expr: Expression = ExpressionParser(self.tokens).parse()
-        if values_expr.route != 8 or values_expr.expr_array is None:
-            raise ParsingException("Expected a parenthesized value list")
-
-        values = values_expr.expr_array
+        # one or more comma-separated parenthesized value lists
+        values: List[List[Expression]] = [self.parseRow()]
+        while self.tokens and self.typeMatches(TokenType.COMMA):
+            self.consume(TokenType.COMMA)
+            values.append(self.parseRow())
 
         # Build the statement (leave any trailing tokens unconsumed)
         return InsertStatement(
@@ -48,3 +49,28 @@ class InsertStatementParser(BaseParser):
             column_names=column_names,
             values=values
         )
+
+    def parseRow(self) -> List[Expression]:
+        if not self.typeMatches(TokenType.LPAREN):
+            got = self.tokens[0] if self.tokens else None
+            raise ParsingException(f"Expected '(' to start a VALUES row, got {got}")
+        self.consume(TokenType.LPAREN)
+
+        row: List[Expression] = []
+        while True:
+            # Rows of a bulk insert are mostly bare literals; those skip the
+            # general expression parser and its operator lookahead.
+            token, following = self.tokens.peek(), self.tokens.peek(1)
+            if (
+                following is not None
+                and following.type in ROW_DELIMITERS
+                and (token.type in LITERAL_TYPES or token.value in LITERAL_KEYWORDS)
+            ):
+                row.append(Expression(route=1, lead_expr=LiteralParser(self.tokens).parse()))
+            else:
+                row.append(ExpressionParser(self.tokens).parse())
+            if not self.typeMatches(TokenType.COMMA):
+                break
+            self.consume(TokenType.COMMA)
+        self.consume(TokenType.RPAREN)
+        return row
@@ -0,0 +1,394 @@
+"""Planning the joins of a SELECT reading several tables.
+
+Every table of the FROM clause is known by a binding, its alias or else
+its name, and every column of the query is referred to by the qualified
+name "binding.column" (see JoinScope), which is also the name of its
+field in the joined rows.
+
+The conjuncts of the WHERE clause and of the ON conditions that read a
+single table are handed to plan_table_access for that table, so they
+can use its indexes and filter its rows before they are joined. The
+tables are then joined two at a time, each step joining one more table
+to the rows of the tables joined so far, in the order plan_join finds
+cheapest:
+
+- a hash join when conjuncts compare the columns of both sides for
+  equality: the smaller side is read into a dict by key, and the other
+  streamed through it
+- a merge join when such a conjunct compares a column of each of two
+  tables: both are read in the order of the column, from its tree, and
+  walked in step, matching equal keys
+- an index nested loop join when it compares a column of the table
+  joined with the rows joined so far: the key of each of those rows is
+  looked up in the column, and only the rows found are read
+- a nested loop join, pairing every row of one side with every row of
+  the other, when there is no such conjunct
+
+join_step costs each that applies and keeps the cheapest. The conjuncts
+reading several tables are evaluated at the first join having them all,
+if not as the keys of the join then as a filter."""
+from dataclasses import dataclass, replace
+from operator import attrgetter
+from typing import Callable, Optional, Sequence, Union
+
+from baseexecuter import ExecutingException
+from batchevaluator import referenced_columns
+from data import Table
+from expressionparser import ExpressionParser
+from planner import ROW_COST, AccessPlan, PlanNode, conjuncts, plan_table_access, seek_cost, sort_cost
+from selectivity import DEFAULT_SELECTIVITY, EQUALITY_OPERATORS
+from statements import BinaryOperator, ColumnAddress, Expression, map_expression
+
+HASH_JOIN = "HASH JOIN"
+MERGE_JOIN = "MERGE JOIN"
+INDEX_NESTED_LOOP_JOIN = "INDEX NESTED LOOP JOIN"
+NESTED_LOOP_JOIN = "NESTED LOOP JOIN"
+# Cost of adding one row to the dict of a hash join, relative to reading it
+HASH_BUILD_COST = 1.0
+# Cost of stepping past one row of either side of a merge join, which
+# walks the groups of rows of each key rather than hashing every row
+MERGE_COST = 0.5
+
+
+def qualified_name(binding: str, column: str) -> str:
+    return f"{binding}.{column}"
+
+
+def binding_of(name: str) -> str:
+    """The binding of the table a qualified column name belongs to."""
+    return name.split(".", 1)[0]
+
+
+def map_columns(expr: Expression, function: Callable[[ColumnAddress], Expression]) -> Expression:
+    """expr with every column read replaced by the expression function
+    returns for its address."""
+    if expr.route == 3:
+        return function(expr.lead_expr)
+    return map_expression(expr, lambda child: map_columns(child, function))
+
+
+class JoinScope:
+    """The tables of a FROM clause, by binding, in the order they are
+    listed, and the resolution of the column names of the query."""
+
+    def __init__(self, tables: Sequence[tuple[str, Optional[str], str, Table]]):
+        """tables are the (binding, schema name, table name, Table) of each
+        table."""
+        self.tables: dict[str, Table] = {}
+        self.schemas: dict[str, Optional[str]] = {}
+        self.table_names: dict[str, str] = {}
+        for binding, schema_name, table_name, table in tables:
+            if binding in self.tables:
+                raise ExecutingException(f"Ambiguous table name {binding} in FROM, give it an alias")
+            self.tables[binding] = table
+            self.schemas[binding] = schema_name
+            self.table_names[binding] = table_name
+
+    def column_types(self) -> dict[str, Optional[type]]:
+        return {
+            qualified_name(binding, column): table[column].type
+            for binding, table in self.tables.items()
+            for column in table.ordered_columns
+        }
+
+    def qualify(self, expr: Expression) -> Expression:
+        """expr with every column it reads named by its qualified name."""
+        return map_columns(expr, lambda address: Expression(route=3, lead_expr=ColumnAddress(self.resolve(address))))
+
+    def resolve(self, address: ColumnAddress) -> str:
+        """The qualified name of the column at address, which names its
+        table when the column is not unique among the tables."""
+        name = address.column_name
+        if address.table_name is not None:
+            binding = address.table_name
+            if binding not in self.tables or address.schema_name not in (None, self.schemas[binding]):
+                table = binding if address.schema_name is None else f"{address.schema_name}.{binding}"
+                raise ExecutingException(f"Table {table} is not in FROM")
+            if name not in self.tables[binding].tbl:
+                raise ExecutingException(f"Column(s) ['{name}'] do not exist in table {binding}")
+            return qualified_name(binding, name)
+        bindings = [binding for binding, table in self.tables.items() if name in table.tbl]
+        if not bindings:
+            raise ExecutingException(f"Column(s) ['{name}'] do not exist in tables {', '.join(self.tables)}")
+        if len(bindings) > 1:
+            raise ExecutingException(f"Ambiguous column name {name}, found in tables {', '.join(bindings)}")
+        return qualified_name(bindings[0], name)
+
+
+@dataclass
+class TableInput:
+    """A table of the join, read through plan, which finds the rows where
+    (over the names of the columns in table) is true for."""
+    binding: str
+    table_name: str
+    table: Table
+    plan: AccessPlan
+    where: Optional[Expression] = None
+    # the column the rows are wanted in the order of, for a merge join
+    order: Optional[str] = None
+
+    @property
+    def tables(self) -> list[str]:
+        """The bindings of the tables joined, in the order joined."""
+        return [self.binding]
+
+    @property
+    def bindings(self) -> frozenset[str]:
+        return frozenset((self.binding,))
+
+    @property
+    def columns(self) -> list[str]:
+        return [qualified_name(self.binding, column) for column in self.table.ordered_columns]
+
+    @property
+    def rows(self) -> float:
+        return self.plan.rows
+
+    @property
+    def cost(self) -> float:
+        """The cost of reading the rows, and of sorting them if they are
+        wanted in an order their plan does not read them in."""
+        if self.order is None or self.plan.ordered:
+            return self.plan.cost
+        return self.plan.cost + sort_cost(self.plan.rows)
+
+    @property
+    def name(self) -> str:
+        return self.table_name if self.table_name == self.binding else f"{self.table_name} AS {self.binding}"
+
+    def ordered_by(self, column: str) -> "TableInput":
+        """The input reading the same rows in the order of column."""
+        return replace(self, plan=plan_table_access(self.table, self.where, (column, False)), order=column)
+
+    def explain(self) -> PlanNode:
+        node = self.plan.explain(self.name)
+        if self.order is None or self.plan.ordered:
+            return node
+        return PlanNode("SORT", node.rows, self.cost, [node])
+
+
+@dataclass
+class JoinPlan:
+    """The join of the rows of left, one or more tables, to those of the
+    table right: each row holds the fields of left followed by those of
+    right. method is how: HASH_JOIN, MERGE_JOIN, INDEX_NESTED_LOOP_JOIN
+    or NESTED_LOOP_JOIN. The first three match the values of left_keys to
+    those of right_keys; a hash join reads the side build_left names into
+    its dict, and the others match a single key, which for the right side
+    is a column of its table. residual is evaluated over every
+    pair of rows joined. rows_joined and rows are the estimated numbers
+    of pairs joined and of those residual is true for, join_cost and cost
+    the estimated cost of joining them and of joining and filtering them,
+    including that of reading the inputs."""
+    left: "JoinInput"
+    right: TableInput
+    method: str
+    left_keys: list[Expression]
+    right_keys: list[Expression]
+    residual: Optional[Expression]
+    rows_joined: float
+    rows: float
+    join_cost: float
+    cost: float
+    build_left: bool = False
+
+    @property
+    def bindings(self) -> frozenset[str]:
+        return self.left.bindings | self.right.bindings
+
+    @property
+    def tables(self) -> list[str]:
+        return self.left.tables + self.right.tables
+
+    @property
+    def columns(self) -> list[str]:
+        return self.left.columns + self.right.columns
+
+    def explain(self) -> PlanNode:
+        """The join as a PlanNode over those of its inputs. For a hash
+        join, the detail names the tables read into its dict."""
+        detail = self.method
+        if self.method == HASH_JOIN:
+            detail += f" BUILD {', '.join((self.left if self.build_left else self.right).tables)}"
+        right = self.right.explain()
+        if self.method == INDEX_NESTED_LOOP_JOIN:
+            # right is searched once per row of left: its node shows one search
+            column = input_column(self.right_keys[0], self.right)
+            found = _per_key(self.right.table, column)
+            cost = seek_cost(self.right.table, column) + found * ROW_COST
+            right = PlanNode(f"SEARCH {self.right.name} USING INDEX {column} ({column}=?)", found, cost)
+            if self.right.where is not None:
+                matching = self.rows_joined / max(self.left.rows, 1.0)
+                right = PlanNode("FILTER", matching, cost + found * ROW_COST, [right])
+        join = PlanNode(detail, self.rows_joined, self.join_cost, [self.left.explain(), right])
+        if self.residual is None:
+            return join
+        return PlanNode("FILTER", self.rows, self.cost, [join])
+
+
+JoinInput = Union[TableInput, JoinPlan]
+
+
+def plan_join(scope: JoinScope, where: Optional[Expression]) -> JoinInput:
+    """The cheapest plan found joining the tables of scope, where being
+    the condition of the join (the WHERE clause and all ON conditions)
+    over qualified column names.
+
+    Tables are added to the join one at a time, the cheapest join of the
+    next table first, starting from each table in turn."""
+    parts = [] if where is None else list(conjuncts(where))
+    first = next(iter(scope.tables))
+    single: dict[str, list[Expression]] = {binding: [] for binding in scope.tables}
+    joining = []
+    for part in parts:
+        bindings = _bindings(part)
+        if len(bindings) > 1:
+            joining.append(part)
+        else:
+            # a conjunct reading no column is checked with the first table
+            single[next(iter(bindings), first)].append(_unqualified(part))
+    inputs = [
+        TableInput(binding, scope.table_names[binding], table, plan_table_access(table, where), where)
+        for binding, table in scope.tables.items()
+        for where in [_conjunction(single[binding])]
+    ]
+    if len(inputs) == 1:
+        return inputs[0]
+    best: Optional[JoinInput] = None
+    for start in inputs:
+        joined: JoinInput = start
+        remaining = [table for table in inputs if table is not start]
+        while remaining:
+            joined = min((join_step(scope, joined, right, joining) for right in remaining), key=lambda plan: plan.cost)
+            remaining = [table for table in remaining if table.binding != joined.right.binding]
+        if best is None or joined.cost < best.cost:
+            best = joined
+    return best
+
+
+def join_step(scope: JoinScope, left: JoinInput, right: TableInput, predicates: list[Expression]) -> JoinPlan:
+    """The cheapest JoinPlan joining right to left, evaluating those of
+    predicates (conjuncts reading several tables) that read right and
+    only tables of left otherwise."""
+    joined = left.bindings | right.bindings
+    keys, others = [], []
+    for predicate in predicates:
+        bindings = _bindings(predicate)
+        if not bindings <= joined or bindings <= left.bindings:
+            continue
+        pair = _equi_join_keys(predicate, left.bindings, right.bindings)
+        if pair is None:
+            others.append(predicate)
+        else:
+            keys.append((predicate, *pair))
+    rows_joined = left.rows * right.rows
+    for _, left_key, right_key in keys:
+        rows_joined /= max(_distinct(scope, left_key, left.rows), _distinct(scope, right_key, right.rows), 1.0)
+
+    def plan(
+        method: str,
+        join_cost: float,
+        used: list[tuple[Expression, Expression, Expression]],
+        build_left: bool = False,
+        sides: tuple[JoinInput, TableInput] = (left, right),
+    ) -> JoinPlan:
+        # the keys not used by the join are checked with the residual
+        residual = others + [predicate for predicate, *_ in keys if not any(predicate is key for key, *_ in used)]
+        join_cost += rows_joined * ROW_COST
+        rows = rows_joined * DEFAULT_SELECTIVITY ** len(others)
+        cost = join_cost + (rows_joined * ROW_COST if residual else 0.0)
+        left_keys = [left_key for _, left_key, _ in used]
+        right_keys = [right_key for *_, right_key in used]
+        return JoinPlan(
+            sides[0],
+            sides[1],
+            method,
+            left_keys,
+            right_keys,
+            _conjunction(residual),
+            rows_joined,
+            rows,
+            join_cost,
+            cost,
+            build_left,
+        )
+
+    inputs_cost = left.cost + right.cost
+    if not keys:
+        return plan(NESTED_LOOP_JOIN, inputs_cost + right.rows * ROW_COST + left.rows * right.rows * ROW_COST, [])
+    build_left = left.rows < right.rows
+    build, probe = (left.rows, right.rows) if build_left else (right.rows, left.rows)
+    candidates = [plan(HASH_JOIN, inputs_cost + build * HASH_BUILD_COST + probe * ROW_COST, keys, build_left)]
+    for key in keys:
+        _, left_key, right_key = key
+        column = input_column(right_key, right)
+        if column is None:
+            continue
+        # looking up the key of every row of left in the Column of right,
+        # whose rows are then read, and filtered, only for those
+        read = left.rows * _per_key(right.table, column)
+        lookups = left.rows * seek_cost(right.table, column) + read * ROW_COST * (2 if right.where else 1)
+        candidates.append(plan(INDEX_NESTED_LOOP_JOIN, left.cost + lookups, [key]))
+        if isinstance(left, TableInput) and (left_column := input_column(left_key, left)) is not None:
+            # both sides read in the order of their key and walked in step
+            ordered_left, ordered_right = left.ordered_by(left_column), right.ordered_by(column)
+            merge = ordered_left.cost + ordered_right.cost + (left.rows + right.rows) * MERGE_COST
+            candidates.append(plan(MERGE_JOIN, merge, [key], sides=(ordered_left, ordered_right)))
+    return min(candidates, key=attrgetter("cost"))
+
+
+def input_column(expr: Expression, input: TableInput) -> Optional[str]:
+    """The name in its table of the column of input expr reads, if that
+    is all it does."""
+    if expr.route != 3 or binding_of(expr.lead_expr.column_name) != input.binding:
+        return None
+    return expr.lead_expr.column_name.split(".", 1)[1]
+
+
+def _equi_join_keys(
+    predicate: Expression, left: frozenset[str], right: frozenset[str]
+) -> Optional[tuple[Expression, Expression]]:
+    """The (left, right) operands of predicate if it compares an
+    expression over left with one over right for equality."""
+    if predicate.route != 6 or predicate.binary_op not in EQUALITY_OPERATORS:
+        return None
+    first, second = _bindings(predicate.lead_expr), _bindings(predicate.second_expr)
+    if not first or not second:
+        return None
+    if first <= left and second <= right:
+        return predicate.lead_expr, predicate.second_expr
+    if first <= right and second <= left:
+        return predicate.second_expr, predicate.lead_expr
+    return None
+
+
+def _distinct(scope: JoinScope, expr: Expression, rows: float) -> float:
+    """Estimated number of distinct values of expr among rows rows: that
+    of its Column when it is one, else as many as rows."""
+    if expr.route == 3:
+        name = expr.lead_expr.column_name
+        column = scope.tables[binding_of(name)][name.split(".", 1)[1]]
+        return min(float(len(column.tree)), rows)
+    return rows
+
+
+def _per_key(table: Table, column: str) -> float:
+    """Average number of rows of table holding each value of column."""
+    index = table[column]
+    return (index.rows - len(index.none_entries)) / max(len(index.tree), 1)
+
+
+def _bindings(expr: Expression) -> frozenset[str]:
+    return frozenset(binding_of(name) for name in referenced_columns(expr))
+
+
+def _unqualified(expr: Expression) -> Expression:
+    return map_columns(
+        expr, lambda address: Expression(route=3, lead_expr=ColumnAddress(address.column_name.split(".", 1)[1]))
+    )
+
+
+def _conjunction(parts: list[Expression]) -> Optional[Expression]:
+    if not parts:
+        return None
+    return ExpressionParser.balance(BinaryOperator.AND, parts)
@@ -2,7 +2,7 @@ from typing import Optional
 from signednumberparser import SignedNumberParser
 from sqltoken import TokenType
 from baseparser import BaseParser, ParsingException
-from statements import Literal, ColumnAddress
+from statements import Literal, ColumnAddress, Parameter
 
 
 class LiteralParser(BaseParser):
@@ -36,9 +36,15 @@ class LiteralParser(BaseParser):
         return Literal(type(num_value), num_value)
 
     def parseIfMatches(self) -> Optional[Literal]:
+        """Parse a Literal if the upcoming tokens form one.
+
+        On failure the token cursor is rewound to where it started and
+        None is returned."""
+        mark = self.tokens.mark()
         try:
             return self.parse()
         except ParsingException:
+            self.tokens.reset(mark)
             return None
 
 
@@ -117,3 +123,23 @@ class BoolNullParser(BaseParser):
                 return False
             case "NULL":
                 return None
+
+
+class ParameterParser(BaseParser):
+    """Parser for bind parameters: ?, ?NNN and :name"""
+
+    def parse(self) -> Parameter:
+        """Parse a PARAMETER token into a Parameter.
+
+        Returns:
+            Parameter: index for ?NNN, name for :name, neither for a bare ?.
+        """
+        value = self.consume(TokenType.PARAMETER).value
+        if value.startswith(":"):
+            return Parameter(name=value[1:])
+        if len(value) > 1:
+            index = int(value[1:])
+            if index < 1:
+                raise ParsingException(f"parameter index {value} must be at least 1")
+            return Parameter(index=index)
+        return Parameter()
@@ -0,0 +1,218 @@
+"""Evaluation of numeric expressions over NumPy arrays.
+
+NumPy is optional: when it cannot be imported, available() is False and
+callers keep to the pure Python evaluator. Only expressions over INTEGER
+and REAL columns are handled here, and anything this module cannot
+evaluate with exactly the results of Expression.evaluate raises
+Unsupported so the caller can fall back."""
+from typing import Any, Mapping, Optional, Sequence
+
+from statements import BinaryOperator, Expression, UnaryOperator
+
+try:
+    import numpy as np
+except ImportError:  # pragma: no cover - depends on the environment
+    np = None
+
+# Integers beyond this magnitude may overflow int64 arithmetic (or lose
+# precision in float64), where Python ints would not.
+SAFE_INTEGER = 1 << 52
+
+NUMERIC_TYPES = (int, float)
+
+ARITHMETIC_OPERATORS = (
+    BinaryOperator.PLUS,
+    BinaryOperator.MINUS,
+    BinaryOperator.MULT,
+    BinaryOperator.DIVIDE,
+    BinaryOperator.MOD,
+)
+
+COMPARISON_OPERATORS = {
+    BinaryOperator.LESS: "less",
+    BinaryOperator.GREATER: "greater",
+    BinaryOperator.LESS_EQ: "less_equal",
+    BinaryOperator.GREATER_EQ: "greater_equal",
+    BinaryOperator.EQLS: "equal",
+    BinaryOperator.DBL_EQLS: "equal",
+    BinaryOperator.DIAMOND: "not_equal",
+    BinaryOperator.NOT_EQLS: "not_equal",
+}
+
+ARITHMETIC_FUNCTIONS = {
+    BinaryOperator.PLUS: "add",
+    BinaryOperator.MINUS: "subtract",
+    BinaryOperator.MULT: "multiply",
+    BinaryOperator.DIVIDE: "true_divide",
+    BinaryOperator.MOD: "remainder",
+}
+
+
+class Unsupported(Exception):
+    """Raised when an expression or batch must be evaluated in Python."""
+
+
+def available() -> bool:
+    return np is not None
+
+
+def supports(expr: Expression, column_types: Mapping[str, type]) -> bool:
+    """True if expr only uses constructs this engine evaluates: numeric,
+    boolean and NULL literals, INTEGER/REAL columns, arithmetic,
+    comparisons, AND/OR/NOT, ISNULL/NOTNULL, IS and BETWEEN."""
+    return available() and _kind(expr, column_types) is not None
+
+
+def _kind(expr: Expression, column_types: Mapping[str, type]) -> Optional[str]:
+    """"num" or "bool" for the values expr produces, "null" for a NULL
+    literal (usable as either), or None if the engine cannot handle it."""
+    route = expr.route
+    if route == 1:
+        dtype = expr.lead_expr.dtype
+        if dtype is bool:
+            return "bool"
+        if dtype in NUMERIC_TYPES:
+            return "num" if abs(expr.lead_expr.value) <= SAFE_INTEGER or dtype is float else None
+        return "null" if expr.lead_expr.value is None else None
+    if route == 3:
+        column_type = column_types.get(expr.lead_expr.column_name)
+        return "num" if column_type in NUMERIC_TYPES else None
+    if route == 8:
+        return _kind(expr.expr_array[0], column_types) if len(expr.expr_array) == 1 else None
+    lead = _kind(expr.lead_expr, column_types) if isinstance(expr.lead_expr, Expression) else None
+    if lead is None:
+        return None
+    if route == 5:
+        if expr.unary_op == UnaryOperator.NOT:
+            return "bool"
+        if expr.unary_op in (UnaryOperator.POSITIVE, UnaryOperator.NEGATIVE) and lead != "bool":
+            return "num"
+        return None
+    if route == 12:
+        return "bool"
+    second = _kind(expr.second_expr, column_types)
+    if second is None:
+        return None
+    operands = {lead, second}
+    if route == 6:
+        if expr.binary_op in (BinaryOperator.AND, BinaryOperator.OR):
+            return "bool" if "num" not in operands else None
+        if "bool" in operands:
+            return None
+        if expr.binary_op in ARITHMETIC_OPERATORS:
+            return "num"
+        return "bool" if expr.binary_op in COMPARISON_OPERATORS else None
+    if route == 13:
+        return "bool" if "bool" not in operands else None
+    if route == 14:
+        third = _kind(expr.third_expr, column_types)
+        return "bool" if third is not None and "bool" not in operands | {third} else None
+    return None
+
+
+def to_array(values: Sequence[Any], column_type: type):
+    """Converts a column vector into a (values, nulls) pair of arrays.
+
+    NULLs become 0 in the values array, with True in nulls."""
+    n = len(values)
+    dtype = np.float64 if column_type is float else np.int64
+    if None not in values:
+        array = np.array(values, dtype=dtype)
+        nulls = np.zeros(n, dtype=bool)
+    else:
+        nulls = np.fromiter((value is None for value in values), dtype=bool, count=n)
+        array = np.array([0 if value is None else value for value in values], dtype=dtype)
+    if dtype is np.int64 and n and np.abs(array).max() > SAFE_INTEGER:
+        raise Unsupported("integer too large for int64 evaluation")
+    return array, nulls
+
+
+def evaluate(expr: Expression, columns: Mapping[str, tuple], n: int):
+    """Evaluates expr over columns, a mapping of column name to the
+    (values, nulls) arrays made by to_array, returning the same pair for
+    the result. NULL results have an arbitrary value in the values array.
+
+    Raises Unsupported for a batch Python would evaluate differently,
+    e.g. one dividing by zero (an error in Python) or overflowing int64."""
+    route = expr.route
+    if route == 1:
+        value = expr.lead_expr.value
+        if value is None:
+            return np.zeros(n, dtype=np.int64), np.ones(n, dtype=bool)
+        return np.full(n, value), np.zeros(n, dtype=bool)
+    if route == 3:
+        return columns[expr.lead_expr.column_name]
+    if route == 8:
+        return evaluate(expr.expr_array[0], columns, n)
+    values, nulls = evaluate(expr.lead_expr, columns, n)
+    if route == 5:
+        if expr.unary_op == UnaryOperator.NOT:
+            return values == 0, nulls
+        if expr.unary_op == UnaryOperator.NEGATIVE:
+            return np.negative(values), nulls
+        return values, nulls
+    if route == 12:
+        if expr.unary_op == "ISNULL":
+            return nulls.copy(), np.zeros(n, dtype=bool)
+        return ~nulls, np.zeros(n, dtype=bool)
+    second, second_nulls = evaluate(expr.second_expr, columns, n)
+    if route == 6:
+        if expr.binary_op == BinaryOperator.AND:
+            return _and(values, nulls, second, second_nulls)
+        if expr.binary_op == BinaryOperator.OR:
+            return _or(values, nulls, second, second_nulls)
+        result_nulls = nulls | second_nulls
+        if expr.binary_op in COMPARISON_OPERATORS:
+            compare = getattr(np, COMPARISON_OPERATORS[expr.binary_op])
+            return compare(values, second), result_nulls
+        return _arithmetic(expr.binary_op, values, second, result_nulls), result_nulls
+    if route == 13:
+        same = (nulls & second_nulls) | (~nulls & ~second_nulls & (values == second))
+        if expr.binary_op in ("IS", "IS NOT DISTINCT FROM"):
+            return same, np.zeros(n, dtype=bool)
+        return ~same, np.zeros(n, dtype=bool)
+    if route == 14:
+        high, high_nulls = evaluate(expr.third_expr, columns, n)
+        # low <= value AND value <= high, with NULLs as in statements.between
+        above_nulls, below_nulls = nulls | second_nulls, nulls | high_nulls
+        false = (~(second <= values) & ~above_nulls) | (~(values <= high) & ~below_nulls)
+        result_nulls = (above_nulls | below_nulls) & ~false
+        between = ~false & ~result_nulls
+        return (between if expr.binary_op == "BETWEEN" else false), result_nulls
+    raise Unsupported(f"route {route}")
+
+
+def _arithmetic(operator: BinaryOperator, a, b, nulls):
+    if operator in (BinaryOperator.DIVIDE, BinaryOperator.MOD) and ((b == 0) & ~nulls).any():
+        raise Unsupported("division by zero")
+    if a.dtype == np.int64 and b.dtype == np.int64 and operator != BinaryOperator.DIVIDE:
+        # the exact result must fit where int64 arithmetic is exact
+        estimate = getattr(np, ARITHMETIC_FUNCTIONS[operator])(a.astype(np.float64), b.astype(np.float64))
+        if (np.abs(estimate[~nulls]) > SAFE_INTEGER).any():
+            raise Unsupported("integer overflow")
+    with np.errstate(divide="ignore", invalid="ignore"):
+        return getattr(np, ARITHMETIC_FUNCTIONS[operator])(a, b)
+
+
+def _and(a, a_nulls, b, b_nulls):
+    """Three-valued AND, as BinaryOperator.execute_op on booleans."""
+    a, b = a.astype(bool, copy=False), b.astype(bool, copy=False)
+    either_false = (~a_nulls & ~a) | (~b_nulls & ~b)
+    nulls = ~either_false & (a_nulls | b_nulls)
+    return ~either_false & ~nulls, nulls
+
+
+def _or(a, a_nulls, b, b_nulls):
+    """Three-valued OR, as BinaryOperator.execute_op on booleans."""
+    a, b = a.astype(bool, copy=False), b.astype(bool, copy=False)
+    either_true = (~a_nulls & a) | (~b_nulls & b)
+    nulls = ~either_true & (a_nulls | b_nulls)
+    return either_true, nulls
+
+
+def to_list(values, nulls) -> list[Any]:
+    """Python values for an evaluate result, None where it is NULL."""
+    result = values.tolist()
+    for index in np.flatnonzero(nulls).tolist():
+        result[index] = None
+    return result
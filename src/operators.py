@@ -0,0 +1,418 @@
+"""Iterator operators that query results are streamed through.
+
+Each operator is an iterable over the rows of its input, producing its
+own rows lazily as they are pulled: nothing is read from the table until
+the first row is asked for, and no operator holds more than a batch of
+rows at a time but Sort, HashAggregate and the joins, which keep what
+they must (the rows sorted, the groups, the inner side of a join). A
+query is executed by chaining them, e.g.
+
+    Project(Limit(Sort(Filter(TableScan(table), where, ...), key), 10), columns)
+
+and iterating the last one, normally through a cursor.Cursor.
+
+Tables are read live, so a table must not be modified while rows are
+still being pulled from a scan over it."""
+import heapq
+from collections import namedtuple
+from itertools import groupby, islice
+from operator import itemgetter
+from typing import Any, Callable, Iterable, Iterator, Mapping, Optional, Sequence
+
+from aggregation import Grouping
+from batchevaluator import BATCH_SIZE, filter_entries
+from data import Column, Entry, Table
+from expressioncompiler import CompiledExpression, compile_expression
+from ordering import sort_key
+from planner import AccessPath, comparable
+from statements import Expression
+
+
+class TableScan:
+    """Every Entry of a table, in the order of its first column with the
+    Entries holding None in that column last."""
+
+    def __init__(self, table: Table):
+        self.table = table
+
+    def __iter__(self) -> Iterator[Entry]:
+        if len(self.table.ordered_columns) == 0:
+            return
+        first_column = self.table[self.table.ordered_columns[0]]
+        for _, entries in first_column.items_between():
+            yield from entries
+        yield from first_column.entries(None)
+
+
+class IndexScan:
+    """The Entries found by an access path of the planner, such as a
+    lookup of one key or a range of keys in a Column's tree."""
+
+    def __init__(self, table: Table, path: AccessPath):
+        self.table = table
+        self.path = path
+
+    def __iter__(self) -> Iterator[Entry]:
+        return self.path.entries(self.table)
+
+
+class Filter:
+    """The Entries of source for which where is true, evaluated in
+    batches of batch_size (see batchevaluator.filter_entries)."""
+
+    def __init__(
+        self,
+        source: Iterable[Entry],
+        where: Expression,
+        column_names: Sequence[str],
+        column_types: Optional[Mapping[str, type]] = None,
+        batch_size: int = BATCH_SIZE,
+    ):
+        self.source = source
+        self.where = where
+        self.column_names = column_names
+        self.column_types = column_types
+        self.batch_size = batch_size
+
+    def __iter__(self) -> Iterator[Entry]:
+        return filter_entries(self.source, self.where, self.column_names, self.batch_size, self.column_types)
+
+
+class Sort:
+    """The rows of source sorted by key, in reverse when reverse is set.
+
+    Nothing can be produced before all of source has been read. With a
+    limit, only the first limit rows of the result are produced, and only
+    those are kept while reading: a heap of at most limit rows takes the
+    place of sorting them all. Rows with equal keys keep their order."""
+
+    def __init__(
+        self, source: Iterable[Any], key: Callable[[Any], Any], reverse: bool = False, limit: Optional[int] = None
+    ):
+        if limit is not None and limit < 0:
+            raise ValueError(f"Sort limit must not be negative, got {limit}")
+        self.source = source
+        self.key = key
+        self.reverse = reverse
+        self.limit = limit
+
+    def __iter__(self) -> Iterator[Any]:
+        if self.limit is None:
+            return iter(sorted(self.source, key=self.key, reverse=self.reverse))
+        select = heapq.nlargest if self.reverse else heapq.nsmallest
+        return iter(select(self.limit, self.source, key=self.key))
+
+
+class Project:
+    """A dict of the given columns, in order, for every Entry of source.
+    column_names are the names of the fields of every Entry, in order."""
+
+    def __init__(self, source: Iterable[Entry], columns: Sequence[str], column_names: Sequence[str]):
+        self.source = source
+        self.columns = list(columns)
+        positions = {name: position for position, name in enumerate(column_names)}
+        self._getter = itemgetter(*(positions[name] for name in self.columns)) if self.columns else None
+
+    def __iter__(self) -> Iterator[dict[str, Any]]:
+        columns, getter = self.columns, self._getter
+        if getter is None:
+            for _ in self.source:
+                yield {}
+        elif len(columns) == 1:
+            (name,) = columns
+            for entry in self.source:
+                yield {name: getter(entry.row)}
+        else:
+            for entry in self.source:
+                yield dict(zip(columns, getter(entry.row)))
+
+
+class Compute:
+    """A dict of the value of each of exprs, under the matching name, for
+    every Entry of source. column_names are the names of the fields of
+    every Entry, in order."""
+
+    def __init__(
+        self,
+        source: Iterable[Entry],
+        exprs: Sequence[Expression],
+        names: Sequence[str],
+        column_names: Sequence[str],
+        column_types: Optional[Mapping[str, type]] = None,
+    ):
+        self.source = source
+        self.names = list(names)
+        self.exprs = [compile_expression(expr, column_names, column_types) for expr in exprs]
+
+    def __iter__(self) -> Iterator[dict[str, Any]]:
+        names, exprs = self.names, self.exprs
+        for entry in self.source:
+            row = entry.row
+            yield dict(zip(names, [expr(row) for expr in exprs]))
+
+
+class HashAggregate:
+    """One Entry per group of the Entries of source, as described by
+    grouping (see aggregation.Grouping), its fields named grouping.names.
+
+    Groups are looked up by their keys in a dict holding the accumulators
+    of each, so memory grows with the number of groups, not of rows; but
+    no group is complete, and none is produced, until all of source has
+    been read. Groups come in the order their first rows came in."""
+
+    def __init__(
+        self,
+        source: Iterable[Entry],
+        grouping: Grouping,
+        column_names: Sequence[str],
+        column_types: Optional[Mapping[str, type]] = None,
+    ):
+        self.source = source
+        self.grouping = grouping
+        self._key, self._arguments = _grouping_functions(grouping, column_names, column_types)
+        self._row_type = namedtuple("Group", grouping.names)
+
+    def __iter__(self) -> Iterator[Entry]:
+        key_of, arguments, grouping = self._key, self._arguments, self.grouping
+        groups: dict[tuple, list[Any]] = {}
+        for entry in self.source:
+            row = entry.row
+            key = key_of(row)
+            accumulators = groups.get(key)
+            if accumulators is None:
+                accumulators = groups[key] = grouping.accumulators()
+            for accumulator, argument in zip(accumulators, arguments):
+                accumulator.add(argument(row))
+        if not groups and not grouping.keys:
+            groups[()] = grouping.accumulators()
+        row_type = self._row_type
+        for key, accumulators in groups.items():
+            yield Entry(row_type(*key, *(accumulator.result() for accumulator in accumulators)))
+
+
+class StreamAggregate(HashAggregate):
+    """HashAggregate for a source whose Entries come ordered by the keys
+    of grouping, such as an OrderedScan of the column grouped by: each
+    group is produced as soon as its last row has been read, and only the
+    accumulators of that one group are kept."""
+
+    def __iter__(self) -> Iterator[Entry]:
+        key_of, arguments, grouping, row_type = self._key, self._arguments, self.grouping, self._row_type
+        produced = False
+        for key, group in groupby(self.source, key=lambda entry: key_of(entry.row)):
+            accumulators = grouping.accumulators()
+            for entry in group:
+                row = entry.row
+                for accumulator, argument in zip(accumulators, arguments):
+                    accumulator.add(argument(row))
+            produced = True
+            yield Entry(row_type(*key, *(accumulator.result() for accumulator in accumulators)))
+        if not produced and not grouping.keys:
+            yield Entry(row_type(*(accumulator.result() for accumulator in grouping.accumulators())))
+
+
+def _grouping_functions(
+    grouping: Grouping, column_names: Sequence[str], column_types: Optional[Mapping[str, type]]
+) -> tuple[Callable[[Any], tuple], list[CompiledExpression]]:
+    """A function computing the tuple of the keys of grouping for a row,
+    and one computing the argument of each of its aggregate calls."""
+    keys = [compile_expression(key, column_names, column_types) for key in grouping.keys]
+    arguments = [
+        # COUNT(*) counts the row itself
+        (lambda row: row) if call.argument is None else compile_expression(call.argument, column_names, column_types)
+        for call in grouping.calls
+    ]
+    if len(keys) == 1:
+        (key,) = keys
+        return (lambda row: (key(row),)), arguments
+    return (lambda row: tuple(key(row) for key in keys)), arguments
+
+
+class HashJoin:
+    """The Entries of left joined to the Entries of right whose keys are
+    equal, each holding the fields of the left Entry followed by those of
+    the right one. left_key and right_key compute the tuple of the keys
+    of a row of either side; keys holding NULL match nothing.
+
+    The side build_left names, which should be the smaller, is read whole
+    into a dict of its rows by key before the first Entry is produced; the
+    other is then streamed through, each of its rows looking up its
+    matches, so that joining takes time linear in the sizes of the inputs
+    and of the result, and memory in that of the build side only."""
+
+    def __init__(
+        self,
+        left: Iterable[Entry],
+        right: Iterable[Entry],
+        left_key: Callable[[Any], tuple],
+        right_key: Callable[[Any], tuple],
+        build_left: bool = False,
+    ):
+        self.left = left
+        self.right = right
+        self.left_key = left_key
+        self.right_key = right_key
+        self.build_left = build_left
+
+    def __iter__(self) -> Iterator[Entry]:
+        if self.build_left:
+            build, build_key, probe, probe_key = self.left, self.left_key, self.right, self.right_key
+        else:
+            build, build_key, probe, probe_key = self.right, self.right_key, self.left, self.left_key
+        rows: dict[tuple, list[Any]] = {}
+        for entry in build:
+            key = build_key(entry.row)
+            if None not in key:
+                matches = rows.get(key)
+                if matches is None:
+                    rows[key] = [entry.row]
+                else:
+                    matches.append(entry.row)
+        for entry in probe:
+            row = entry.row
+            matches = rows.get(probe_key(row))
+            if matches is None:
+                continue
+            if self.build_left:
+                for match in matches:
+                    yield Entry(match + row)
+            else:
+                for match in matches:
+                    yield Entry(row + match)
+
+
+class MergeJoin:
+    """The Entries of left joined to the Entries of right with the same
+    key, each holding the fields of the left Entry followed by those of
+    the right one. left and right are (key, Entries) pairs in increasing
+    order of key, each key once and none NULL, such as the items of a
+    Column's tree (Column.items_between) or the key_groups of ordered
+    Entries; they are walked in step, so that every pair is read once."""
+
+    def __init__(
+        self,
+        left: Iterable[tuple[Any, Iterable[Entry]]],
+        right: Iterable[tuple[Any, Iterable[Entry]]],
+    ):
+        self.left = left
+        self.right = right
+
+    def __iter__(self) -> Iterator[Entry]:
+        left, right = iter(self.left), iter(self.right)
+        left_group, right_group = next(left, None), next(right, None)
+        if left_group is None or right_group is None:
+            return
+        left_key, right_key = sort_key(left_group[0]), sort_key(right_group[0])
+        while True:
+            if left_key < right_key:
+                left_group = next(left, None)
+                if left_group is None:
+                    return
+                left_key = sort_key(left_group[0])
+            elif right_key < left_key:
+                right_group = next(right, None)
+                if right_group is None:
+                    return
+                right_key = sort_key(right_group[0])
+            else:
+                matches = [entry.row for entry in right_group[1]]
+                for entry in left_group[1]:
+                    row = entry.row
+                    for match in matches:
+                        yield Entry(row + match)
+                left_group, right_group = next(left, None), next(right, None)
+                if left_group is None or right_group is None:
+                    return
+                left_key, right_key = sort_key(left_group[0]), sort_key(right_group[0])
+
+
+def key_groups(source: Iterable[Entry], key: Callable[[Any], Any]) -> Iterator[tuple[Any, list[Entry]]]:
+    """The Entries of source, which come ordered by key, grouped by key
+    into (key, Entries) pairs for MergeJoin. Entries whose key is NULL
+    are left out, as they match nothing."""
+    for value, group in groupby(source, key=lambda entry: key(entry.row)):
+        if value is not None:
+            yield value, list(group)
+
+
+class IndexNestedLoopJoin:
+    """Each Entry of left joined to the Entries of a table holding the
+    key of the left Entry in column, a Column of that table, and for
+    which where (if any) is true. Each joined Entry holds the fields of
+    the left Entry followed by those of the right one.
+
+    The matches of every left Entry are looked up in column, so only
+    they are read from the table, and the left side is streamed."""
+
+    def __init__(
+        self,
+        left: Iterable[Entry],
+        column: Column,
+        left_key: Callable[[Any], Any],
+        where: Optional[CompiledExpression] = None,
+    ):
+        self.left = left
+        self.column = column
+        self.left_key = left_key
+        self.where = where
+
+    def __iter__(self) -> Iterator[Entry]:
+        get, key_of, where = self.column.entries, self.left_key, self.where
+        column_type = self.column.type
+        for entry in self.left:
+            row = entry.row
+            key = key_of(row)
+            # a key the Column's tree cannot be searched for, such as text
+            # for an INTEGER column, matches nothing, as in a hash join
+            if key is None or (type(key) is not column_type and not comparable(column_type, key)):
+                continue
+            for match in get(key):
+                if where is None or where(match.row):
+                    yield Entry(row + match.row)
+
+
+class NestedLoopJoin:
+    """Every Entry of left joined to every Entry of right, each holding
+    the fields of the left Entry followed by those of the right one.
+    right is read once, into a list, when the first Entry is asked for."""
+
+    def __init__(self, left: Iterable[Entry], right: Iterable[Entry]):
+        self.left = left
+        self.right = right
+
+    def __iter__(self) -> Iterator[Entry]:
+        right = [entry.row for entry in self.right]
+        if not right:
+            return
+        for entry in self.left:
+            row = entry.row
+            for match in right:
+                yield Entry(row + match)
+
+
+def join_key(
+    exprs: Sequence[Expression], column_names: Sequence[str], column_types: Optional[Mapping[str, type]] = None
+) -> Callable[[Any], tuple]:
+    """A function computing the tuple of the values of exprs for a row,
+    for HashJoin."""
+    keys = [compile_expression(expr, column_names, column_types) for expr in exprs]
+    if len(keys) == 1:
+        (key,) = keys
+        return lambda row: (key(row),)
+    return lambda row: tuple(key(row) for key in keys)
+
+
+class Limit:
+    """At most limit rows of source after skipping the first offset.
+    Stops pulling rows from source as soon as the limit is reached."""
+
+    def __init__(self, source: Iterable[Any], limit: Optional[int], offset: int = 0):
+        if (limit is not None and limit < 0) or offset < 0:
+            raise ValueError(f"LIMIT and OFFSET must not be negative, got {limit} and {offset}")
+        self.source = source
+        self.limit = limit
+        self.offset = offset
+
+    def __iter__(self) -> Iterator[Any]:
+        stop = None if self.limit is None else self.offset + self.limit
+        return islice(self.source, self.offset, stop)
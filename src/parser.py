@@ -1,18 +1,38 @@
 from typing import Optional
 
-from baseparser import BaseParser
+from baseparser import BaseParser, ParsingException
+from createtableparser import CreateTableParser
+from droptableparser import DropTableParser
 from insertparser import InsertStatementParser
 from selectparser import SelectStatementParser
 from signednumberparser import SignedNumberParser
 from sqltoken import TokenType
-from statements import InsertStatement, SelectStatement
+from statements import (
+    CreateTableStatement,
+    DropTableStatement,
+    ExplainStatement,
+    InsertStatement,
+    SelectStatement,
+    UpdateStatement,
+)
+from updateparser import UpdateParser
 
 
 # any 'parseXxxIfMatches()' function should catch any error and return None
 # any other 'parse()' function should return the appropriate data object
 class Parser(BaseParser):
-    # parse any statement
+    # parse any statement, which must end the input
     def parse(self):
+        statement = self.parseStatementIfMatches()
+        if statement is not None:
+            self.expectStatementEnd()
+        return statement
+
+    def parseStatementIfMatches(self):
+        statement = self.parseExplainStatementIfMatches()
+        if statement is not None:
+            return statement
+
         statement = self.parseSelectStatementIfMatches()
         if statement is not None:
             return statement
@@ -21,18 +41,49 @@ class Parser(BaseParser):
         if statement is not None:
             return statement
 
-        # statment = self.parseCreateTableStatementIfMatches()
+        statement = self.parseUpdateStatementIfMatches()
+        if statement is not None:
+            return statement
+
+        statement = self.parseCreateTableStatementIfMatches()
+        if statement is not None:
+            return statement
+
+        statement = self.parseDropTableStatementIfMatches()
         if statement is not None:
             return statement
 
+    # on failure the shared token cursor is rewound to where parsing started
     def parseNumericLiteralIfMatches(self) -> Optional[int]:
+        mark = self.tokens.mark()
         try:
-            parser = SignedNumberParser()
+            parser = SignedNumberParser(self.tokens)
             return parser.parse()
         except:
+            self.tokens.reset(mark)
+            return None
+
+    def parseExplainStatementIfMatches(self) -> Optional[ExplainStatement]:
+        mark = self.tokens.mark()
+        try:
+            if not self.typeMatches(TokenType.KEYWORD) or not self.valueMatches(
+                "EXPLAIN"
+            ):
+                return None
+            self.consume(TokenType.KEYWORD, "EXPLAIN")
+            # QUERY and PLAN are not reserved, so they stay usable as names
+            self.consume(TokenType.IDENTIFIER, "QUERY")
+            self.consume(TokenType.IDENTIFIER, "PLAN")
+            statement = Parser(self.tokens).parse()
+            if statement is None:
+                raise ParsingException("EXPLAIN QUERY PLAN must be followed by a statement")
+            return ExplainStatement(statement)
+        except:
+            self.tokens.reset(mark)
             return None
 
     def parseSelectStatementIfMatches(self) -> Optional[SelectStatement]:
+        mark = self.tokens.mark()
         try:
             if not self.typeMatches(TokenType.KEYWORD) or not self.valueMatches(
                 "SELECT"
@@ -41,9 +92,11 @@ class Parser(BaseParser):
             parser = SelectStatementParser(self.tokens)
             return parser.parse()
         except:
+            self.tokens.reset(mark)
             return None
 
     def parseInsertStatementIfMatches(self) -> Optional[InsertStatement]:
+        mark = self.tokens.mark()
         try:
             if not self.typeMatches(TokenType.KEYWORD) or not self.valueMatches(
                 "INSERT"
@@ -52,4 +105,44 @@ class Parser(BaseParser):
             parser = InsertStatementParser(self.tokens)
             return parser.parse()
         except:
+            self.tokens.reset(mark)
+            return None
+
+    def parseUpdateStatementIfMatches(self) -> Optional[UpdateStatement]:
+        mark = self.tokens.mark()
+        try:
+            if not self.typeMatches(TokenType.KEYWORD) or not self.valueMatches(
+                "UPDATE"
+            ):
+                return None
+            parser = UpdateParser(self.tokens)
+            return parser.parse()
+        except:
+            self.tokens.reset(mark)
+            return None
+
+    def parseCreateTableStatementIfMatches(self) -> Optional[CreateTableStatement]:
+        mark = self.tokens.mark()
+        try:
+            if not self.typeMatches(TokenType.KEYWORD) or not self.valueMatches(
+                "CREATE"
+            ):
+                return None
+            parser = CreateTableParser(self.tokens)
+            return parser.parse()
+        except:
+            self.tokens.reset(mark)
+            return None
+
+    def parseDropTableStatementIfMatches(self) -> Optional[DropTableStatement]:
+        mark = self.tokens.mark()
+        try:
+            if not self.typeMatches(TokenType.KEYWORD) or not self.valueMatches(
+                "DROP"
+            ):
+                return None
+            parser = DropTableParser(self.tokens)
+            return parser.parse()
+        except:
+            self.tokens.reset(mark)
             return None
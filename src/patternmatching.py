@@ -0,0 +1,208 @@
+"""Evaluation of the LIKE, GLOB and REGEXP operators (Expression route 11).
+
+Patterns are translated into Python regular expressions, and compiled
+ones are kept in an LRU cache keyed on (pattern, escape, operator) so
+evaluating the same predicate for every row of a scan compiles it once.
+
+The semantics follow SQLite: LIKE matches % against any run of
+characters and _ against any single one, ignoring case for ASCII
+letters only; GLOB matches *, ? and [...] sets and is case sensitive;
+X REGEXP Y is true if the regular expression Y matches anywhere in X.
+MATCH is reserved for full-text search, which is not supported."""
+import re
+from functools import lru_cache
+from typing import Any, Callable, Optional
+
+PATTERN_CACHE_SIZE = 256
+
+# A LIKE prefix with more ASCII letters than this is shortened before
+# building index ranges, as every letter doubles the number of ranges.
+MAX_CASED_PREFIX_LETTERS = 4
+
+def split_operator(operator: str) -> tuple[str, bool]:
+    """Splits a route 11 operator such as "NOT LIKE" into the base operator
+    and whether its result is negated."""
+    if operator.startswith("NOT "):
+        return operator[4:], True
+    return operator, False
+
+
+@lru_cache(maxsize=PATTERN_CACHE_SIZE)
+def compile_pattern(pattern: str, escape: Optional[str], operator: str) -> re.Pattern:
+    """The compiled regular expression for pattern under operator, which
+    is LIKE, GLOB or REGEXP without any NOT. escape is the LIKE ESCAPE
+    character, or None."""
+    if escape is not None and operator != "LIKE":
+        raise ValueError(f"ESCAPE can only be used with LIKE, not {operator}")
+    if operator == "LIKE":
+        return re.compile(_like_to_regex(pattern, escape), re.DOTALL | re.IGNORECASE | re.ASCII)
+    if operator == "GLOB":
+        return re.compile(_glob_to_regex(pattern), re.DOTALL)
+    if operator == "REGEXP":
+        return re.compile(pattern)
+    if operator == "MATCH":
+        raise ValueError("MATCH requires a full-text search table, which is not supported")
+    raise ValueError(f"Invalid pattern matching operator '{operator}'")
+
+
+def match_pattern(operator: str, value: Any, pattern: Any, escape: Any = None) -> Optional[bool]:
+    """value <operator> pattern [ESCAPE escape], NULL if value or pattern
+    is. Callers handle a NULL ESCAPE, which also makes the result NULL."""
+    if value is None or pattern is None:
+        return None
+    return value_matcher(operator, pattern, escape)(value)
+
+
+def value_matcher(operator: str, pattern: Any, escape: Any = None) -> Callable[[Any], Optional[bool]]:
+    """A function computing value <operator> pattern [ESCAPE escape] for
+    any value, for a pattern (and escape) known not to be NULL. Use it to
+    apply one pattern to many values without looking up its regex again."""
+    base, negated = split_operator(operator)
+    if escape is not None:
+        escape = as_text(escape)
+        if len(escape) != 1:
+            raise ValueError("ESCAPE expression must be a single character")
+    regex = compile_pattern(as_text(pattern), escape, base)
+    # LIKE and GLOB patterns match the whole string, REGEXP any part of it
+    search = regex.search if base == "REGEXP" else regex.fullmatch
+
+    def match(value: Any) -> Optional[bool]:
+        if value is None:
+            return None
+        return (search(as_text(value)) is None) is negated
+
+    return match
+
+
+def as_text(value: Any) -> str:
+    """value as the text pattern matching operates on. Numbers match by
+    their text form, like SQLite does."""
+    if isinstance(value, str):
+        return value
+    if isinstance(value, bytes):
+        return value.decode("utf-8", errors="replace")
+    return str(value)
+
+
+def _like_to_regex(pattern: str, escape: Optional[str]) -> str:
+    parts = []
+    chars = iter(pattern)
+    for char in chars:
+        if char == escape:
+            # an escape at the very end matches nothing, as in SQLite
+            following = next(chars, None)
+            if following is None:
+                return r"(?!)"
+            parts.append(re.escape(following))
+        elif char == "%":
+            parts.append(".*")
+        elif char == "_":
+            parts.append(".")
+        else:
+            parts.append(re.escape(char))
+    return "".join(parts)
+
+
+def _glob_to_regex(pattern: str) -> str:
+    parts = []
+    i, n = 0, len(pattern)
+    while i < n:
+        char = pattern[i]
+        i += 1
+        if char == "*":
+            parts.append(".*")
+        elif char == "?":
+            parts.append(".")
+        elif char == "[":
+            end = _set_end(pattern, i)
+            if end is None:
+                parts.append(re.escape(char))
+                continue
+            parts.append(_glob_set(pattern[i:end]))
+            i = end + 1
+        else:
+            parts.append(re.escape(char))
+    return "".join(parts)
+
+
+def _set_end(pattern: str, start: int) -> Optional[int]:
+    """Index of the ] closing the set whose contents begin at start. A ]
+    first in the set (after any ^) is a member rather than the end."""
+    i = start
+    if i < len(pattern) and pattern[i] == "^":
+        i += 1
+    if i < len(pattern) and pattern[i] == "]":
+        i += 1
+    end = pattern.find("]", i)
+    return end if end != -1 else None
+
+
+def _glob_set(contents: str) -> str:
+    negated = contents.startswith("^")
+    if negated:
+        contents = contents[1:]
+    members = []
+    for i, char in enumerate(contents):
+        # a - between two members is a range, anywhere else a member
+        if char == "-" and 0 < i < len(contents) - 1:
+            members.append("-")
+        else:
+            members.append(re.escape(char))
+    return "[" + ("^" if negated else "") + "".join(members) + "]"
+
+
+def literal_prefix(operator: str, pattern: str, escape: Optional[str] = None) -> str:
+    """The text every string matched by the LIKE or GLOB pattern starts
+    with: the characters before its first wildcard."""
+    prefix = []
+    chars = iter(pattern)
+    for char in chars:
+        if operator == "LIKE":
+            if char == escape:
+                following = next(chars, None)
+                if following is None:
+                    break
+                prefix.append(following)
+                continue
+            if char in "%_":
+                break
+        elif char in "*?[":
+            break
+        prefix.append(char)
+    return "".join(prefix)
+
+
+def prefix_upper_bound(prefix: str) -> Optional[str]:
+    """The least string greater than every string starting with prefix,
+    or None if there is none (prefix is all maximal code points)."""
+    while prefix:
+        last = ord(prefix[-1])
+        if last < 0x10FFFF:
+            return prefix[:-1] + chr(last + 1)
+        prefix = prefix[:-1]
+    return None
+
+
+def prefix_ranges(operator: str, prefix: str) -> list[tuple[str, Optional[str]]]:
+    """(start, stop) ranges of strings, start inclusive and stop exclusive
+    (None for unbounded), that together hold every string the operator
+    could match with this literal prefix.
+
+    GLOB compares case sensitively so one range suffices. LIKE ignores the
+    case of ASCII letters, so there is one range for every combination of
+    cases of the letters in the prefix, after shortening it to at most
+    MAX_CASED_PREFIX_LETTERS of them. Returns [] when prefix is empty."""
+    if operator == "LIKE":
+        variants = [""]
+        letters = 0
+        for char in prefix:
+            if char.isascii() and char.isalpha():
+                letters += 1
+                if letters > MAX_CASED_PREFIX_LETTERS:
+                    break
+                variants = [v + c for v in variants for c in (char.upper(), char.lower())]
+            else:
+                variants = [v + char for v in variants]
+    else:
+        variants = [prefix]
+    return [(variant, prefix_upper_bound(variant)) for variant in sorted(variants) if variant]
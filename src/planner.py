@@ -0,0 +1,516 @@
+"""Choosing how to find the rows a WHERE clause can match.
+
+Without help a filter is evaluated against every row of the table. But
+every Column keeps its keys in a binary tree, so a conjunct of the filter
+comparing a column with a constant selects rows the tree finds directly:
+
+- `col = 5`, `col IS 5`: the Entries under key 5 (IndexLookup)
+- `col IS NULL`, `col ISNULL`: the Entries holding None (NullLookup)
+- `col < 5`, `col BETWEEN 1 AND 5`, ...: the keys in a range (RangeScan),
+  with all range conjuncts on the same column combined into one range
+- `col LIKE 'abc%'`, `col GLOB 'abc*'`: the keys starting with the
+  constant prefix of the pattern (a RangeScan over a superset)
+
+access_plans costs each of these, and a scan of the whole table, from
+the statistics of the table's Columns, and choose_access_path picks the
+cheapest. What is left is the residual predicate that still has to be
+evaluated over the rows it finds: the conjuncts the access path does not
+answer exactly. AccessPlan.explain describes the choice as a tree of
+PlanNodes, which EXPLAIN QUERY PLAN returns.
+
+For ORDER BY a column, plan_table_access also weighs the plans reading
+rows in the order of that column's tree (OrderedScan, or a lookup or
+range on it) against sorting what the other plans read.
+
+The filter itself is prepared by order_filter, which puts the operands
+of its ANDs and ORs in the order that should evaluate fastest."""
+import math
+from dataclasses import dataclass, field, replace
+from operator import attrgetter
+from typing import Any, Iterable, Iterator, Optional, Union
+
+from batchevaluator import referenced_columns
+from constantfolding import fold_constants
+from data import Entry, Table
+from expressioncompiler import constant_pattern, has_constant_pattern
+from expressionparser import ExpressionParser
+from patternmatching import literal_prefix, prefix_ranges
+from selectivity import (
+    EQUALITY_OPERATORS,
+    PATTERN_SELECTIVITY,
+    RANGE_OPERATORS,
+    estimate_cost,
+    estimate_selectivity,
+    range_selectivity,
+    reorder_predicates,
+)
+from statements import BinaryOperator, Expression, children
+
+# Cost of reading one Entry, relative to searching one level of a tree or
+# evaluating one operator of a filter
+ROW_COST = 1.0
+
+
+@dataclass
+class KeyRange:
+    """Keys between start and stop, None standing for no bound."""
+    start: Any = None
+    stop: Any = None
+    include_start: bool = True
+    include_stop: bool = True
+
+    def intersect(self, other: "KeyRange") -> "KeyRange":
+        start, include_start = _tighter_bound(
+            self.start, self.include_start, other.start, other.include_start, lower=True
+        )
+        stop, include_stop = _tighter_bound(self.stop, self.include_stop, other.stop, other.include_stop, lower=False)
+        return KeyRange(start, stop, include_start, include_stop)
+
+    def is_empty(self) -> bool:
+        if self.start is None or self.stop is None:
+            return False
+        if self.start == self.stop:
+            return not (self.include_start and self.include_stop)
+        return self.start > self.stop
+
+
+def _tighter_bound(a: Any, include_a: bool, b: Any, include_b: bool, lower: bool) -> tuple[Any, bool]:
+    """The more restrictive of two lower (or upper) bounds."""
+    if a is None:
+        return b, include_b
+    if b is None:
+        return a, include_a
+    if a == b:
+        return a, include_a and include_b
+    # the greater of two lower bounds is the tighter, and vice versa
+    return (a, include_a) if (a > b) == lower else (b, include_b)
+
+
+@dataclass
+class IndexLookup:
+    """The Entries whose value in column is key."""
+    column: str
+    key: Any
+
+    def entries(self, table: Table) -> Iterator[Entry]:
+        yield from table[self.column].entries(self.key)
+
+    def count(self, table: Table) -> int:
+        return len(table[self.column].entries(self.key))
+
+    def describe(self) -> str:
+        return f"{self.column}=?"
+
+
+@dataclass
+class NullLookup:
+    """The Entries holding None in column."""
+    column: str
+
+    def entries(self, table: Table) -> Iterator[Entry]:
+        yield from table[self.column].entries(None)
+
+    def count(self, table: Table) -> int:
+        return len(table[self.column].none_entries)
+
+    def describe(self) -> str:
+        return f"{self.column} IS NULL"
+
+
+@dataclass
+class RangeScan:
+    """The Entries whose value in column lies in any of ranges, in key
+    order within each range, or in descending key order within each range
+    and with the ranges taken last to first when descending."""
+    column: str
+    ranges: list[KeyRange]
+    descending: bool = False
+
+    def entries(self, table: Table) -> Iterator[Entry]:
+        column = table[self.column]
+        for key_range in reversed(self.ranges) if self.descending else self.ranges:
+            if key_range.is_empty():
+                continue
+            start, stop = key_range.start, key_range.stop
+            for key, group in column.items_between(start, stop, reverse=self.descending):
+                if (key == start and not key_range.include_start) or (key == stop and not key_range.include_stop):
+                    continue
+                yield from group
+
+    def describe(self) -> str:
+        described = []
+        for key_range in self.ranges:
+            bounds = []
+            if key_range.start is not None:
+                bounds.append(f"{self.column}>{'=' if key_range.include_start else ''}?")
+            if key_range.stop is not None:
+                bounds.append(f"{self.column}<{'=' if key_range.include_stop else ''}?")
+            described.append(" AND ".join(bounds))
+        return " OR ".join(described)
+
+
+@dataclass
+class OrderedScan:
+    """Every Entry, in the order of their values in column: those holding
+    None first, as NULL sorts before any value, or last when descending."""
+    column: str
+    descending: bool = False
+
+    def entries(self, table: Table) -> Iterator[Entry]:
+        column = table[self.column]
+        if not self.descending:
+            yield from column.entries(None)
+        for _, group in column.items_between(reverse=self.descending):
+            yield from group
+        if self.descending:
+            yield from column.entries(None)
+
+
+AccessPath = Union[IndexLookup, NullLookup, RangeScan, OrderedScan]
+
+
+def conjuncts(expr: Expression) -> Iterator[Expression]:
+    """The expressions ANDed together at the top of expr."""
+    if expr.route == 8 and len(expr.expr_array) == 1:
+        yield from conjuncts(expr.expr_array[0])
+    elif expr.route == 6 and expr.binary_op == BinaryOperator.AND:
+        yield from conjuncts(expr.lead_expr)
+        yield from conjuncts(expr.second_expr)
+    else:
+        yield expr
+
+
+def pattern_scan(expr: Expression, table: Table) -> Optional[RangeScan]:
+    """The RangeScan for a `column LIKE 'prefix%'` or `column GLOB
+    'prefix*'` predicate on a TEXT column, None if expr is not one."""
+    if expr.route != 11 or expr.binary_op not in ("LIKE", "GLOB"):
+        return None
+    if expr.lead_expr.route != 3 or not has_constant_pattern(expr):
+        return None
+    name = expr.lead_expr.lead_expr.column_name
+    if name not in table.tbl or table[name].type is not str:
+        return None
+    pattern, escape = constant_pattern(expr)
+    if not isinstance(pattern, str) or not (escape is None or isinstance(escape, str) and len(escape) == 1):
+        return None
+    ranges = prefix_ranges(expr.binary_op, literal_prefix(expr.binary_op, pattern, escape))
+    if not ranges:
+        return None
+    return RangeScan(name, [KeyRange(start, stop, include_stop=False) for start, stop in ranges])
+
+
+def lookup(expr: Expression, table: Table) -> Optional[Union[IndexLookup, NullLookup]]:
+    """The IndexLookup or NullLookup finding exactly the rows expr is true
+    for, if it is `col = constant`, `col IS constant` or `col IS NULL`."""
+    if expr.route == 12 and expr.unary_op == "ISNULL":
+        name = _indexed_column(expr.lead_expr, table)
+        return NullLookup(name) if name is not None else None
+    if expr.route == 13 and expr.binary_op in ("IS", "IS NOT DISTINCT FROM"):
+        comparison = _column_comparison(expr.lead_expr, BinaryOperator.EQLS, expr.second_expr, table, allow_null=True)
+        if comparison is None:
+            return None
+        name, _, value = comparison
+        return NullLookup(name) if value is None else IndexLookup(name, value)
+    if expr.route == 6 and expr.binary_op in EQUALITY_OPERATORS:
+        comparison = _column_comparison(expr.lead_expr, expr.binary_op, expr.second_expr, table)
+        if comparison is not None:
+            return IndexLookup(comparison[0], comparison[2])
+    return None
+
+
+def key_range(expr: Expression, table: Table) -> Optional[tuple[str, KeyRange]]:
+    """The column and KeyRange holding exactly the rows expr is true for,
+    if it is `col < constant` (or <=, >, >=) or `col BETWEEN a AND b`."""
+    if expr.route == 14 and expr.binary_op == "BETWEEN":
+        low = _column_comparison(expr.lead_expr, BinaryOperator.GREATER_EQ, expr.second_expr, table)
+        high = _column_comparison(expr.lead_expr, BinaryOperator.LESS_EQ, expr.third_expr, table)
+        if low is None or high is None:
+            return None
+        return low[0], KeyRange(low[2], high[2])
+    if expr.route != 6 or expr.binary_op not in RANGE_OPERATORS:
+        return None
+    comparison = _column_comparison(expr.lead_expr, expr.binary_op, expr.second_expr, table)
+    if comparison is None:
+        return None
+    name, operator, value = comparison
+    if operator == BinaryOperator.LESS:
+        return name, KeyRange(stop=value, include_stop=False)
+    if operator == BinaryOperator.LESS_EQ:
+        return name, KeyRange(stop=value)
+    if operator == BinaryOperator.GREATER:
+        return name, KeyRange(start=value, include_start=False)
+    return name, KeyRange(start=value)
+
+
+def _column_comparison(
+    lead: Expression, operator: BinaryOperator, second: Expression, table: Table, allow_null: bool = False
+) -> Optional[tuple[str, BinaryOperator, Any]]:
+    """(column, operator, value) for a comparison of an indexed column
+    with a literal its keys can be compared to, put with the column on the
+    left, e.g. `5 > col` as (col, <, 5)."""
+    name = _indexed_column(lead, table)
+    literal = second
+    if name is None:
+        name = _indexed_column(second, table)
+        literal = lead
+        operator = RANGE_OPERATORS.get(operator, operator)
+    if name is None or literal.route != 1:
+        return None
+    value = literal.lead_expr.value
+    if value is None:
+        return (name, operator, None) if allow_null else None
+    if not comparable(table[name].type, value):
+        return None
+    return name, operator, value
+
+
+def _indexed_column(expr: Expression, table: Table) -> Optional[str]:
+    if expr.route == 3 and expr.lead_expr.column_name in table.tbl:
+        return expr.lead_expr.column_name
+    return None
+
+
+def comparable(column_type: type, value: Any) -> bool:
+    """True if value can be compared with the keys of a column of
+    column_type without raising, and compares as SQL would."""
+    if column_type in (str, bytes):
+        return isinstance(value, column_type)
+    return isinstance(value, (int, float)) and column_type in (int, float, bool)
+
+
+@dataclass
+class PlanNode:
+    """A step of a query plan, as shown by EXPLAIN QUERY PLAN: what it
+    does, the number of rows it is estimated to produce and the estimated
+    cost of producing them, including the cost of its children."""
+    detail: str
+    rows: float
+    cost: float
+    children: list["PlanNode"] = field(default_factory=list)
+
+    def flatten(self) -> list[dict[str, Any]]:
+        """The nodes of the tree in depth first order, one dict each like
+        the rows of SQLite's EXPLAIN QUERY PLAN: an id, the id of the
+        parent (0 for the root), the detail, and the rounded estimates."""
+        result: list[dict[str, Any]] = []
+
+        def visit(node: PlanNode, parent: int):
+            node_id = len(result) + 1
+            result.append(
+                {"id": node_id, "parent": parent, "detail": node.detail, "rows": round(node.rows), "cost": round(node.cost, 1)}
+            )
+            for child in node.children:
+                visit(child, node_id)
+
+        visit(self, 0)
+        return result
+
+
+@dataclass
+class AccessPlan:
+    """One way to read the rows a WHERE clause can match: through path,
+    or a scan of the whole table when it is None, evaluating residual over
+    every row read. rows_read and rows are the estimated numbers of rows
+    read and matching, read_cost and cost the estimated cost of reading
+    them and of reading and filtering them."""
+    path: Optional[AccessPath]
+    residual: Optional[Expression]
+    rows_read: float
+    rows: float
+    read_cost: float
+    cost: float
+    # set when the rows are read in the order asked of plan_table_access
+    ordered: bool = False
+
+    def explain(self, table_name: str) -> PlanNode:
+        if self.path is None:
+            access = PlanNode(f"SCAN {table_name}", self.rows_read, self.read_cost)
+        elif isinstance(self.path, OrderedScan):
+            access = PlanNode(f"SCAN {table_name} USING INDEX {self.path.column}", self.rows_read, self.read_cost)
+        else:
+            detail = f"SEARCH {table_name} USING INDEX {self.path.column} ({self.path.describe()})"
+            access = PlanNode(detail, self.rows_read, self.read_cost)
+        if self.residual is None:
+            return access
+        return PlanNode("FILTER", self.rows, self.cost, [access])
+
+
+def seek_cost(table: Table, column: str) -> float:
+    """Cost of finding one key in the tree of a Column, a step per level."""
+    return math.log2(len(table[column].tree) + 2)
+
+
+def access_plans(table: Table, where: Optional[Expression]) -> list[AccessPlan]:
+    """Every AccessPlan for where, starting with the scan of the whole
+    table: one per lookup, one per column with range conjuncts (all of
+    them combined) and one per pattern prefix.
+
+    Costs are counted in rows read (ROW_COST each), tree levels searched
+    and operators evaluated by the residual filter (see
+    selectivity.estimate_cost), with the number of rows a range finds
+    estimated from the ColumnStatistics of its column."""
+    rows = table.row_count()
+    if where is None:
+        return [AccessPlan(None, None, rows, rows, rows * ROW_COST, rows * ROW_COST)]
+    parts = list(conjuncts(where))
+    statistics = {name: table[name].statistics() for name in referenced_columns(where) if name in table.tbl}
+    matching = rows * estimate_selectivity(where, statistics)
+
+    # (path, indexes of the conjuncts it answers, rows read, read cost)
+    candidates: list[tuple[Optional[AccessPath], set[int], float, float]] = [(None, set(), rows, rows * ROW_COST)]
+    ranges: dict[str, tuple[KeyRange, set[int]]] = {}
+    for index, part in enumerate(parts):
+        path = lookup(part, table)
+        if path is not None:
+            found = path.count(table)
+            seek = seek_cost(table, path.column) if isinstance(path, IndexLookup) else 0.0
+            candidates.append((path, {index}, found, seek + found * ROW_COST))
+            continue
+        found_range = key_range(part, table)
+        if found_range is not None:
+            name, found_range = found_range
+            if name in ranges:
+                combined, indexes = ranges[name]
+                ranges[name] = (combined.intersect(found_range), indexes | {index})
+            else:
+                ranges[name] = (found_range, {index})
+            continue
+        scan = pattern_scan(part, table)
+        if scan is not None:
+            found = rows * PATTERN_SELECTIVITY
+            seek = seek_cost(table, scan.column) * len(scan.ranges)
+            candidates.append((scan, set(), found, seek + found * ROW_COST))
+    for name, (combined, indexes) in ranges.items():
+        stats = statistics[name]
+        found = 0.0 if combined.is_empty() or stats.rows == 0 else rows * range_selectivity(stats, combined.start, combined.stop)
+        candidates.append((RangeScan(name, [combined]), indexes, found, seek_cost(table, name) + found * ROW_COST))
+
+    plans = []
+    for path, answered, rows_read, read_cost in candidates:
+        residual = _residual(parts, answered)
+        if residual is None:
+            plans.append(AccessPlan(path, None, rows_read, rows_read, read_cost, read_cost))
+        else:
+            cost = read_cost + rows_read * estimate_cost(residual)
+            plans.append(AccessPlan(path, residual, rows_read, min(rows_read, matching), read_cost, cost))
+    return plans
+
+
+def choose_access_path(
+    table: Table, where: Optional[Expression]
+) -> tuple[Optional[AccessPath], Optional[Expression]]:
+    """The access path for where, and the residual predicate to evaluate
+    over the rows it finds (None if there is nothing left to check): those
+    of the cheapest of access_plans. The path is None when scanning the
+    table and filtering with where is cheapest."""
+    if where is None:
+        return None, None
+    plan = min(access_plans(table, where), key=attrgetter("cost"))
+    return plan.path, plan.residual
+
+
+def _residual(parts: list[Expression], answered: set[int]) -> Optional[Expression]:
+    remaining = [part for index, part in enumerate(parts) if index not in answered]
+    if not remaining:
+        return None
+    return ExpressionParser.balance(BinaryOperator.AND, remaining)
+
+
+def candidate_entries(table: Table, where: Optional[Expression]) -> Iterable[Entry]:
+    """The entries of table that where could be true for: those found by
+    its access path when it has one, else all of them."""
+    path, _ = choose_access_path(table, where)
+    if path is None:
+        return table.get_rows()
+    return path.entries(table)
+
+
+def plan_table_access(
+    table: Table,
+    where: Optional[Expression],
+    order: Optional[tuple[str, bool]] = None,
+    limit: Optional[int] = None,
+) -> AccessPlan:
+    """The cheapest AccessPlan for where after folding its constants, with
+    the residual predicate ordered by order_filter.
+
+    order is the (column, descending) order the rows are wanted in, if
+    any. Then plans reading them in that order (see ordered_plans) are
+    considered too, and the cost of sorting is added to the others. limit
+    is the number of rows that will be read at most: a plan reading rows
+    in the order wanted is stopped once it has found that many, and its
+    estimates are scaled down accordingly. So when the rows are to be
+    sorted in any other order, plan them without a limit."""
+    plans = access_plans(table, None if where is None else fold_constants(where))
+    if order is not None:
+        plans += ordered_plans(table, plans, *order)
+    if limit is not None:
+        plans = [_stop_early(plan, limit) if plan.ordered or order is None else plan for plan in plans]
+
+    def total_cost(plan: AccessPlan) -> float:
+        if order is None or plan.ordered:
+            return plan.cost
+        return plan.cost + sort_cost(plan.rows, limit)
+
+    plan = min(plans, key=total_cost)
+    if plan.residual is not None:
+        plan = replace(plan, residual=order_filter(table, plan.residual))
+    return plan
+
+
+def ordered_plans(table: Table, plans: list[AccessPlan], column: str, descending: bool) -> list[AccessPlan]:
+    """The plans reading rows in order of column (descending or not):
+    those of plans whose path finds them in that order anyway, and an
+    OrderedScan of column in place of the scan of the whole table."""
+    if column not in table.tbl:
+        return []
+    result = []
+    for plan in plans:
+        path = plan.path
+        if path is None:
+            # reading a Column's tree in order costs about as much as a scan
+            path = OrderedScan(column, descending)
+        elif isinstance(path, RangeScan) and path.column == column and len(path.ranges) == 1:
+            path = replace(path, descending=descending)
+        elif not isinstance(path, (IndexLookup, NullLookup)) or path.column != column:
+            continue
+        result.append(replace(plan, path=path, ordered=True))
+    return result
+
+
+def sort_cost(rows: float, limit: Optional[int] = None) -> float:
+    """Cost of sorting rows, or of keeping the first limit of them in a
+    heap, a comparison per level of the heap for every row."""
+    kept = rows if limit is None else min(rows, limit)
+    return rows * math.log2(kept + 2) * ROW_COST
+
+
+def _stop_early(plan: AccessPlan, limit: int) -> AccessPlan:
+    """plan stopped once it has found limit rows, assuming the rows it
+    finds are evenly spread over the rows it reads."""
+    if plan.rows <= limit:
+        return plan
+    fraction = limit / plan.rows
+    return replace(
+        plan,
+        rows_read=plan.rows_read * fraction,
+        rows=limit,
+        read_cost=plan.read_cost * fraction,
+        cost=plan.cost * fraction,
+    )
+
+
+def order_filter(table: Table, where: Expression) -> Expression:
+    """where, with constants folded and its ANDs and ORs reordered by the
+    statistics of the columns of table it reads (see reorder_predicates)."""
+    where = fold_constants(where)
+    if not _has_logical(where):
+        return where
+    statistics = {name: table[name].statistics() for name in referenced_columns(where) if name in table.tbl}
+    return reorder_predicates(where, statistics)
+
+
+def _has_logical(expr: Expression) -> bool:
+    if expr.route == 6 and expr.binary_op in (BinaryOperator.AND, BinaryOperator.OR):
+        return True
+    return any(_has_logical(child) for child in children(expr))
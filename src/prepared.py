@@ -0,0 +1,152 @@
+from dataclasses import fields, is_dataclass, replace
+from typing import Any, Iterator, Mapping, Optional, Sequence, TypeAlias, Union
+
+from baseexecuter import ExecutingException
+from baseparser import ParsingException
+from createtableexecuter import CreateTableExecuter
+from data import Database
+from explainexecutor import ExplainExecutor
+from insertexecutor import InsertTableExecutor
+from parser import Parser
+from selectexecuter import SelectExecuter
+from sqltokenizer import Tokenizer
+from statementcache import StatementCache
+from statements import (
+    CreateTableStatement,
+    ExplainStatement,
+    Expression,
+    InsertStatement,
+    Literal,
+    Parameter,
+    SelectStatement,
+    UpdateStatement,
+)
+from updateexecutor import UpdateExecutor
+
+Params: TypeAlias = Union[Sequence[Any], Mapping[str, Any]]
+
+EXECUTORS = {
+    InsertStatement: InsertTableExecutor,
+    SelectStatement: SelectExecuter,
+    UpdateStatement: UpdateExecutor,
+    CreateTableStatement: CreateTableExecuter,
+    ExplainStatement: ExplainExecutor,
+}
+
+
+def _children(node: Any) -> Iterator[Any]:
+    """Direct children of a statement tree node, in source order."""
+    if is_dataclass(node) and not isinstance(node, type):
+        for f in fields(node):
+            yield getattr(node, f.name)
+    elif isinstance(node, (list, tuple)):
+        yield from node
+    elif isinstance(node, dict):
+        yield from node.values()
+
+
+class PreparedStatement:
+    """A parsed statement whose bind parameters are filled in per execution.
+
+    Parameters are numbered like SQLite does: ?NNN takes index NNN, while a
+    bare ? and the first use of a :name take one more than the largest index
+    so far. Executing binds the values into a copy of only those parts of
+    the statement that contain parameters; the parsed statement itself is
+    never modified, so one handle can be executed any number of times."""
+
+    def __init__(self, statement: Any):
+        if type(statement) not in EXECUTORS:
+            raise ExecutingException(f"Cannot prepare statement of type {type(statement).__name__}")
+        self.statement = statement
+        self.parameter_count = 0
+        self.parameter_names: dict[str, int] = {}
+        # id() of each Parameter node -> 1-based index of its value
+        self._indexes: dict[int, int] = {}
+        # id() of every node with a Parameter somewhere beneath it
+        self._parameterized: set[int] = set()
+        self._number_parameters(statement)
+
+    def _number_parameters(self, node: Any) -> bool:
+        if isinstance(node, Parameter):
+            if node.index is not None:
+                index = node.index
+            elif node.name is not None and node.name in self.parameter_names:
+                index = self.parameter_names[node.name]
+            else:
+                index = self.parameter_count + 1
+            if node.name is not None:
+                self.parameter_names.setdefault(node.name, index)
+            self.parameter_count = max(self.parameter_count, index)
+            self._indexes[id(node)] = index
+            return True
+        # every child is visited so that numbering follows source order
+        found = False
+        for child in _children(node):
+            found = self._number_parameters(child) or found
+        if found:
+            self._parameterized.add(id(node))
+        return found
+
+    def _values_by_index(self, params: Params) -> list[Any]:
+        if isinstance(params, Mapping):
+            values: list[Any] = [None] * self.parameter_count
+            bound = set()
+            for name, index in self.parameter_names.items():
+                if name not in params:
+                    raise ExecutingException(f"No value supplied for parameter :{name}")
+                values[index - 1] = params[name]
+                bound.add(index)
+            if len(bound) != self.parameter_count:
+                raise ExecutingException("Positional parameters require a sequence of values")
+            return values
+        if len(params) != self.parameter_count:
+            raise ExecutingException(
+                f"Statement expects {self.parameter_count} parameter values, received {len(params)}"
+            )
+        return list(params)
+
+    def bind(self, params: Params = ()) -> Any:
+        """Returns a copy of the statement with each parameter replaced by
+        a literal holding its value. Subtrees without parameters are shared
+        with the prepared statement rather than copied."""
+        values = self._values_by_index(params)
+        if not self._parameterized:
+            return self.statement
+        return self._bind(self.statement, values)
+
+    def _bind(self, node: Any, values: list[Any]) -> Any:
+        if id(node) not in self._parameterized:
+            return node
+        if isinstance(node, Expression) and node.route == 2:
+            value = values[self._indexes[id(node.lead_expr)] - 1]
+            return Expression(route=1, lead_expr=Literal(type(value), value))
+        if isinstance(node, list):
+            return [self._bind(item, values) for item in node]
+        if isinstance(node, tuple):
+            return tuple(self._bind(item, values) for item in node)
+        if isinstance(node, dict):
+            return {key: self._bind(item, values) for key, item in node.items()}
+        changes = {
+            f.name: self._bind(getattr(node, f.name), values)
+            for f in fields(node)
+            if id(getattr(node, f.name)) in self._parameterized
+        }
+        return replace(node, **changes)
+
+    def execute(self, db: Database, params: Params = ()):
+        """Binds params and runs the statement against db, returning
+        whatever the statement's executor returns."""
+        statement = self.bind(params)
+        return EXECUTORS[type(self.statement)]().execute(db, statement)
+
+
+def prepare(sql: str, cache: Optional[StatementCache] = None) -> PreparedStatement:
+    """Parses sql once into a PreparedStatement that can be executed
+    repeatedly with different parameter values. When a StatementCache is
+    given, the parsed statement is taken from (and stored in) it."""
+    if cache is not None:
+        return PreparedStatement(cache.parse(sql))
+    statement = Parser(Tokenizer().tokenize(sql)).parse()
+    if statement is None:
+        raise ParsingException(f"Unable to parse statement: {sql}")
+    return PreparedStatement(statement)
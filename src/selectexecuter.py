@@ -1,47 +1,541 @@
+from collections import Counter, namedtuple
+from operator import itemgetter
+from typing import Any, Iterable, Mapping, NamedTuple, Optional
+
+from aggregation import Grouping, contains_aggregate
 from baseexecuter import ExecutingException
-from data import Database
-from statements import SelectStatement
+from batchevaluator import referenced_columns
+from constantfolding import fold_constants
+from cursor import Cursor
+from data import Column, Database, Entry, Table
+from expressioncompiler import compile_expression
+from expressionparser import ExpressionParser
+from joinplanner import (
+    HASH_JOIN,
+    INDEX_NESTED_LOOP_JOIN,
+    MERGE_JOIN,
+    JoinInput,
+    JoinScope,
+    TableInput,
+    input_column,
+    map_columns,
+    plan_join,
+    qualified_name,
+)
+from operators import (
+    Compute,
+    Filter,
+    HashAggregate,
+    HashJoin,
+    IndexNestedLoopJoin,
+    IndexScan,
+    Limit,
+    MergeJoin,
+    NestedLoopJoin,
+    Project,
+    Sort,
+    StreamAggregate,
+    TableScan,
+    join_key,
+    key_groups,
+)
+from ordering import ordering_key, sort_key
+from planner import AccessPlan, OrderedScan, PlanNode, order_filter, plan_table_access, sort_cost
+from selectivity import DEFAULT_SELECTIVITY
+from statements import (
+    BinaryOperator,
+    ColumnAddress,
+    Expression,
+    OrderingTerm,
+    QualifiedTableName,
+    SelectStatement,
+    children,
+)
+
+
+class Query(NamedTuple):
+    """The operators running a query, not yet started, the names of its
+    result columns and the plan the operators follow."""
+    rows: Iterable[dict[str, Any]]
+    columns: list[str]
+    plan: PlanNode
 
 
 class SelectExecuter:
     def execute(self, db: Database, input: SelectStatement):
-        schema = db[input.schema_name]
-        if input.table_name not in schema.keys():
-            if input.schema_name is None:
-                raise ExecutingException(
-                    f"Select table {input.table_name} not found in default schema"
+        """Runs the query, returning all of its rows as dicts mapping each
+        selected column to its value."""
+        return self.open(db, input).fetchall()
+
+    def open(self, db: Database, input: SelectStatement) -> Cursor:
+        """Starts the query, returning a Cursor the rows can be pulled from
+        incrementally. Rows are streamed from the table as they are
+        fetched rather than collected first."""
+        query = self.build(db, input)
+        return Cursor(query.rows, query.columns)
+
+    def plan(self, db: Database, input: SelectStatement) -> PlanNode:
+        """The plan open would follow for the query, for EXPLAIN QUERY PLAN."""
+        return self.build(db, input).plan
+
+    def build(self, db: Database, input: SelectStatement) -> Query:
+        if input.joins:
+            return self.build_join(db, input)
+        table, names, exprs = self.resolve(db, input)
+        if len(table.ordered_columns) == 0:
+            return Query([], [], PlanNode(f"SCAN {input.table_name}", 0, 0))  # Empty table
+        limit, offset = self.limit_and_offset(input)
+        order_by = self.ordering_terms(names, exprs, input.order_by)
+        having = input.having_expr
+        if having is not None:
+            # unlike in ORDER BY, a column of the table wins over an alias
+            aliases = {name: expr for name, expr in _aliases(names, exprs).items() if name not in table.tbl}
+            having = _replace_aliases(having, aliases)
+        self.check_columns(
+            table, input.table_name, [*(input.group_by or []), *([having] if having else []), *(t.expr for t in order_by)]
+        )
+        if input.where_expr is not None and contains_aggregate(input.where_expr):
+            raise ExecutingException("Aggregate functions are not allowed in WHERE")
+        if input.group_by is not None or having is not None or any(
+            _calls_function(expr) for expr in [*exprs, *(term.expr for term in order_by)]
+        ):
+            return self.build_aggregate(table, input, names, exprs, having, order_by, limit, offset)
+
+        column_types = {name: table[name].type for name in table.ordered_columns}
+        plan = self.plan_access(table, input.where_expr, order_by, limit, offset)
+        source, node = self.access(table, plan), plan.explain(input.table_name)
+        return self.finish(
+            source, node, table.ordered_columns, column_types, names, exprs, order_by, plan.ordered, limit, offset
+        )
+
+    def build_join(self, db: Database, input: SelectStatement) -> Query:
+        """build for a query reading several tables: they are joined as
+        joinplanner.plan_join finds cheapest, and the joined rows are then
+        grouped, sorted and computed from like the rows of one table."""
+        scope = JoinScope(
+            [
+                (
+                    table.alias or table.table_name,
+                    table.schema_name,
+                    table.table_name,
+                    self.find_table(db, table.schema_name, table.table_name),
                 )
-            raise ExecutingException(
-                f"Select table {input.table_name} not found in schema {input.schema_name}"
+                for table in [
+                    QualifiedTableName(input.table_name, input.schema_name, input.alias),
+                    *(join.table for join in input.joins),
+                ]
+            ]
+        )
+        if input.columns:
+            names = list(input.columns)
+            if input.column_exprs is not None:
+                exprs = list(input.column_exprs)
+            else:
+                exprs = [Expression(route=3, lead_expr=ColumnAddress(name)) for name in names]
+        else:
+            # every column of every table, named by its table only when
+            # another table has a column of the same name
+            columns = [(binding, column) for binding, table in scope.tables.items() for column in table.ordered_columns]
+            counts = Counter(column for _, column in columns)
+            names = [column if counts[column] == 1 else qualified_name(binding, column) for binding, column in columns]
+            exprs = [Expression(route=3, lead_expr=ColumnAddress(column, binding)) for binding, column in columns]
+        limit, offset = self.limit_and_offset(input)
+        order_by = self.ordering_terms(names, exprs, input.order_by)
+        having = input.having_expr
+        if having is not None:
+            aliases = {
+                name: expr
+                for name, expr in _aliases(names, exprs).items()
+                if not any(name in table.tbl for table in scope.tables.values())
+            }
+            having = _replace_aliases(having, aliases)
+        conditions = [input.where_expr, *(join.on_expr for join in input.joins)]
+        if any(condition is not None and contains_aggregate(condition) for condition in conditions):
+            raise ExecutingException("Aggregate functions are not allowed in WHERE or ON")
+        conditions = [scope.qualify(condition) for condition in conditions if condition is not None]
+        where = ExpressionParser.balance(BinaryOperator.AND, conditions) if conditions else None
+        exprs = [scope.qualify(expr) for expr in exprs]
+        order_by = [OrderingTerm(scope.qualify(term.expr), term.descending) for term in order_by]
+        having = None if having is None else scope.qualify(having)
+
+        plan = plan_join(scope, where)
+        source, node = self.join(scope, plan)
+        column_names, column_types = plan.columns, scope.column_types()
+        if input.group_by is None and having is None and not any(
+            _calls_function(expr) for expr in [*exprs, *(term.expr for term in order_by)]
+        ):
+            return self.finish(source, node, column_names, column_types, names, exprs, order_by, False, limit, offset)
+        grouping = Grouping([scope.qualify(key) for key in input.group_by or []])
+        results, having, order_by = self.rewrite_grouped(grouping, exprs, having, order_by)
+        columns = {
+            qualified_name(binding, column): table[column]
+            for binding, table in scope.tables.items()
+            for column in table.ordered_columns
+        }
+        groups = self.estimate_groups(columns, grouping, node.rows)
+        source = HashAggregate(source, grouping, column_names, column_types)
+        node = PlanNode("HASH AGGREGATE", groups, node.cost + node.rows * (1 + len(grouping.calls)), [node])
+        return self.finish_grouped(source, node, grouping, names, results, having, order_by, False, limit, offset)
+
+    def join(self, scope: JoinScope, plan: JoinInput) -> tuple[Iterable[Entry], PlanNode]:
+        """The operators joining the tables as plan says, and its plan node."""
+        if isinstance(plan, TableInput):
+            return self.access(plan.table, plan.plan), plan.explain()
+        column_types = scope.column_types()
+        if plan.method == MERGE_JOIN:
+            source: Iterable[Entry] = MergeJoin(
+                self.key_groups(plan.left, plan.left_keys[0]), self.key_groups(plan.right, plan.right_keys[0])
             )
-        table = schema[input.table_name]
+        elif plan.method == INDEX_NESTED_LOOP_JOIN:
+            left, _ = self.join(scope, plan.left)
+            right = plan.right
+            left_key = compile_expression(plan.left_keys[0], plan.left.columns, column_types)
+            where = None
+            if right.where is not None:
+                table_types = {name: right.table[name].type for name in right.table.ordered_columns}
+                where = compile_expression(order_filter(right.table, right.where), right.table.ordered_columns, table_types)
+            column = right.table[input_column(plan.right_keys[0], right)]
+            source = IndexNestedLoopJoin(left, column, left_key, where)
+        else:
+            left, _ = self.join(scope, plan.left)
+            right, _ = self.join(scope, plan.right)
+            if plan.method == HASH_JOIN:
+                left_key = join_key(plan.left_keys, plan.left.columns, column_types)
+                right_key = join_key(plan.right_keys, plan.right.columns, column_types)
+                source = HashJoin(left, right, left_key, right_key, plan.build_left)
+            else:
+                source = NestedLoopJoin(left, right)
+        if plan.residual is not None:
+            source = Filter(source, plan.residual, plan.columns, column_types)
+        return source, plan.explain()
+
+    def key_groups(self, input: TableInput, key: Expression) -> Iterable[tuple[Any, list[Entry]]]:
+        """The rows of input grouped by key, a column of its table, in
+        increasing order of key, for a MergeJoin: straight from the tree
+        of the column when all of its rows are wanted."""
+        column = input_column(key, input)
+        plan = input.plan
+        if isinstance(plan.path, OrderedScan) and plan.residual is None:
+            return input.table[column].items_between()
+        source = self.access(input.table, plan)
+        position = input.table.ordered_columns.index(column)
+        if not plan.ordered:
+            source = Sort(source, lambda entry: sort_key(entry.row[position]))
+        return key_groups(source, itemgetter(position))
+
+    def finish(
+        self,
+        source: Iterable[Entry],
+        node: PlanNode,
+        column_names: list[str],
+        column_types: dict[str, Optional[type]],
+        names: list[str],
+        exprs: list[Expression],
+        order_by: list[OrderingTerm],
+        ordered: bool,
+        limit: Optional[int],
+        offset: int,
+    ) -> Query:
+        """The query computing the result columns from the rows of source,
+        whose fields are named column_names: sorted by order_by unless
+        they come ordered, and cut down to LIMIT and OFFSET."""
+        if order_by and not ordered:
+            source, node = self.sort(source, node, order_by, column_names, column_types, limit, offset)
+        source, node = self.limit(source, node, limit, offset)
+        if all(expr.route == 3 and expr.lead_expr.column_name == name for name, expr in zip(names, exprs)):
+            rows = Project(source, names, column_names)
+        else:
+            rows = Compute(source, exprs, names, column_names, column_types)
+        return Query(rows, names, node)
+
+    def build_aggregate(
+        self,
+        table: Table,
+        input: SelectStatement,
+        names: list[str],
+        exprs: list[Expression],
+        having: Optional[Expression],
+        order_by: list[OrderingTerm],
+        limit: Optional[int],
+        offset: int,
+    ) -> Query:
+        """build for a query with GROUP BY, HAVING or aggregate functions:
+        its rows are aggregated into one row per group (see
+        aggregation.Grouping), which HAVING, ORDER BY and the result
+        columns are then computed from."""
+        grouping = Grouping(input.group_by or [])
+        results, having, order_by = self.rewrite_grouped(grouping, exprs, having, order_by)
+        column_types = {name: table[name].type for name in table.ordered_columns}
+
+        ordered_by_key = len(order_by) == 1 and order_by[0].expr.lead_expr == ColumnAddress("key0")
+        row = self.aggregate_from_indexes(table, grouping, input.where_expr)
+        grouped_in_order = False
+        if row is not None:
+            source: Iterable[Entry] = [row]
+            node = PlanNode(f"SEARCH {input.table_name} USING INDEX STATISTICS", 1, len(grouping.calls))
+        else:
+            # grouping by a column, its tree can hand over the rows group
+            # by group, in the direction ORDER BY wants them if it is by
+            # that column too
+            order = None
+            keys = grouping.keys
+            if len(keys) == 1 and keys[0].route == 3 and keys[0].lead_expr.column_name in table.tbl:
+                order = (keys[0].lead_expr.column_name, ordered_by_key and order_by[0].descending)
+            plan = plan_table_access(table, input.where_expr, order)
+            source, node = self.access(table, plan), plan.explain(input.table_name)
+            groups = self.estimate_groups(table.tbl, grouping, node.rows)
+            cost = node.cost + node.rows * (1 + len(grouping.calls))
+            if plan.ordered:
+                source = StreamAggregate(source, grouping, table.ordered_columns, column_types)
+                node = PlanNode(f"STREAM AGGREGATE USING INDEX {order[0]}", groups, cost, [node])
+                grouped_in_order = True
+            else:
+                source = HashAggregate(source, grouping, table.ordered_columns, column_types)
+                node = PlanNode("HASH AGGREGATE", groups, cost, [node])
+        ordered = grouped_in_order and ordered_by_key
+        return self.finish_grouped(source, node, grouping, names, results, having, order_by, ordered, limit, offset)
+
+    @staticmethod
+    def rewrite_grouped(
+        grouping: Grouping, exprs: list[Expression], having: Optional[Expression], order_by: list[OrderingTerm]
+    ) -> tuple[list[Expression], Optional[Expression], list[OrderingTerm]]:
+        """The result columns, HAVING and ORDER BY of a grouped query
+        computed from the group rows (see aggregation.Grouping.rewrite)."""
+        results = [grouping.rewrite(expr) for expr in exprs]
+        having = None if having is None else grouping.rewrite(having)
+        order_by = [OrderingTerm(grouping.rewrite(term.expr), term.descending) for term in order_by]
+        return results, having, order_by
+
+    def finish_grouped(
+        self,
+        source: Iterable[Entry],
+        node: PlanNode,
+        grouping: Grouping,
+        names: list[str],
+        results: list[Expression],
+        having: Optional[Expression],
+        order_by: list[OrderingTerm],
+        ordered: bool,
+        limit: Optional[int],
+        offset: int,
+    ) -> Query:
+        """The query computing the result columns from the group rows of
+        source: those HAVING is true for, sorted by order_by unless they
+        come ordered, and cut down to LIMIT and OFFSET."""
+        group_names = grouping.names
+        if having is not None:
+            source = Filter(source, having, group_names)
+            node = PlanNode("FILTER", node.rows * DEFAULT_SELECTIVITY, node.cost + node.rows, [node])
+        if order_by and not ordered:
+            source, node = self.sort(source, node, order_by, group_names, None, limit, offset)
+        source, node = self.limit(source, node, limit, offset)
+        return Query(Compute(source, results, names, group_names), names, node)
+
+    @staticmethod
+    def aggregate_from_indexes(table: Table, grouping: Grouping, where: Optional[Expression]) -> Optional[Entry]:
+        """The only group row of a query without WHERE or GROUP BY whose
+        aggregates can all be read off the Columns without reading any
+        rows: COUNT(*) from the row count, COUNT(col) from the counts of
+        the Column, COUNT(DISTINCT col) from the size of its tree, and
+        MIN(col) and MAX(col) from the ends of its tree. None otherwise."""
+        if where is not None or grouping.keys:
+            return None
+        values = []
+        for call in grouping.calls:
+            argument = call.argument
+            if argument is None:
+                values.append(table.row_count())
+                continue
+            if argument.route != 3 or argument.lead_expr.column_name not in table.tbl:
+                return None
+            column = table[argument.lead_expr.column_name]
+            if call.function == "COUNT":
+                values.append(len(column.tree) if call.distinct else column.rows - len(column.none_entries))
+            elif call.function in ("MIN", "MAX"):
+                if len(column.tree) == 0:
+                    values.append(None)
+                else:
+                    values.append(column.minimum() if call.function == "MIN" else column.maximum())
+            else:
+                return None
+        return Entry(namedtuple("Group", grouping.names)(*values))
+
+    @staticmethod
+    def estimate_groups(columns: Mapping[str, Column], grouping: Grouping, rows: float) -> float:
+        """Estimated number of groups rows are aggregated into: one per
+        combination of the distinct values of the columns grouped by,
+        columns being the Columns the rows read, by name."""
+        if not grouping.keys:
+            return 1
+        groups = 1.0
+        for key in grouping.keys:
+            if key.route == 3 and key.lead_expr.column_name in columns:
+                column = columns[key.lead_expr.column_name]
+                groups *= len(column.tree) + (1 if column.none_entries else 0)
+            else:
+                groups *= max(1.0, rows * DEFAULT_SELECTIVITY)
+        return min(groups, rows)
+
+    @staticmethod
+    def plan_access(
+        table: Table,
+        where: Optional[Expression],
+        order_by: list[OrderingTerm],
+        limit: Optional[int],
+        offset: int,
+    ) -> AccessPlan:
+        """The AccessPlan for where. When the query is ordered by a single
+        column, plans reading the rows in its order are considered, which
+        need no sort and can stop once LIMIT is met."""
+        order = None
+        if len(order_by) == 1 and order_by[0].expr.route == 3:
+            order = (order_by[0].expr.lead_expr.column_name, order_by[0].descending)
+        if order_by and order is None:
+            # every row has to be read to be sorted
+            return plan_table_access(table, where)
+        return plan_table_access(table, where, order, None if limit is None else offset + limit)
+
+    @staticmethod
+    def sort(
+        source: Iterable[Entry],
+        node: PlanNode,
+        order_by: list[OrderingTerm],
+        column_names: list[str],
+        column_types: Optional[dict[str, type]],
+        limit: Optional[int],
+        offset: int,
+    ) -> tuple[Iterable[Entry], PlanNode]:
+        """source sorted by order_by, keeping only the rows LIMIT and
+        OFFSET need, and the plan node doing so."""
+        kept = None if limit is None else offset + limit
+        key, reverse = ordering_key(order_by, column_names, column_types)
+        detail = "SORT" if kept is None else f"SORT TOP {kept}"
+        rows = node.rows if kept is None else min(node.rows, kept)
+        return Sort(source, key, reverse, kept), PlanNode(detail, rows, node.cost + sort_cost(node.rows, kept), [node])
+
+    @staticmethod
+    def limit(
+        source: Iterable[Entry], node: PlanNode, limit: Optional[int], offset: int
+    ) -> tuple[Iterable[Entry], PlanNode]:
+        """source cut down to LIMIT and OFFSET, and the plan node doing so."""
+        if limit is None and offset == 0:
+            return source, node
+        rows = max(0.0, node.rows - offset)
+        clauses = ([] if limit is None else [f"LIMIT {limit}"]) + ([f"OFFSET {offset}"] if offset > 0 else [])
+        node = PlanNode(" ".join(clauses), rows if limit is None else min(rows, limit), node.cost, [node])
+        return Limit(source, limit, offset), node
+
+    def resolve(self, db: Database, input: SelectStatement) -> tuple[Table, list[str], list[Expression]]:
+        """The table the query reads, and the names and expressions of
+        its result columns."""
+        table = self.find_table(db, input.schema_name, input.table_name)
 
         if len(input.columns) == 0:
-            selected_columns = table.ordered_columns
+            names = list(table.ordered_columns)
+        else:
+            names = list(input.columns)
+        if input.column_exprs is not None:
+            exprs = list(input.column_exprs)
         else:
-            invalid_columns = set(input.columns) - set(table.ordered_columns)
-            if invalid_columns:
+            exprs = [Expression(route=3, lead_expr=ColumnAddress(name)) for name in names]
+        self.check_columns(table, input.table_name, exprs)
+        return table, names, exprs
+
+    @staticmethod
+    def find_table(db: Database, schema_name: Optional[str], table_name: str) -> Table:
+        schema = db[schema_name]
+        if table_name not in schema.keys():
+            if schema_name is None:
                 raise ExecutingException(
-                    f"Column(s) {list(invalid_columns)} do not exist in table {input.table_name}"
+                    f"Select table {table_name} not found in default schema"
                 )
-            selected_columns = input.columns
+            raise ExecutingException(
+                f"Select table {table_name} not found in schema {schema_name}"
+            )
+        return schema[table_name]
+
+    @staticmethod
+    def check_columns(table: Table, table_name: str, exprs: Iterable[Expression]):
+        invalid_columns = set()
+        for expr in exprs:
+            invalid_columns |= referenced_columns(expr) - set(table.ordered_columns)
+        if invalid_columns:
+            raise ExecutingException(
+                f"Column(s) {list(invalid_columns)} do not exist in table {table_name}"
+            )
+
+    @staticmethod
+    def ordering_terms(
+        names: list[str], exprs: list[Expression], order_by: Optional[list[OrderingTerm]]
+    ) -> list[OrderingTerm]:
+        """The ORDER BY terms, with an integer K standing for the K-th
+        result column, or the name of a result column that is not a
+        column of the table, replaced by the expression of that column."""
+        aliases = _aliases(names, exprs)
+        terms = []
+        for term in order_by or []:
+            expr = term.expr
+            if expr.route == 1 and type(expr.lead_expr.value) is int:
+                position = expr.lead_expr.value
+                if not 1 <= position <= len(exprs):
+                    raise ExecutingException(
+                        f"ORDER BY term {position} out of range, expected 1 to {len(exprs)}"
+                    )
+                expr = exprs[position - 1]
+            elif expr.route == 3 and expr.lead_expr.table_name is None and expr.lead_expr.column_name in aliases:
+                expr = aliases[expr.lead_expr.column_name]
+            terms.append(OrderingTerm(expr, term.descending))
+        return terms
+
+    @staticmethod
+    def limit_and_offset(input: SelectStatement) -> tuple[Optional[int], int]:
+        """The LIMIT (None for no limit) and OFFSET of the query. As in
+        SQLite, a negative LIMIT means no limit and a negative OFFSET
+        none."""
+        limit = None if input.limit_expr is None else _integer(input.limit_expr, "LIMIT")
+        offset = 0 if input.offset_expr is None else _integer(input.offset_expr, "OFFSET")
+        return (None if limit is not None and limit < 0 else limit), max(offset, 0)
+
+    @staticmethod
+    def access(table: Table, plan: AccessPlan) -> Iterable[Entry]:
+        """The Entries matching the WHERE clause plan was made for: read
+        through its access path, or a scan of the whole table, and
+        filtered by its residual predicate."""
+        path, residual = plan.path, plan.residual
+        source = TableScan(table) if path is None else IndexScan(table, path)
+        if residual is None:
+            return source
+        column_types = {name: table[name].type for name in table.ordered_columns}
+        return Filter(source, residual, table.ordered_columns, column_types)
+
+
+def _integer(expr: Expression, clause: str) -> int:
+    expr = fold_constants(expr)
+    if expr.route != 1 or type(expr.lead_expr.value) is not int:
+        raise ExecutingException(f"{clause} must be an integer")
+    return expr.lead_expr.value
+
+
+def _aliases(names: list[str], exprs: list[Expression]) -> dict[str, Expression]:
+    """The expression of each result column named other than the table
+    column it reads, by name."""
+    return {name: expr for name, expr in zip(names, exprs) if not (expr.route == 3 and expr.lead_expr.column_name == name)}
 
-        if len(table.ordered_columns) == 0:
-            return []  # Empty table
 
-        first_column = table[table.ordered_columns[0]]
-        all_entries = []
+def _replace_aliases(expr: Expression, aliases: dict[str, Expression]) -> Expression:
+    """expr with every column it reads that is named like a result column
+    alias in aliases replaced by the expression of that result column, as
+    HAVING may refer to result columns by name in SQLite."""
 
-        for key in first_column:
-            all_entries.extend(first_column[key])
+    def replace_alias(address: ColumnAddress) -> Expression:
+        if address.table_name is None and address.column_name in aliases:
+            return aliases[address.column_name]
+        return Expression(route=3, lead_expr=address)
 
-        all_entries.extend(first_column.none_entries)
+    return map_columns(expr, replace_alias)
 
-        result = []
-        for entry in all_entries:
-            row = {}
-            for col_name in selected_columns:
-                row[col_name] = entry[col_name]
-            result.append(row)
 
-        return result
+def _calls_function(expr: Expression) -> bool:
+    if expr.route == 7:
+        return True
+    return any(_calls_function(child) for child in children(expr))
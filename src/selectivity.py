@@ -0,0 +1,270 @@
+"""Ordering the operands of AND and OR so filters do the least work.
+
+AND and OR only evaluate their second operand when the first does not
+decide the result (see statements.short_circuits), so the order of a run
+of conjuncts or disjuncts matters: an AND should first test what is
+cheap and rejects the most rows, an OR what is cheap and accepts the
+most. reorder_predicates sorts them by the cost of evaluating each one
+and its selectivity, the fraction of rows it is estimated to be true
+for, which is estimated from the ColumnStatistics of the columns it
+reads."""
+from typing import Any, Mapping, Optional
+
+from data import ColumnStatistics
+from expressionparser import ExpressionParser
+from statements import BinaryOperator, Expression, UnaryOperator, children
+
+# Selectivity assumed where nothing better is known
+DEFAULT_SELECTIVITY = 0.5
+# Selectivity of a range comparison that cannot be interpolated
+RANGE_SELECTIVITY = 1 / 3
+# Selectivity of a LIKE, GLOB or REGEXP
+PATTERN_SELECTIVITY = 0.1
+
+# Relative cost of matching a pattern compared to any other operator
+PATTERN_COST = 10
+
+EQUALITY_OPERATORS = (BinaryOperator.EQLS, BinaryOperator.DBL_EQLS)
+INEQUALITY_OPERATORS = (BinaryOperator.DIAMOND, BinaryOperator.NOT_EQLS)
+# Operators that cannot raise an error whatever the values of their operands
+TOTAL_OPERATORS = frozenset(
+    {BinaryOperator.AND, BinaryOperator.OR, *EQUALITY_OPERATORS, *INEQUALITY_OPERATORS}
+)
+# Each range comparison, and the one meaning the same with operands swapped
+RANGE_OPERATORS = {
+    BinaryOperator.LESS: BinaryOperator.GREATER,
+    BinaryOperator.LESS_EQ: BinaryOperator.GREATER_EQ,
+    BinaryOperator.GREATER: BinaryOperator.LESS,
+    BinaryOperator.GREATER_EQ: BinaryOperator.LESS_EQ,
+}
+
+
+def reorder_predicates(expr: Expression, statistics: Mapping[str, ColumnStatistics]) -> Expression:
+    """Returns expr with every run of ANDs (or of ORs) rebuilt with its
+    operands in the order that should evaluate fastest.
+
+    For AND this is ascending cost / (1 - selectivity), the cost paid per
+    row rejected, and for OR ascending cost / selectivity. Whether the
+    result is true, false or NULL for a row does not depend on the order,
+    so this is meant for filters: for operands that are not booleans the
+    true value itself may differ (5 AND 3 is 3, 3 AND 5 is 5). The input
+    is never modified."""
+    if expr.route == 6 and expr.binary_op in (BinaryOperator.AND, BinaryOperator.OR):
+        operator = expr.binary_op
+        operands = [reorder_predicates(operand, statistics) for operand in _flatten(expr, operator)]
+        return ExpressionParser.balance(operator, _sort_operands(operator, operands, statistics))
+    if expr.route == 5 and expr.unary_op == UnaryOperator.NOT:
+        lead = reorder_predicates(expr.lead_expr, statistics)
+        if lead is not expr.lead_expr:
+            return Expression(route=5, unary_op=expr.unary_op, lead_expr=lead)
+    if expr.route == 8 and len(expr.expr_array) == 1:
+        inner = reorder_predicates(expr.expr_array[0], statistics)
+        if inner is not expr.expr_array[0]:
+            return Expression(route=8, expr_array=[inner])
+    return expr
+
+
+def _flatten(expr: Expression, operator: BinaryOperator) -> list[Expression]:
+    if expr.route == 6 and expr.binary_op == operator:
+        return _flatten(expr.lead_expr, operator) + _flatten(expr.second_expr, operator)
+    if expr.route == 8 and len(expr.expr_array) == 1:
+        return _flatten(expr.expr_array[0], operator)
+    return [expr]
+
+
+def _sort_operands(
+    operator: BinaryOperator, operands: list[Expression], statistics: Mapping[str, ColumnStatistics]
+) -> list[Expression]:
+    """Sorts operands by rank, except that an operand which may raise an
+    error stays where it is, so that guards like `b <> 0 AND a / b > 1`
+    or `x IS NOT NULL AND x BETWEEN 1 AND 5` are still evaluated first.
+    Only the operands between two such barriers are sorted."""
+    result: list[Expression] = []
+    run: list[Expression] = []
+    for operand in operands:
+        if not _total(operand):
+            result += sorted(run, key=lambda item: _rank(operator, item, statistics))
+            result.append(operand)
+            run = []
+        else:
+            run.append(operand)
+    return result + sorted(run, key=lambda item: _rank(operator, item, statistics))
+
+
+def _total(expr: Expression) -> bool:
+    """True if evaluating expr cannot raise an error for any row, so it
+    may be moved ahead of other operands: it only reads values, tests
+    them for NULL or equality (which any two values can be compared for)
+    or matches them against a LIKE or GLOB pattern given as a literal.
+    Arithmetic, range comparisons, BETWEEN and function calls can all
+    raise for values of some type, or for a zero divisor."""
+    route = expr.route
+    if route in (1, 2, 3):
+        return True
+    if route == 5:
+        total = expr.unary_op == UnaryOperator.NOT
+    elif route == 6:
+        total = expr.binary_op in TOTAL_OPERATORS
+    elif route == 11:
+        total = (
+            not expr.binary_op.endswith("REGEXP")
+            and expr.second_expr.route == 1
+            and (expr.third_expr is None or _single_character(expr.third_expr))
+        )
+    else:
+        total = route in (8, 12, 13)
+    return total and all(_total(child) for child in children(expr))
+
+
+def _single_character(expr: Expression) -> bool:
+    return expr.route == 1 and isinstance(expr.lead_expr.value, str) and len(expr.lead_expr.value) == 1
+
+
+def _rank(operator: BinaryOperator, expr: Expression, statistics: Mapping[str, ColumnStatistics]) -> float:
+    selectivity = estimate_selectivity(expr, statistics)
+    # the fraction of rows for which expr decides the result on its own
+    deciding = selectivity if operator == BinaryOperator.OR else 1 - selectivity
+    if deciding <= 0:
+        return float("inf")
+    return estimate_cost(expr) / deciding
+
+
+def estimate_cost(expr: Expression) -> int:
+    """Relative cost of evaluating expr for one row: the number of
+    operators in it, counting pattern matches as PATTERN_COST."""
+    if expr.route in (1, 2, 3):
+        return 0
+    cost = sum(estimate_cost(child) for child in children(expr))
+    if expr.route == 8:
+        return cost
+    return cost + (PATTERN_COST if expr.route == 11 else 1)
+
+
+def estimate_selectivity(expr: Expression, statistics: Mapping[str, ColumnStatistics]) -> float:
+    """Estimated fraction of rows, between 0 and 1, for which expr is true."""
+    route = expr.route
+    if route == 1:
+        return 1.0 if expr.lead_expr.value else 0.0
+    if route == 5 and expr.unary_op == UnaryOperator.NOT:
+        return 1 - estimate_selectivity(expr.lead_expr, statistics)
+    if route == 8 and len(expr.expr_array) == 1:
+        return estimate_selectivity(expr.expr_array[0], statistics)
+    if route == 6:
+        return _binary_selectivity(expr, statistics)
+    if route == 11:
+        negated = expr.binary_op.startswith("NOT ")
+        return 1 - PATTERN_SELECTIVITY if negated else PATTERN_SELECTIVITY
+    if route == 12:
+        stats = _column_statistics(expr.lead_expr, statistics)
+        if stats is None:
+            return DEFAULT_SELECTIVITY
+        null_fraction = _null_fraction(stats)
+        return null_fraction if expr.unary_op == "ISNULL" else 1 - null_fraction
+    if route == 13:
+        selectivity = _is_selectivity(expr, statistics)
+        negated = expr.binary_op in ("IS NOT", "IS DISTINCT FROM")
+        return 1 - selectivity if negated else selectivity
+    if route == 14:
+        selectivity = _between_selectivity(expr, statistics)
+        return selectivity if expr.binary_op == "BETWEEN" else 1 - selectivity
+    return DEFAULT_SELECTIVITY
+
+
+def _binary_selectivity(expr: Expression, statistics: Mapping[str, ColumnStatistics]) -> float:
+    operator = expr.binary_op
+    if operator in (BinaryOperator.AND, BinaryOperator.OR):
+        a = estimate_selectivity(expr.lead_expr, statistics)
+        b = estimate_selectivity(expr.second_expr, statistics)
+        return a * b if operator == BinaryOperator.AND else a + b - a * b
+    stats, value = _column_and_constant(expr.lead_expr, expr.second_expr, statistics)
+    if stats is None:
+        stats, value = _column_and_constant(expr.second_expr, expr.lead_expr, statistics)
+        operator = RANGE_OPERATORS.get(operator, operator)
+    if stats is None:
+        return DEFAULT_SELECTIVITY
+    if operator in EQUALITY_OPERATORS:
+        return _equal_selectivity(stats)
+    if operator in INEQUALITY_OPERATORS:
+        return max(0.0, 1 - _null_fraction(stats) - _equal_selectivity(stats))
+    if operator in RANGE_OPERATORS:
+        below = _fraction_below(stats, value)
+        if below is None:
+            return RANGE_SELECTIVITY
+        if operator in (BinaryOperator.GREATER, BinaryOperator.GREATER_EQ):
+            below = 1 - below
+        return below * (1 - _null_fraction(stats))
+    return DEFAULT_SELECTIVITY
+
+
+def range_selectivity(stats: ColumnStatistics, start: Any, stop: Any) -> float:
+    """Estimated fraction of rows whose value lies between start and stop,
+    None standing for no bound."""
+    below_start = 0.0 if start is None else _fraction_below(stats, start)
+    below_stop = 1.0 if stop is None else _fraction_below(stats, stop)
+    if below_start is None or below_stop is None:
+        return RANGE_SELECTIVITY ** ((start is not None) + (stop is not None))
+    return max(0.0, below_stop - below_start) * (1 - _null_fraction(stats))
+
+
+def _is_selectivity(expr: Expression, statistics: Mapping[str, ColumnStatistics]) -> float:
+    stats, value = _column_and_constant(expr.lead_expr, expr.second_expr, statistics)
+    if stats is None:
+        stats, value = _column_and_constant(expr.second_expr, expr.lead_expr, statistics)
+    if stats is None:
+        return DEFAULT_SELECTIVITY
+    return _null_fraction(stats) if value is None else _equal_selectivity(stats)
+
+
+def _between_selectivity(expr: Expression, statistics: Mapping[str, ColumnStatistics]) -> float:
+    stats, low = _column_and_constant(expr.lead_expr, expr.second_expr, statistics)
+    _, high = _column_and_constant(expr.lead_expr, expr.third_expr, statistics)
+    if stats is None:
+        return RANGE_SELECTIVITY * RANGE_SELECTIVITY
+    below_low, below_high = _fraction_below(stats, low), _fraction_below(stats, high)
+    if below_low is None or below_high is None:
+        return RANGE_SELECTIVITY * RANGE_SELECTIVITY
+    return max(0.0, below_high - below_low) * (1 - _null_fraction(stats))
+
+
+def _column_and_constant(
+    column: Expression, constant: Expression, statistics: Mapping[str, ColumnStatistics]
+) -> tuple[Optional[ColumnStatistics], Any]:
+    """The statistics of column and the value of constant, when column is
+    a column with statistics and constant is a literal, else (None, None)."""
+    stats = _column_statistics(column, statistics)
+    if stats is None or constant.route != 1:
+        return None, None
+    return stats, constant.lead_expr.value
+
+
+def _column_statistics(expr: Expression, statistics: Mapping[str, ColumnStatistics]) -> Optional[ColumnStatistics]:
+    if expr.route != 3:
+        return None
+    stats = statistics.get(expr.lead_expr.column_name)
+    if stats is None or stats.rows == 0:
+        return None
+    return stats
+
+
+def _null_fraction(stats: ColumnStatistics) -> float:
+    return stats.nulls / stats.rows
+
+
+def _equal_selectivity(stats: ColumnStatistics) -> float:
+    """Rows with one given value, assuming values are evenly distributed."""
+    if stats.distinct == 0:
+        return 0.0
+    return (1 - _null_fraction(stats)) / stats.distinct
+
+
+def _fraction_below(stats: ColumnStatistics, value: Any) -> Optional[float]:
+    """Estimated fraction of the non-NULL values of the column below value,
+    interpolating between its minimum and maximum, or None when they are
+    not numbers."""
+    numbers = (stats.minimum, stats.maximum, value)
+    if not all(isinstance(number, (int, float)) and not isinstance(number, bool) for number in numbers):
+        return None
+    span = stats.maximum - stats.minimum
+    if span == 0:
+        return 0.0 if value <= stats.minimum else 1.0
+    return min(1.0, max(0.0, (value - stats.minimum) / span))
@@ -1,33 +1,165 @@
+from typing import Sequence
+
 from baseparser import BaseParser, ParsingException
+from expressionparser import ExpressionParser
 from qualifiedtablenameparser import QualifiedTableNameParser
-from sqltoken import TokenType
-from statements import SelectStatement
+from sqltoken import Token, TokenType
+from statements import Expression, JoinClause, OrderingTerm, SelectStatement
+
+JOIN_KEYWORDS = ["JOIN", "INNER", "CROSS", "LEFT", "RIGHT", "FULL", "OUTER"]
 
 
 class SelectStatementParser(BaseParser):
-    def parse(self) -> SelectStatement:
+    def parse(self, nested: bool = False) -> SelectStatement:
+        """A SELECT statement, which must end the input unless it is nested
+        in another statement, ended by whatever encloses it."""
         if not self.typeMatches(TokenType.KEYWORD) and not self.valueMatches("SELECT"):
             raise ParsingException("Expected SELECT")
         self.consume(TokenType.KEYWORD, "SELECT")
         column_list = []
+        column_exprs = []
         if self.typeMatches(TokenType.OPERATOR) and self.valueMatches("*"):
             self.consume(TokenType.OPERATOR, "*")
-        elif self.typeMatches(TokenType.IDENTIFIER):
-            while not self.valueMatches("FROM"):
-                column_list.append(self.consume(TokenType.IDENTIFIER).value)
-                if self.typeMatches(TokenType.COMMA):
-                    self.consume(TokenType.COMMA)
         else:
-            raise ParsingException(f"Expected column list, got {self.tokens[0]}")
+            while True:
+                name, expr = self.parseResultColumn()
+                column_list.append(name)
+                column_exprs.append(expr)
+                if not self.typeMatches(TokenType.COMMA):
+                    break
+                self.consume(TokenType.COMMA)
 
         self.consume(TokenType.KEYWORD, "FROM")
 
         qualified_table = QualifiedTableNameParser(self.tokens)
         qualified_table = qualified_table.parse()
+        joins = None
+        while self.typeMatches(TokenType.COMMA) or self.isValueOneOf(JOIN_KEYWORDS):
+            joins = (joins or []) + [self.parseJoinClause()]
+
+        where_expr = None
+        if self.valueMatches("WHERE"):
+            self.consume(TokenType.KEYWORD)
+            expr_parser = ExpressionParser(self.tokens)
+            where_expr = expr_parser.parse()
+            self.tokens = expr_parser.tokens
+
+        group_by = None
+        if self.valueMatches("GROUP"):
+            self.consume(TokenType.KEYWORD, "GROUP")
+            self.consume(TokenType.KEYWORD, "BY")
+            group_by = [ExpressionParser(self.tokens).parse()]
+            while self.typeMatches(TokenType.COMMA):
+                self.consume(TokenType.COMMA)
+                group_by.append(ExpressionParser(self.tokens).parse())
+
+        having_expr = None
+        if self.valueMatches("HAVING"):
+            self.consume(TokenType.KEYWORD, "HAVING")
+            having_expr = ExpressionParser(self.tokens).parse()
+
+        order_by = None
+        if self.valueMatches("ORDER"):
+            order_by = self.parseOrderBy()
+
+        limit_expr, offset_expr = None, None
+        if self.valueMatches("LIMIT"):
+            self.consume(TokenType.KEYWORD, "LIMIT")
+            limit_expr = ExpressionParser(self.tokens).parse()
+            if self.valueMatches("OFFSET"):
+                self.consume(TokenType.KEYWORD, "OFFSET")
+                offset_expr = ExpressionParser(self.tokens).parse()
+            elif self.typeMatches(TokenType.COMMA):
+                # LIMIT offset, limit
+                self.consume(TokenType.COMMA)
+                offset_expr = limit_expr
+                limit_expr = ExpressionParser(self.tokens).parse()
+
+        if not nested:
+            self.expectStatementEnd()
 
         return SelectStatement(
             table_name=qualified_table.table_name,
             schema_name=qualified_table.schema_name,
             alias=qualified_table.alias,
             columns=column_list,
+            where_expr=where_expr,
+            order_by=order_by,
+            limit_expr=limit_expr,
+            offset_expr=offset_expr,
+            # plain column names need no expressions
+            column_exprs=None if all(map(_is_column_name, column_list, column_exprs)) else column_exprs,
+            group_by=group_by,
+            having_expr=having_expr,
+            joins=joins,
         )
+
+    def parseResultColumn(self) -> tuple[str, Expression]:
+        """An expression of the select list and the name of its column:
+        the alias given with or without AS, else the expression's text."""
+        start = self.tokens.mark()
+        expr = ExpressionParser(self.tokens).parse()
+        name = _source_text(self.tokens.since(start))
+        if self.valueMatches("AS"):
+            self.consume(TokenType.KEYWORD, "AS")
+            name = self.consume(TokenType.IDENTIFIER).value
+        elif self.typeMatches(TokenType.IDENTIFIER):
+            name = self.consume(TokenType.IDENTIFIER).value
+        return name, expr
+
+    def parseJoinClause(self) -> JoinClause:
+        """A table joined to the previous ones: ", table", "CROSS JOIN
+        table" or "[INNER] JOIN table [ON expr]". Outer joins and USING
+        are not supported."""
+        if self.typeMatches(TokenType.COMMA):
+            self.consume(TokenType.COMMA)
+            return JoinClause(QualifiedTableNameParser(self.tokens).parse())
+        operator = self.consume(TokenType.KEYWORD).value
+        if operator in ("LEFT", "RIGHT", "FULL", "OUTER"):
+            raise ParsingException(f"{operator} JOIN is not supported")
+        if operator != "JOIN":
+            self.consume(TokenType.KEYWORD, "JOIN")
+        table = QualifiedTableNameParser(self.tokens).parse()
+        on_expr = None
+        if self.valueMatches("ON"):
+            if operator == "CROSS":
+                raise ParsingException("CROSS JOIN cannot have an ON clause")
+            self.consume(TokenType.KEYWORD, "ON")
+            on_expr = ExpressionParser(self.tokens).parse()
+        elif self.valueMatches("USING"):
+            raise ParsingException("JOIN ... USING is not supported")
+        return JoinClause(table, on_expr)
+
+    def parseOrderBy(self) -> list[OrderingTerm]:
+        self.consume(TokenType.KEYWORD, "ORDER")
+        self.consume(TokenType.KEYWORD, "BY")
+        terms = []
+        while True:
+            expr = ExpressionParser(self.tokens).parse()
+            descending = False
+            if self.isValueOneOf(["ASC", "DESC"]):
+                descending = self.consume(TokenType.KEYWORD).value == "DESC"
+            terms.append(OrderingTerm(expr, descending))
+            if not self.typeMatches(TokenType.COMMA):
+                return terms
+            self.consume(TokenType.COMMA)
+
+
+def _is_column_name(name: str, expr: Expression) -> bool:
+    return expr.route == 3 and expr.lead_expr.table_name is None and expr.lead_expr.column_name == name
+
+
+def _source_text(tokens: Sequence[Token]) -> str:
+    """The tokens of an expression as SQL text, spaced like "COUNT(*) + 1"."""
+    text = ""
+    previous = None
+    for token in tokens:
+        if previous is not None and not (
+            previous.type == TokenType.LPAREN
+            or token.type in (TokenType.LPAREN, TokenType.RPAREN, TokenType.COMMA)
+            or "." in (previous.value, token.value)
+        ):
+            text += " "
+        text += token.value
+        previous = token
+    return text
@@ -7,6 +7,7 @@ class TokenType(Enum):
     IDENTIFIER = "IDENTIFIER"
     STRING_LITERAL = "STRING_LITERAL"
     NUMBER_LITERAL = "NUMBER_LITERAL"
+    PARAMETER = "PARAMETER"
 
     OPERATOR = "OPERATOR"
     COMPARISON = "COMPARISON"
@@ -24,7 +25,7 @@ class TokenType(Enum):
     EOF = "EOF"
     UNKNOWN = "UNKNOWN"
 
-@dataclass
+@dataclass(frozen=True)
 class Token:
     type: TokenType
     value: str
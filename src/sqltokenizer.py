@@ -1,100 +1,160 @@
 from sqltoken import Token, TokenType
-from typing import List
+from typing import Iterator, List, Optional, TextIO
 import re
 
-class Tokenizer:
-    def __init__(self):
-        self.keywords = {
-            'SELECT', 'FROM', 'WHERE', 'INSERT', 'UPDATE', 'DELETE', 'CREATE', 'DROP',
-            'ALTER', 'TABLE', 'INDEX', 'VIEW', 'DATABASE', 'SCHEMA', 'INTO', 'VALUES',
-            'SET', 'AND', 'OR', 'NOT', 'NULL', 'IS', 'IN', 'LIKE', 'BETWEEN', 'EXISTS',
-            'DISTINCT', 'ALL', 'ANY', 'SOME', 'UNION', 'INTERSECT', 'EXCEPT', 'MINUS',
-            'ORDER', 'BY', 'GROUP', 'HAVING', 'LIMIT', 'OFFSET', 'JOIN', 'INNER',
-            'LEFT', 'RIGHT', 'FULL', 'OUTER', 'CROSS', 'ON', 'USING', 'AS', 'CASE',
-            'WHEN', 'THEN', 'ELSE', 'END', 'IF', 'DECLARE', 'BEGIN', 'COMMIT',
-            'ROLLBACK', 'TRANSACTION', 'PRIMARY', 'KEY', 'FOREIGN', 'REFERENCES',
-            'UNIQUE', 'CHECK', 'DEFAULT', 'AUTO_INCREMENT', 'IDENTITY', 'CONSTRAINT',
-            'INT', 'INTEGER', 'VARCHAR', 'CHAR', 'TEXT', 'DATE', 'DATETIME', 'TIMESTAMP',
-            'BOOLEAN', 'BOOL', 'DECIMAL', 'NUMERIC', 'FLOAT', 'DOUBLE', 'REAL', 'COUNT',
-            'ASC', 'DESC', 'CURRENT_TIME', 'CURRENT_DATE', 'CURRENT_TIMESTAMP', 'TRUE',
-            'FALSE', "ISNULL", "NOTNULL", "ESCAPE", "GLOB", "REGEXP", "MATCH"
-        }
-
-        self.token_patterns = [
-            # Comments
-            (r'--.*$', TokenType.COMMENT),
-            (r'/\*.*?\*/', TokenType.COMMENT),
-
-            # String literals (single and double quotes)
-            (r"'(?:[^'\\]|\\.)*'", TokenType.STRING_LITERAL),
-            (r'"(?:[^"\\]|\\.)*"', TokenType.STRING_LITERAL),
-
-            # Number literals
-            (r'\b\d+\.?\d*\b', TokenType.NUMBER_LITERAL),
-
-            # Comparison operators (must come before single character operators)
-            (r'==|<=|>=|<>|!=|<|>|=', TokenType.COMPARISON),
-
-            # Other operators
-            (r'\+|-|\*|/|%|~|\|\||&', TokenType.OPERATOR),
-
-            # Punctuation
-            (r',', TokenType.COMMA),
-            (r';', TokenType.SEMICOLON),
-            (r'\.', TokenType.DOT),
-            (r'\(', TokenType.LPAREN),
-            (r'\)', TokenType.RPAREN),
-
-            # Identifiers (including quoted identifiers with backticks or square brackets)
-            (r'`[^`]+`', TokenType.IDENTIFIER),
-            (r'\[[^\]]+\]', TokenType.IDENTIFIER),
-            (r'\b[a-zA-Z_][a-zA-Z0-9_]*\b', TokenType.IDENTIFIER),
-
-            # Whitespace
-            (r'\s+', TokenType.WHITESPACE),
-        ]
-
-        # Compile patterns for better performance
-        self.compiled_patterns = [(re.compile(pattern, re.MULTILINE | re.DOTALL), token_type)
-                                 for pattern, token_type in self.token_patterns]
+KEYWORDS = frozenset({
+    'SELECT', 'FROM', 'WHERE', 'INSERT', 'UPDATE', 'DELETE', 'CREATE', 'DROP',
+    'ALTER', 'TABLE', 'INDEX', 'VIEW', 'DATABASE', 'SCHEMA', 'INTO', 'VALUES',
+    'SET', 'AND', 'OR', 'NOT', 'NULL', 'IS', 'IN', 'LIKE', 'BETWEEN', 'EXISTS',
+    'DISTINCT', 'ALL', 'ANY', 'SOME', 'UNION', 'INTERSECT', 'EXCEPT', 'MINUS',
+    'ORDER', 'BY', 'GROUP', 'HAVING', 'LIMIT', 'OFFSET', 'JOIN', 'INNER',
+    'LEFT', 'RIGHT', 'FULL', 'OUTER', 'CROSS', 'ON', 'USING', 'AS', 'CASE',
+    'WHEN', 'THEN', 'ELSE', 'END', 'IF', 'DECLARE', 'BEGIN', 'COMMIT',
+    'ROLLBACK', 'TRANSACTION', 'PRIMARY', 'KEY', 'FOREIGN', 'REFERENCES',
+    'UNIQUE', 'CHECK', 'DEFAULT', 'AUTO_INCREMENT', 'IDENTITY', 'CONSTRAINT',
+    'INT', 'INTEGER', 'VARCHAR', 'CHAR', 'TEXT', 'DATE', 'DATETIME', 'TIMESTAMP',
+    'BOOLEAN', 'BOOL', 'DECIMAL', 'NUMERIC', 'FLOAT', 'DOUBLE', 'REAL', 'COUNT',
+    'ASC', 'DESC', 'CURRENT_TIME', 'CURRENT_DATE', 'CURRENT_TIMESTAMP', 'TRUE',
+    'FALSE', "ISNULL", "NOTNULL", "ESCAPE", "GLOB", "REGEXP", "MATCH", "RETURNING",
+    "EXPLAIN"
+})
 
-    def tokenize(self, sql: str) -> List[Token]:
-        tokens = []
-        position = 0
-        line = 1
-        line_start = 0
+# Patterns are tried in order at every position, so earlier entries win
+# over later ones (e.g. comparisons before single character operators).
+TOKEN_PATTERNS = [
+    # Comments
+    (r'--.*$', TokenType.COMMENT),
+    (r'/\*.*?\*/', TokenType.COMMENT),
 
-        while position < len(sql):
-            matched = False
+    # String literals (single and double quotes)
+    (r"'(?:[^'\\]|\\.)*'", TokenType.STRING_LITERAL),
+    (r'"(?:[^"\\]|\\.)*"', TokenType.STRING_LITERAL),
 
-            for pattern, token_type in self.compiled_patterns:
-                match = pattern.match(sql, position)
-                if match:
-                    value = match.group(0)
+    # Number literals
+    (r'\b\d+\.?\d*\b', TokenType.NUMBER_LITERAL),
 
-                    if token_type == TokenType.IDENTIFIER and value.upper() in self.keywords:
-                        token_type = TokenType.KEYWORD
+    # Bind parameters: ?, ?NNN and :name
+    (r'\?\d*|:[a-zA-Z_][a-zA-Z0-9_]*', TokenType.PARAMETER),
 
-                    token = Token(token_type, value)
+    # Comparison operators (must come before single character operators)
+    (r'==|<=|>=|<>|!=|<|>|=', TokenType.COMPARISON),
 
-                    if (token_type != TokenType.WHITESPACE) and (token_type != TokenType.COMMENT):
-                        tokens.append(token)
+    # Other operators
+    (r'\+|-|\*|/|%|~|\|\||\||&', TokenType.OPERATOR),
 
-                    position = match.end()
-                    newlines = value.count('\n')
-                    if newlines > 0:
-                        line += newlines
-                        line_start = position - len(value.split('\n')[-1])
+    # Punctuation
+    (r',', TokenType.COMMA),
+    (r';', TokenType.SEMICOLON),
+    (r'\.', TokenType.DOT),
+    (r'\(', TokenType.LPAREN),
+    (r'\)', TokenType.RPAREN),
+
+    # Identifiers (including quoted identifiers with backticks or square brackets)
+    (r'`[^`]+`', TokenType.IDENTIFIER),
+    (r'\[[^\]]+\]', TokenType.IDENTIFIER),
+    (r'\b[a-zA-Z_][a-zA-Z0-9_]*\b', TokenType.IDENTIFIER),
+
+    # Whitespace
+    (r'\s+', TokenType.WHITESPACE),
+]
+
+# All patterns are folded into one alternation that is scanned in a single
+# pass by ``findall``. Leading whitespace is absorbed by the ``\s*`` prefix so
+# it never produces a match of its own. Group 1 holds a recognised token and
+# group 2 a single character no pattern accepted (an UNKNOWN token), which
+# keeps e.g. the digit of ``1abc`` apart from a number literal. The final
+# ``\Z`` branch swallows trailing whitespace. Alternation is ordered, so the
+# first pattern that matches wins just as in a pattern-by-pattern loop.
+MASTER_PATTERN = re.compile(
+    r"\s*(?:("
+    + "|".join(
+        pattern
+        for pattern, token_type in TOKEN_PATTERNS
+        if token_type != TokenType.WHITESPACE
+    )
+    + r")|(.)|\Z)",
+    re.MULTILINE | re.DOTALL,
+)
+
+# Token type of a recognised token, decided by its first character. Tokens
+# starting with '-' or '/' are comments when longer than one character.
+_FIRST_CHAR_TYPES = {
+    "'": TokenType.STRING_LITERAL, '"': TokenType.STRING_LITERAL,
+    '=': TokenType.COMPARISON, '<': TokenType.COMPARISON,
+    '>': TokenType.COMPARISON, '!': TokenType.COMPARISON,
+    '+': TokenType.OPERATOR, '-': TokenType.OPERATOR, '*': TokenType.OPERATOR,
+    '/': TokenType.OPERATOR, '%': TokenType.OPERATOR, '~': TokenType.OPERATOR,
+    '|': TokenType.OPERATOR, '&': TokenType.OPERATOR,
+    ',': TokenType.COMMA, ';': TokenType.SEMICOLON, '.': TokenType.DOT,
+    '(': TokenType.LPAREN, ')': TokenType.RPAREN,
+    '`': TokenType.IDENTIFIER, '[': TokenType.IDENTIFIER,
+    '?': TokenType.PARAMETER, ':': TokenType.PARAMETER,
+}
+for _c in '_abcdefghijklmnopqrstuvwxyzABCDEFGHIJKLMNOPQRSTUVWXYZ':
+    _FIRST_CHAR_TYPES[_c] = None  # identifier or keyword
 
-                    matched = True
-                    break
 
-            if not matched:
-                tokens.append(Token(TokenType.UNKNOWN, sql[position]))
-                position += 1
+# Upper bound on the number of distinct tokens remembered by one tokenize
+# call before the interning cache is reset.
+TOKEN_CACHE_SIZE = 4096
+
+# Number of characters read from a file object at a time by iter_tokens.
+DEFAULT_CHUNK_SIZE = 1 << 16
+
+# Number of characters iter_tokens reads past an opening quote, bracket or
+# /* without finding what closes it before taking it to be unterminated, as
+# SQLite limits the length of strings and statements to a billion.
+MAX_TOKEN_LENGTH = 1_000_000_000
+
+# Text opening a token which is only closed further along the input, and the
+# text closing it. When an opener is reported as UNKNOWN mid-stream (or "/*"
+# or "--" are cut off by the end of the input read), the closing text may
+# simply not have been read yet.
+_CLOSERS = {"'": "'", '"': '"', "`": "`", "[": "]", "/*": "*/", "--": "\n"}
+# Closers a backslash escapes, as in the string literal patterns
+_ESCAPED_CLOSERS = frozenset("'\"")
+
+
+def _classify(value: str) -> TokenType:
+    """Token type of a group 1 match. Anything not listed in
+    _FIRST_CHAR_TYPES is a number, since ``\\d`` also accepts
+    non-ASCII digits."""
+    token_type = _FIRST_CHAR_TYPES.get(value[0], TokenType.NUMBER_LITERAL)
+    if token_type is None:
+        return TokenType.KEYWORD if value.upper() in KEYWORDS else TokenType.IDENTIFIER
+    if token_type == TokenType.OPERATOR and len(value) > 1 and value[0] in '-/':
+        return TokenType.COMMENT
+    return token_type
+
+
+class Tokenizer:
+    def __init__(self):
+        self.keywords = KEYWORDS
+        self.token_patterns = TOKEN_PATTERNS
 
-        tokens.append(Token(TokenType.EOF, ''))
+    def tokenize(self, sql: str) -> List[Token]:
+        """Split sql into a list of tokens terminated by an EOF token.
 
+        Whitespace and comments are dropped. Tokens are immutable, so
+        repeated values (keywords, column names, punctuation) share one
+        Token instance instead of allocating a new one per occurrence."""
+        tokens = []
+        append = tokens.append
+        cache: dict[str, Token] = {}
+        for value, unknown in MASTER_PATTERN.findall(sql):
+            if value:
+                token = cache.get(value)
+                if token is None:
+                    token_type = _classify(value)
+                    if token_type == TokenType.COMMENT:
+                        continue
+                    if len(cache) >= TOKEN_CACHE_SIZE:
+                        cache.clear()
+                    token = cache[value] = Token(token_type, value)
+                append(token)
+            elif unknown:
+                append(Token(TokenType.UNKNOWN, unknown))
+        append(Token(TokenType.EOF, ''))
         return tokens
 
     def print_tokens(self, tokens: List[Token]):
@@ -105,6 +165,162 @@ class Tokenizer:
             value_repr = repr(token.value) if token.value else "''"
             print(f"{token.type.value:<15} {value_repr:<20}")
 
+def _iter_matches(
+    source: str | TextIO, chunk_size: int, max_token_length: int = MAX_TOKEN_LENGTH
+) -> Iterator[tuple[Optional[str], Optional[str]]]:
+    """Yield the (token, unknown) groups of successive MASTER_PATTERN matches.
+
+    File objects are read chunk_size characters at a time. A match is only
+    trusted once at least two more characters follow it, which covers every
+    lookahead the patterns make (``\\b``, two character operators, ``1.5``),
+    and once an opening quote, bracket, ``/*`` or ``--`` has been closed.
+    Otherwise more input is read and the match is retried, so tokens may
+    span chunks. While an opener is unclosed, only the text read after it
+    is searched for its closer (see _read_until_closed), so a long token is
+    matched a bounded number of times rather than once per chunk."""
+    if isinstance(source, str):
+        for match in MASTER_PATTERN.finditer(source):
+            if match.lastindex:
+                yield match.group(1, 2)
+        return
+
+    buffer = ""
+    pos = 0
+    eof = False
+    # where in buffer the opener whose closer has been read already starts
+    closed = -1
+    while not eof:
+        chunk = source.read(chunk_size)
+        eof = not chunk
+        # Keep the character before pos so that \b sees the real predecessor.
+        start = max(pos - 1, 0)
+        buffer = buffer[start:] + chunk
+        pos -= start
+        closed -= start
+        while pos < len(buffer):
+            match = MASTER_PATTERN.match(buffer, pos)
+            end = match.end()
+            value, unknown = match.group(1, 2)
+            if not eof:
+                if unknown in _CLOSERS:
+                    opener, opened = unknown, match.start(2)
+                elif value == "/" and end < len(buffer) and buffer[end] == "*":
+                    opener, opened = "/*", match.start(1)
+                elif value is not None and value.startswith("--") and end == len(buffer):
+                    opener, opened = "--", match.start(1)
+                else:
+                    opener = None
+                if opener is not None and opened != closed:
+                    # a line comment only ends at a newline, however long
+                    limit = max_token_length if opener != "--" else None
+                    buffer, eof = _read_until_closed(
+                        source, chunk_size, buffer, opened + len(opener), _CLOSERS[opener], limit
+                    )
+                    closed = opened
+                    continue
+                if end + 1 >= len(buffer):
+                    break
+            if value or unknown:
+                yield value, unknown
+            pos = end
+
+
+def _read_until_closed(
+    source: TextIO, chunk_size: int, buffer: str, begin: int, closer: str, limit: Optional[int]
+) -> tuple[str, bool]:
+    """Reads source onto buffer until closer is found from begin on, or
+    more than limit characters follow begin, or source is exhausted.
+    Returns the longer buffer and whether source is exhausted.
+
+    Chunks are collected in a list and joined once, and each is searched
+    only along with the end of the text before it that a closer of two
+    characters may start in, so this is linear in the length read."""
+    chunks = [buffer]
+    total = len(buffer)
+    segment, offset = buffer, 0
+    search, run = begin, 0
+    while True:
+        index, run = _find_closer(segment, search, closer, run)
+        if index >= 0 or (limit is not None and total - begin > limit):
+            return "".join(chunks), False
+        chunk = source.read(chunk_size)
+        if not chunk:
+            return "".join(chunks), True
+        chunks.append(chunk)
+        keep = max(total - (len(closer) - 1), begin)
+        segment, offset = segment[keep - offset :] + chunk, keep
+        search = 0
+        total += len(chunk)
+
+
+def _find_closer(text: str, begin: int, closer: str, run: int) -> tuple[int, int]:
+    """The index of the first closer in text from begin on, or -1, along
+    with the number of backslashes ending text when there is none.
+
+    A quote after an odd number of backslashes is escaped and does not
+    close the literal; run is the number of backslashes just before begin."""
+    index = text.find(closer, begin)
+    if closer not in _ESCAPED_CLOSERS:
+        return index, 0
+    while index >= 0:
+        backslash = index
+        while backslash > begin and text[backslash - 1] == "\\":
+            backslash -= 1
+        escapes = index - backslash + (run if backslash == begin else 0)
+        if escapes % 2 == 0:
+            return index, 0
+        begin, run = index + 1, 0
+        index = text.find(closer, begin)
+    backslash = len(text)
+    while backslash > begin and text[backslash - 1] == "\\":
+        backslash -= 1
+    return -1, len(text) - backslash + (run if backslash == begin else 0)
+
+
+def iter_tokens(
+    source: str | TextIO, chunk_size: int = DEFAULT_CHUNK_SIZE, max_token_length: int = MAX_TOKEN_LENGTH
+) -> Iterator[Token]:
+    """Lazily tokenize source, either a SQL string or a text file object.
+
+    Yields the same tokens as Tokenizer.tokenize, ending with EOF, without
+    building the full token list or reading the whole file up front. A
+    quote, bracket or /* still unclosed after max_token_length characters
+    of a file object is taken to be unterminated, an UNKNOWN token, so an
+    unterminated quote cannot make the whole rest of the file be held."""
+    cache: dict[str, Token] = {}
+    for value, unknown in _iter_matches(source, chunk_size, max_token_length):
+        if value:
+            token = cache.get(value)
+            if token is None:
+                token_type = _classify(value)
+                if token_type == TokenType.COMMENT:
+                    continue
+                if len(cache) >= TOKEN_CACHE_SIZE:
+                    cache.clear()
+                token = cache[value] = Token(token_type, value)
+            yield token
+        else:
+            yield Token(TokenType.UNKNOWN, unknown)
+    yield Token(TokenType.EOF, '')
+
+
+def iter_statements(source: str | TextIO, chunk_size: int = DEFAULT_CHUNK_SIZE) -> Iterator[List[Token]]:
+    """Split a multi-statement script on SEMICOLON and yield one statement's
+    tokens at a time.
+
+    Each statement is terminated by an EOF token like the output of
+    Tokenizer.tokenize, so it can be handed directly to a parser. The
+    semicolons themselves and empty statements are dropped."""
+    statement: List[Token] = []
+    for token in iter_tokens(source, chunk_size):
+        if token.type == TokenType.SEMICOLON or token.type == TokenType.EOF:
+            if statement:
+                statement.append(Token(TokenType.EOF, ''))
+                yield statement
+                statement = []
+        else:
+            statement.append(token)
+
 # Example usage
 if __name__ == "__main__":
     tokenizer = Tokenizer()
@@ -0,0 +1,97 @@
+from collections import OrderedDict
+from dataclasses import is_dataclass
+from typing import Any, NamedTuple
+
+from baseparser import ParsingException
+from parser import Parser
+from sqltokenizer import Tokenizer
+
+
+class CacheInfo(NamedTuple):
+    hits: int
+    misses: int
+    evictions: int
+    capacity: int
+    size: int
+
+
+class StatementCache:
+    """Bounded LRU cache of parsed statements keyed by SQL text.
+
+    A hit skips tokenizing and parsing entirely and returns a copy of the
+    statement parsed the first time the same text was seen (see
+    copy_statement), so a caller modifying what it was given cannot change
+    what later callers get. Once capacity statements are cached, adding
+    another evicts the least recently used one."""
+
+    def __init__(self, capacity: int = 256):
+        if capacity < 1:
+            raise ValueError(f"Statement cache capacity must be positive, got {capacity}")
+        self.capacity = capacity
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self._statements: OrderedDict[str, Any] = OrderedDict()
+        self._tokenizer = Tokenizer()
+
+    def parse(self, sql: str) -> Any:
+        """Returns the parsed statement for sql, parsing it on a miss.
+
+        Raises ParsingException if sql is not a supported statement.
+        Statements that fail to parse are not cached."""
+        statement = self._statements.get(sql)
+        if statement is not None:
+            self.hits += 1
+            self._statements.move_to_end(sql)
+            return copy_statement(statement)
+        self.misses += 1
+        statement = Parser(self._tokenizer.tokenize(sql)).parse()
+        if statement is None:
+            raise ParsingException(f"Unable to parse statement: {sql}")
+        self._statements[sql] = statement
+        if len(self._statements) > self.capacity:
+            self._statements.popitem(last=False)
+            self.evictions += 1
+        return copy_statement(statement)
+
+    def info(self) -> CacheInfo:
+        return CacheInfo(self.hits, self.misses, self.evictions, self.capacity, len(self))
+
+    def clear(self) -> None:
+        """Drops every cached statement. Counters are kept."""
+        self._statements.clear()
+
+    def __len__(self) -> int:
+        return len(self._statements)
+
+    def __contains__(self, sql: object) -> bool:
+        return sql in self._statements
+
+
+# Values a statement shares with its copies, since they cannot be modified
+_IMMUTABLE_TYPES = frozenset({str, int, float, bool, bytes, type(None)})
+
+
+def copy_statement(node: Any) -> Any:
+    """A copy of a parsed statement, or of any node of one, sharing no
+    dataclass, list, tuple or dict with it.
+
+    Copying is a few times faster than parsing again, as each dataclass
+    is copied through its __dict__ without calling __init__, and values
+    that cannot be modified, such as strings and enum members, are
+    shared rather than visited."""
+    node_type = type(node)
+    if node_type is list:
+        return [item if type(item) in _IMMUTABLE_TYPES else copy_statement(item) for item in node]
+    if node_type is tuple:
+        return tuple(item if type(item) in _IMMUTABLE_TYPES else copy_statement(item) for item in node)
+    if node_type is dict:
+        return {key: value if type(value) in _IMMUTABLE_TYPES else copy_statement(value) for key, value in node.items()}
+    if is_dataclass(node_type):
+        clone = object.__new__(node_type)
+        clone.__dict__ = {
+            name: value if type(value) in _IMMUTABLE_TYPES else copy_statement(value)
+            for name, value in node.__dict__.items()
+        }
+        return clone
+    return node
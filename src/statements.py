@@ -1,8 +1,11 @@
+import operator
 import typing
-from dataclasses import dataclass, field
+from dataclasses import dataclass, field, replace
 from enum import Enum
 from typing import Any, Dict, List, Mapping, Optional, Type, TypeAlias, Union
 
+from patternmatching import match_pattern
+
 
 @dataclass
 class Column:
@@ -47,6 +50,37 @@ class SelectStatement:
     table_name: str
     alias: Optional[str]
     columns: Optional[List[str]]
+    where_expr: Optional["Expression"] = None
+    order_by: Optional[List["OrderingTerm"]] = None
+    # the expression of each of columns, when any is more than a name
+    column_exprs: Optional[List["Expression"]] = None
+    group_by: Optional[List["Expression"]] = None
+    having_expr: Optional["Expression"] = None
+    limit_expr: Optional["Expression"] = None
+    offset_expr: Optional["Expression"] = None
+    # the tables of FROM after the first, in order
+    joins: Optional[List["JoinClause"]] = None
+
+
+@dataclass
+class JoinClause:
+    """A table joined to those before it in FROM, by a comma, CROSS JOIN
+    or [INNER] JOIN, with the condition of its ON clause if any."""
+    table: "QualifiedTableName"
+    on_expr: Optional["Expression"] = None
+
+
+@dataclass
+class OrderingTerm:
+    """A term of ORDER BY: what to sort by, and whether in DESC order."""
+    expr: "Expression"
+    descending: bool = False
+
+
+@dataclass
+class ExplainStatement:
+    """EXPLAIN QUERY PLAN followed by the statement to explain."""
+    statement: Any
 
 
 LiteralType: TypeAlias = int | float | bool | str | bytes | None
@@ -77,6 +111,17 @@ class Literal:
     value: LiteralType
 
 
+@dataclass
+class Parameter:
+    """Placeholder for a value supplied when a prepared statement is executed.
+
+    index is the 1-based position of the value (None for a bare ? until
+    the statement is prepared), name is set for :name parameters."""
+
+    index: Optional[int] = None
+    name: Optional[str] = None
+
+
 @dataclass
 class QualifiedTableName:
     """Container for table name, schema name and alias."""
@@ -95,6 +140,11 @@ class UnaryOperator(str, Enum):
     NEGATIVE = "-"
     NOT = "NOT"
 
+    def execute_op(self, a):
+        if a is None:
+            return None
+        return UNARY_FUNCTIONS[self](a)
+
 
 class BinaryOperator(str, Enum):
     STRING_CONCAT = "||"
@@ -117,56 +167,7 @@ class BinaryOperator(str, Enum):
     OR = "OR"
 
     def execute_op(self, a, b):
-        if self == BinaryOperator.AND:
-            if a is None and b is None:
-                return None
-            if a is None:
-                return bool(b) if bool(b) is False else None
-            if b is None:
-                return bool(a) if bool(a) is False else None
-            return a and b
-        if self == BinaryOperator.OR:
-            if a is None and b is None:
-                return None
-            if a is None:
-                return bool(b) if bool(b) is True else None
-            if b is None:
-                return bool(a) if bool(a) is True else None
-            return a or b
-        if a is None or b is None:
-            return None
-        if self == BinaryOperator.STRING_CONCAT:
-            return a + b
-        if self == BinaryOperator.MULT:
-            return a * b
-        if self == BinaryOperator.DIVIDE:
-            return a / b
-        if self == BinaryOperator.MOD:
-            return a % b
-        if self == BinaryOperator.PLUS:
-            return a + b
-        if self == BinaryOperator.MINUS:
-            return a - b
-        if self == BinaryOperator.AMPERSAND:
-            return bitwise_and(a, b)
-        if self == BinaryOperator.BAR:
-            return bitwise_or(a, b)
-        if self == BinaryOperator.LESS:
-            return a < b
-        if self == BinaryOperator.GREATER:
-            return a > b
-        if self == BinaryOperator.LESS_EQ:
-            return a <= b
-        if self == BinaryOperator.GREATER_EQ:
-            return a >= b
-        if self == BinaryOperator.EQLS:
-            return a == b
-        if self == BinaryOperator.DBL_EQLS:
-            return a == b
-        if self == BinaryOperator.DIAMOND:
-            return a != b
-        if self == BinaryOperator.NOT_EQLS:
-            return a != b
+        return BINARY_OPERATIONS[self](a, b)
 
 
 @dataclass
@@ -199,23 +200,204 @@ BinaryLiterals = typing.Literal[
 ]
 
 
+# Byte i of the table is ~i, so bytes.translate inverts every byte in C
+_INVERTED_BYTES = bytes(~i & 0xFF for i in range(256))
+
+
 def bitwise_not(in_bytes: bytes) -> bytes:
-    buffer = bytearray(in_bytes)
-    for i, b in enumerate(buffer):
-        buffer[i] = ~b & 0xFF
-    return bytes(buffer)
+    return in_bytes.translate(_INVERTED_BYTES)
+
+
+def _blob_operands(b1: bytes, b2: bytes) -> tuple[int, int, int]:
+    """Both blobs as big-endian integers of the same width, plus that
+    width in bytes.
+
+    Blobs of different lengths are aligned at their first byte and the
+    shorter one is padded with zero bytes at the end, so the result of
+    a bitwise operation is as long as the longer operand."""
+    length = max(len(b1), len(b2))
+    a = int.from_bytes(b1, "big") << (8 * (length - len(b1)))
+    b = int.from_bytes(b2, "big") << (8 * (length - len(b2)))
+    return a, b, length
+
 
 def bitwise_and(b1: bytes, b2: bytes) -> bytes:
-    buffer = bytearray(b1)
-    for i, b_i in enumerate(buffer):
-        buffer[i] = b_i & b2[i]
-    return bytes(buffer)
+    a, b, length = _blob_operands(b1, b2)
+    return (a & b).to_bytes(length, "big")
+
 
 def bitwise_or(b1: bytes, b2: bytes) -> bytes:
-    buffer = bytearray(b1)
-    for i, b_i in enumerate(buffer):
-        buffer[i] = b_i | b2[i]
-    return bytes(buffer)
+    a, b, length = _blob_operands(b1, b2)
+    return (a | b).to_bytes(length, "big")
+
+
+# Operator functions for non-NULL operands. Operators are looked up in
+# these tables instead of being compared against each enum member in turn.
+UNARY_FUNCTIONS: dict[UnaryOperator, typing.Callable[[Any], Any]] = {
+    UnaryOperator.NOT: operator.not_,
+    UnaryOperator.POSITIVE: operator.pos,
+    UnaryOperator.NEGATIVE: operator.neg,
+    UnaryOperator.BITWISE_NOT: lambda a: bitwise_not(a) if isinstance(a, bytes) else ~a,
+}
+
+BINARY_FUNCTIONS: dict[BinaryOperator, typing.Callable[[Any, Any], Any]] = {
+    BinaryOperator.STRING_CONCAT: operator.add,
+    BinaryOperator.MULT: operator.mul,
+    BinaryOperator.DIVIDE: operator.truediv,
+    BinaryOperator.MOD: operator.mod,
+    BinaryOperator.PLUS: operator.add,
+    BinaryOperator.MINUS: operator.sub,
+    BinaryOperator.AMPERSAND: lambda a, b: bitwise_and(a, b) if isinstance(a, bytes) else a & b,
+    BinaryOperator.BAR: lambda a, b: bitwise_or(a, b) if isinstance(a, bytes) else a | b,
+    BinaryOperator.LESS: operator.lt,
+    BinaryOperator.GREATER: operator.gt,
+    BinaryOperator.LESS_EQ: operator.le,
+    BinaryOperator.GREATER_EQ: operator.ge,
+    BinaryOperator.EQLS: operator.eq,
+    BinaryOperator.DBL_EQLS: operator.eq,
+    BinaryOperator.DIAMOND: operator.ne,
+    BinaryOperator.NOT_EQLS: operator.ne,
+}
+
+COMPARISON_OPERATORS = frozenset(
+    {
+        BinaryOperator.LESS,
+        BinaryOperator.GREATER,
+        BinaryOperator.LESS_EQ,
+        BinaryOperator.GREATER_EQ,
+        BinaryOperator.EQLS,
+        BinaryOperator.DBL_EQLS,
+        BinaryOperator.DIAMOND,
+        BinaryOperator.NOT_EQLS,
+    }
+)
+
+# Variants for operands known to be of one type. They skip the isinstance
+# checks of the generic functions (and make & and | on ints possible).
+_INT_FUNCTIONS = {
+    **{op: BINARY_FUNCTIONS[op] for op in COMPARISON_OPERATORS},
+    BinaryOperator.MULT: operator.mul,
+    BinaryOperator.DIVIDE: operator.truediv,
+    BinaryOperator.MOD: operator.mod,
+    BinaryOperator.PLUS: operator.add,
+    BinaryOperator.MINUS: operator.sub,
+    BinaryOperator.AMPERSAND: operator.and_,
+    BinaryOperator.BAR: operator.or_,
+}
+
+TYPED_BINARY_FUNCTIONS: dict[tuple[type, type], dict[BinaryOperator, typing.Callable[[Any, Any], Any]]] = {
+    (int, int): _INT_FUNCTIONS,
+    (float, float): {
+        op: function
+        for op, function in _INT_FUNCTIONS.items()
+        if op not in (BinaryOperator.AMPERSAND, BinaryOperator.BAR)
+    },
+    (str, str): {
+        **{op: BINARY_FUNCTIONS[op] for op in COMPARISON_OPERATORS},
+        BinaryOperator.STRING_CONCAT: operator.concat,
+    },
+    (bytes, bytes): {
+        **{op: BINARY_FUNCTIONS[op] for op in COMPARISON_OPERATORS},
+        BinaryOperator.AMPERSAND: bitwise_and,
+        BinaryOperator.BAR: bitwise_or,
+    },
+}
+
+
+def binary_function(
+    op: BinaryOperator, left_type: Optional[type] = None, right_type: Optional[type] = None
+) -> typing.Callable[[Any, Any], Any]:
+    """The function applying op to two non-NULL operands, specialized for
+    the operand types when both are known and a variant exists for them."""
+    return TYPED_BINARY_FUNCTIONS.get((left_type, right_type), BINARY_FUNCTIONS).get(op, BINARY_FUNCTIONS[op])
+
+
+def binary_result_type(op: BinaryOperator, left_type: Optional[type], right_type: Optional[type]) -> Optional[type]:
+    """The type op produces from non-NULL operands of the given types, or
+    None if it cannot be known before evaluation."""
+    if op in COMPARISON_OPERATORS:
+        return bool
+    if left_type != right_type or (left_type, right_type) not in TYPED_BINARY_FUNCTIONS:
+        return None
+    if op not in TYPED_BINARY_FUNCTIONS[(left_type, right_type)]:
+        return None
+    return float if op == BinaryOperator.DIVIDE else left_type
+
+
+def null_propagating(function: typing.Callable[[Any, Any], Any]) -> typing.Callable[[Any, Any], Any]:
+    """Wraps function to return NULL when either operand is NULL."""
+
+    def operation(a, b):
+        if a is None or b is None:
+            return None
+        return function(a, b)
+
+    return operation
+
+
+def logical_and(a, b):
+    """AND with SQL three-valued logic: FALSE beats NULL beats TRUE.
+
+    A false a decides the result: a itself, or False if b is NULL, as
+    BinaryOperator.execute_op has it. Only FALSE is the same either way,
+    so only FALSE spares computing b (see short_circuits)."""
+    if a is not None and not a:
+        return False if b is None else a
+    if a is None:
+        return False if b is not None and not b else None
+    return b
+
+
+def logical_or(a, b):
+    """OR with SQL three-valued logic: TRUE beats NULL beats FALSE.
+
+    A true a decides the result: a itself, or True if b is NULL, as
+    BinaryOperator.execute_op has it. Only TRUE is the same either way,
+    so only TRUE spares computing b (see short_circuits)."""
+    if a is not None and a:
+        return True if b is None else a
+    if a is None:
+        return True if b is not None and b else None
+    return b
+
+
+def between(value: Any, low: Any, high: Any) -> Optional[bool]:
+    """value BETWEEN low AND high, which is low <= value AND value <= high
+    with SQL three-valued logic: NULL if value is NULL, and if a bound is
+    NULL unless the comparison with the other bound is false."""
+    if value is None:
+        return None
+    above = None if low is None else low <= value
+    below = None if high is None else value <= high
+    return logical_and(above, below)
+
+
+def not_between(value: Any, low: Any, high: Any) -> Optional[bool]:
+    """value NOT BETWEEN low AND high: NULL where BETWEEN is."""
+    result = between(value, low, high)
+    return None if result is None else not result
+
+
+# What each BETWEEN operator does, NULLs included
+BETWEEN_FUNCTIONS: dict[str, typing.Callable[[Any, Any, Any], Optional[bool]]] = {
+    "BETWEEN": between,
+    "NOT BETWEEN": not_between,
+}
+
+
+def short_circuits(operator: "BinaryOperator", a: Any) -> bool:
+    """True if a, the left operand of AND or OR, is the result whatever the
+    right one is: FALSE AND x, TRUE OR x. A false 0 or true 5 decides the
+    result too, but whether it is a or a boolean depends on x being NULL."""
+    return a is (operator == BinaryOperator.OR)
+
+
+# What BinaryOperator.execute_op does for each operator, NULLs included
+BINARY_OPERATIONS: dict[BinaryOperator, typing.Callable[[Any, Any], Any]] = {
+    **{op: null_propagating(function) for op, function in BINARY_FUNCTIONS.items()},
+    BinaryOperator.AND: logical_and,
+    BinaryOperator.OR: logical_or,
+}
 
 
 @dataclass
@@ -228,7 +410,7 @@ class Expression:
     route: int = -1
     expr_array: Optional[list["Expression"]] = None
     unary_op: Optional[Union[UnaryOperator, BinaryLiterals]] = None
-    lead_expr: Optional[Union["Expression", Literal, ColumnAddress]] = None
+    lead_expr: Optional[Union["Expression", Literal, Parameter, ColumnAddress]] = None
     binary_op: Optional[Union[BinaryOperator, BinaryLiterals]] = None
     second_expr: Optional[Union["Expression", Literal, ColumnAddress]] = None
     ternary_op: Optional[typing.Literal["AND", "ESCAPE"]] = None
@@ -240,112 +422,57 @@ class Expression:
         no-op.
 
         First term of output is True if Expression was reduced.
-        First term is False if no unary operator was applied."""
+        First term is False if no unary operator was applied.
+
+        The expression is never modified: a reduced expression is a
+        new literal Expression, so parsed statements can be evaluated
+        any number of times (and shared between executions)."""
         if self.route != 5:
             return False, self
         # Simple statements where unary operator is directly followed by a literal,
         # i.e. +10, NOT TRUE, -3.0
-        if (
-            (self.unary_op == UnaryOperator.POSITIVE)
-            and (self.lead_expr.route == 1)
-            and (self.lead_expr.lead_expr.dtype in {int, float})
-        ):
-            return True, self.lead_expr
-        if (
-            (self.unary_op == UnaryOperator.NEGATIVE)
-            and (self.lead_expr.route == 1)
-            and (self.lead_expr.lead_expr.dtype in {int, float})
-        ):
-            out_expression = self.lead_expr
-            out_expression.lead_expr.value *= -1
-            return True, out_expression
-        if (
-            (self.unary_op == UnaryOperator.NOT)
-            and (self.lead_expr.route == 1)
-            and (self.lead_expr.lead_expr.dtype == bool)
-        ):
-            out_expression = self.lead_expr
-            out_expression.lead_expr.value = not out_expression.lead_expr.value
-            return True, out_expression
-        if (
-            (self.unary_op == UnaryOperator.BITWISE_NOT)
-            and (self.lead_expr.route == 1)
-            and (self.lead_expr.lead_expr.dtype == bytes)
-        ):
-            out_expression = self.lead_expr
-            out_expression.lead_expr.value = bitwise_not(out_expression.lead_expr.value)
-            return True, out_expression
-        # Else, assume expression in format like UNARY Expr(Expr(LITERAL) BINARY EXPR(...)...)
-        try:
-            if (
-                (self.unary_op == UnaryOperator.POSITIVE)
-                and (self.lead_expr.binary_op is not None)
-                and (self.lead_expr.lead_expr.route == 1)
-                and (self.lead_expr.lead_expr.lead_expr.dtype in {int, float})
-            ):
-                return True, self.lead_expr
-        except _:
-            if (
-                (self.unary_op == UnaryOperator.NEGATIVE)
-                and (self.lead_expr.binary_op is not None)
-                and (self.lead_expr.lead_expr.route == 1)
-                and (self.lead_expr.lead_expr.lead_expr.dtype in {int, float})
-            ):
-                out_expression = self.lead_expr
-                out_expression.lead_expr.lead_expr.value *= -1
-                return True, out_expression
-        except _:
-            if (
-                (self.unary_op == UnaryOperator.NOT)
-                and (self.lead_expr.binary_op is not None)
-                and (self.lead_expr.lead_expr.route == 1)
-                and (self.lead_expr.lead_expr.lead_expr.dtype == bool)
-            ):
-                out_expression = self.lead_expr
-                out_expression.lead_expr.lead_expr.value = (
-                    not out_expression.lead_expr.value
-                )
-                return True, out_expression
-        except _:
-            if (
-                (self.unary_op == UnaryOperator.BITWISE_NOT)
-                and (self.lead_expr.binary_op is not None)
-                and (self.lead_expr.lead_expr.route == 1)
-                and (self.lead_expr.lead_expr.lead_expr.dtype == bytes)
-            ):
-                out_expression = self.lead_expr
-                out_expression.lead_expr.lead_expr.value = bitwise_not(
-                    out_expression.lead_expr.value
-                )
-                return True, out_expression
-        finally:
+        if not isinstance(self.lead_expr, Expression) or self.lead_expr.route != 1:
             return False, self
+        literal = self.lead_expr.lead_expr
+        if (self.unary_op == UnaryOperator.POSITIVE) and (literal.dtype in {int, float}):
+            return True, self.lead_expr
+        if (self.unary_op == UnaryOperator.NEGATIVE) and (literal.dtype in {int, float}):
+            return True, Expression(route=1, lead_expr=Literal(literal.dtype, -literal.value))
+        if (self.unary_op == UnaryOperator.NOT) and (literal.dtype == bool):
+            return True, Expression(route=1, lead_expr=Literal(bool, not literal.value))
+        if (self.unary_op == UnaryOperator.BITWISE_NOT) and (literal.dtype == bytes):
+            return True, Expression(route=1, lead_expr=Literal(bytes, bitwise_not(literal.value)))
+        return False, self
 
     def evaluate(self, row: Mapping):
         if self.route == 1:
             return self.lead_expr.value
+        if self.route == 2:
+            raise ValueError(f"Attempted to evaluate unbound parameter {self.lead_expr}")
         if self.route == 3:
             return row[self.lead_expr.column_name]
         if self.route == 5:
-            fully_reduced = False
-            expr = self
-            while not fully_reduced:
-                done, new_expression = expr.apply_unary_operator()
-                fully_reduced = done
-                expr = new_expression
-            return expr.evaluate(row)
+            return self.unary_op.execute_op(self.lead_expr.evaluate(row))
         if self.route == 6:
-            return self.binary_op.execute_op(self.lead_expr.evaluate(row), self.second_expr.evaluate(row))
+            lead = self.lead_expr.evaluate(row)
+            if self.binary_op in (BinaryOperator.AND, BinaryOperator.OR) and short_circuits(self.binary_op, lead):
+                return lead
+            return self.binary_op.execute_op(lead, self.second_expr.evaluate(row))
         if self.route == 8:
             # Do not expect to evaluate across a sequence of expressions
             return self.expr_array[0].evaluate(row)
         if self.route == 11:
-            pass
+            escape = None
+            if self.third_expr is not None:
+                escape = self.third_expr.evaluate(row)
+                if escape is None:
+                    return None
+            return match_pattern(self.binary_op, self.lead_expr.evaluate(row), self.second_expr.evaluate(row), escape)
         if self.route == 12:
             if self.unary_op == "ISNULL":
-                return self.evaluate(row) is None
+                return self.lead_expr.evaluate(row) is None
             else:
-                return self.evaluate(row) is not None
+                return self.lead_expr.evaluate(row) is not None
         if self.route == 13:
             if self.binary_op == "IS":
                 return self.lead_expr.evaluate(row) == self.second_expr.evaluate(row)
@@ -358,15 +485,41 @@ class Expression:
             else:
                 raise ValueError(f"Found expression from Route 5 with an invalid comparison operator '{self.binary_op}'")
         if self.route == 14:
-            between_value = self.second_expr.evaluate(row) <= self.lead_expr.evaluate(row) <= self.third_expr.evaluate(row)
-            return between_value if self.binary_op == "BETWEEN" else not between_value
+            return BETWEEN_FUNCTIONS[self.binary_op](
+                self.lead_expr.evaluate(row), self.second_expr.evaluate(row), self.third_expr.evaluate(row)
+            )
         raise ValueError(f"Attempted to evaluate Expression on invalid route {self.route}")
 
 
+def children(expr: Expression) -> list[Expression]:
+    """The Expressions directly under expr, in source order."""
+    result = [child for child in (expr.lead_expr, expr.second_expr, expr.third_expr) if isinstance(child, Expression)]
+    return result + list(expr.expr_array or ())
+
+
+def map_expression(expr: Expression, function: typing.Callable[[Expression], Expression]) -> Expression:
+    """expr with each Expression directly under it replaced by what
+    function returns for it. expr itself is returned, rather than a copy,
+    if function returns every child unchanged, and it is never modified:
+    unchanged subtrees are shared with the result."""
+    changes: dict[str, Any] = {}
+    for name in ("lead_expr", "second_expr", "third_expr"):
+        child = getattr(expr, name)
+        if isinstance(child, Expression):
+            mapped = function(child)
+            if mapped is not child:
+                changes[name] = mapped
+    if expr.expr_array is not None:
+        mapped_array = [function(child) for child in expr.expr_array]
+        if any(mapped is not child for mapped, child in zip(mapped_array, expr.expr_array)):
+            changes["expr_array"] = mapped_array
+    return replace(expr, **changes) if changes else expr
+
+
 @dataclass
 class InsertStatement:
     table_name: str
-    values: list[Expression]
+    values: list[list[Expression]]  # one list of expressions per row
     schema_name: Optional[str] = None
     if_exists: bool = False
     column_names: Optional[list[str]] = None
@@ -0,0 +1,154 @@
+"""Common subexpression elimination across the expressions of a statement.
+
+An UPDATE evaluates its WHERE clause, each SET expression and each
+RETURNING expression for every row, and these often repeat the same work
+(`price * rate` in all three). SharedSubexpressions finds the subtrees
+that are structurally equal, and compile_expression, given it, computes
+each of those once per row into a slot that every consumer then reads.
+
+Slots are filled lazily, the first time a consumer needs one for the
+current row, so a subtree skipped by a short-circuiting AND or OR, or
+only needed by SET for a row the WHERE clause rejects, is not computed."""
+from typing import Any, Callable, Hashable, Iterable, Optional
+
+from statements import ColumnAddress, Expression, Literal, Parameter, children
+
+# Marks a slot not yet computed for the current row
+_UNSET = object()
+
+
+def expression_key(expr: Any) -> Hashable:
+    """A hashable key that is equal for structurally equal expressions.
+
+    Literals compare by type as well as value, so 1, 1.0 and TRUE (which
+    Python considers equal) are kept apart."""
+    if isinstance(expr, Expression):
+        return (
+            expr.route,
+            expr.unary_op,
+            expression_key(expr.lead_expr),
+            expr.binary_op,
+            expression_key(expr.second_expr),
+            expr.ternary_op,
+            expression_key(expr.third_expr),
+            None if expr.expr_array is None else tuple(map(expression_key, expr.expr_array)),
+        )
+    if isinstance(expr, Literal):
+        return ("literal", expr.dtype, expr.value)
+    if isinstance(expr, ColumnAddress):
+        return ("column", expr.column_name, expr.table_name, expr.schema_name)
+    if isinstance(expr, Parameter):
+        return ("parameter", expr.index, expr.name)
+    return expr
+
+
+class SharedSubexpressions:
+    """The subexpressions occurring more than once in a set of expressions,
+    each assigned a slot holding its value for the current row.
+
+    expressions are evaluated against the same row. new_row_expressions
+    (RETURNING) are evaluated against that row after changed_columns have
+    been updated: their subtrees reading a changed column are only shared
+    among themselves, as their values differ from the same subtrees in
+    expressions. Only the outermost repeated subtrees get slots; one that
+    only repeats within those is computed once as part of them anyway.
+
+    Subtrees are recognized by identity when compiling, so compile the
+    very expressions analyzed here, after folding constants."""
+
+    def __init__(
+        self,
+        expressions: Iterable[Optional[Expression]],
+        new_row_expressions: Iterable[Expression] = (),
+        changed_columns: Iterable[str] = (),
+    ):
+        self._changed = frozenset(changed_columns)
+        # id() of every subtree -> its key; the subtrees are kept alive
+        # alongside so that an id cannot be reused by another object
+        self._keys: dict[int, Hashable] = {}
+        self._nodes: list[Expression] = []
+        roots = [expr for expr in expressions if expr is not None]
+        new_roots = list(new_row_expressions)
+        for root in roots:
+            self._index(root, new_row=False)
+        for root in new_roots:
+            self._index(root, new_row=True)
+
+        counts: dict[Hashable, int] = {}
+        for node in self._nodes:
+            key = self._keys[id(node)]
+            counts[key] = counts.get(key, 0) + 1
+        # recount, without descending into the repeats of a repeated subtree
+        effective: dict[Hashable, int] = {}
+        seen: set[Hashable] = set()
+
+        def walk(node: Expression):
+            key = self._keys[id(node)]
+            effective[key] = effective.get(key, 0) + 1
+            if _shareable(node) and counts[key] > 1:
+                if key in seen:
+                    return
+                seen.add(key)
+            for child in children(node):
+                walk(child)
+
+        for root in roots + new_roots:
+            walk(root)
+        shared_keys = [key for key, count in effective.items() if count > 1 and key in seen]
+        self.slots: dict[Hashable, int] = {key: slot for slot, key in enumerate(shared_keys)}
+        self.values: list[Any] = [_UNSET] * len(self.slots)
+        self._unset_row = [_UNSET] * len(self.slots)
+
+    def _index(self, node: Expression, new_row: bool) -> tuple[Hashable, frozenset[str]]:
+        """Records the key of node and of all its subtrees, and returns it
+        with the names of the columns node reads."""
+        if node.route == 3:
+            columns = frozenset([node.lead_expr.column_name])
+        else:
+            columns = frozenset()
+        for child in children(node):
+            columns |= self._index(child, new_row)[1]
+        key = expression_key(node)
+        if new_row and columns & self._changed:
+            key = ("new row", key)
+        self._keys[id(node)] = key
+        self._nodes.append(node)
+        return key, columns
+
+    def __len__(self) -> int:
+        return len(self.slots)
+
+    def slot(self, expr: Expression) -> Optional[int]:
+        """The slot holding the value of expr, None if it is not shared."""
+        key = self._keys.get(id(expr))
+        if key is None or not _shareable(expr):
+            return None
+        return self.slots.get(key)
+
+    def uses_slots(self, expr: Expression) -> bool:
+        """True if any subtree of expr is shared."""
+        return self.slot(expr) is not None or any(self.uses_slots(child) for child in children(expr))
+
+    def start_row(self):
+        """Forgets the values computed for the previous row. Call before
+        evaluating any compiled expression for a new row."""
+        self.values[:] = self._unset_row
+
+    def reader(self, slot: int, compute: Callable[[Any], Any]) -> Callable[[Any], Any]:
+        """A closure returning the value in slot, computing it with compute
+        the first time it is read for the current row."""
+        values = self.values
+
+        def read(row):
+            value = values[slot]
+            if value is _UNSET:
+                value = values[slot] = compute(row)
+            return value
+
+        return read
+
+
+def _shareable(expr: Expression) -> bool:
+    # reading a literal or column is as cheap as reading a slot, and a
+    # route 8 list is not a value
+    return expr.route not in (1, 2, 3, 8)
@@ -1,7 +1,7 @@
-from parser import Parser
 from typing import List, Optional, TypeAlias, Union
 
 from baseparser import BaseParser, ParsingException
+from selectparser import SelectStatementParser
 from sqltoken import TokenType
 from statements import SubQuery, QualifiedTableName
 
@@ -94,13 +94,11 @@ class TableOrSubqueryParser(BaseParser):
                 raise ParsingException(
                     f"Unexpected keyword {self.tokens[0].value} after '('"
                 )
-            select_parser = Parser(self.tokens)
             # TODO: This is not implemented yet
-            select_statement = select_parser.parseSelectStatementIfMatches()
-            if select_statement is not None:
-                super().consume(TokenType.RPAREN)
-                result.append(select_statement)
-                return result
+            select_statement = SelectStatementParser(self.tokens).parse(nested=True)
+            super().consume(TokenType.RPAREN)
+            result.append(select_statement)
+            return result
 
         # Case for list of tables and subqueries
         while True:
@@ -0,0 +1,51 @@
+import pytest
+
+from aggregation import AggregateCall, Grouping, contains_aggregate
+from baseexecuter import ExecutingException
+from expressionparser import ExpressionParser
+from sqltokenizer import Tokenizer
+
+
+class TestAggregation:
+    def setup_method(self):
+        self.tokenizer = Tokenizer()
+        self.parse = lambda sql: ExpressionParser(self.tokenizer.tokenize(sql)).parse()
+
+    def aggregate(self, function, values, distinct=False):
+        accumulator = AggregateCall(function, None, distinct).accumulator()
+        for value in values:
+            accumulator.add(value)
+        return accumulator.result()
+
+    def test_accumulators(self):
+        values = [3, None, 1, 3, 2.5]
+        assert self.aggregate("COUNT", values) == 4
+        assert self.aggregate("COUNT", values, distinct=True) == 3
+        assert self.aggregate("SUM", [1, 2, None]) == 3
+        assert self.aggregate("SUM", values, distinct=True) == 6.5
+        assert self.aggregate("SUM", ["2", "x", b"1.5"]) == 3.5
+        assert self.aggregate("AVG", values) == 2.375
+        assert self.aggregate("MIN", values) == 1
+        assert self.aggregate("MAX", [1, "a", b"b", None]) == b"b"
+        # without any value that is not NULL
+        assert [self.aggregate(function, [None]) for function in ("COUNT", "SUM", "TOTAL", "AVG", "MIN")] == [
+            0,
+            None,
+            0.0,
+            None,
+            None,
+        ]
+
+    def test_rewrite(self):
+        grouping = Grouping([self.parse("a % 2")])
+        rewritten = grouping.rewrite(self.parse("a % 2 + COUNT(*) + max(b) - count(*) + b"))
+        assert [call.function for call in grouping.calls] == ["COUNT", "MAX", "ANY_VALUE"]
+        assert grouping.names == ["key0", "agg0", "agg1", "agg2"]
+        assert rewritten.evaluate({"key0": 1, "agg0": 10, "agg1": 5, "agg2": 100}) == 106
+        assert contains_aggregate(self.parse("1 + min(a)"))
+        assert not contains_aggregate(self.parse("a + 1"))
+
+    @pytest.mark.parametrize("sql", ["nope(a)", "sum(*)", "max(a, b)", "count(min(a))"])
+    def test_invalid_calls(self, sql):
+        with pytest.raises(ExecutingException):
+            Grouping().rewrite(self.parse(sql))
@@ -0,0 +1,52 @@
+import pytest
+from avltree import AvlTree
+
+import avlnodes
+from data import build_balanced_tree, tree_items
+
+
+def check_tree(tree: AvlTree) -> int:
+    """Asserts that the nodes of tree form a balanced search tree over all
+    of its keys with the heights stored in them, and returns its height."""
+    nodes = avlnodes.nodes(tree)
+    seen = []
+
+    def check(key, low, high) -> int:
+        if key is None:
+            return -1
+        assert (low is None or low < key) and (high is None or key < high)
+        seen.append(key)
+        node = nodes[key]
+        lesser = check(node.lesser_child_key, low, key)
+        greater = check(node.greater_child_key, key, high)
+        assert abs(lesser - greater) <= 1
+        assert node.height == 1 + max(lesser, greater)
+        return node.height
+
+    height = check(avlnodes.root_key(tree), None, None)
+    assert sorted(seen) == sorted(nodes) == list(tree)
+    return height
+
+
+class TestAvlNodes:
+    def test_layout(self):
+        avlnodes.check_layout()
+        tree = AvlTree()
+        assert avlnodes.root_key(tree) is None and avlnodes.nodes(tree) == {}
+        for key in range(100):
+            tree[key] = str(key)
+        assert check_tree(tree) == 6
+
+    @pytest.mark.parametrize("size", [0, 1, 2, 7, 100])
+    def test_balanced_tree(self, size):
+        tree = build_balanced_tree([(key, str(key)) for key in range(0, 2 * size, 2)])
+        check_tree(tree)
+        # the tree's own methods work on, and keep balanced, what was built
+        for key in range(1, 2 * size, 4):
+            tree[key] = str(key)
+        for key in range(0, 2 * size, 3):
+            if key in tree:
+                del tree[key]
+        check_tree(tree)
+        assert list(tree_items(tree)) == [(key, tree[key]) for key in tree]
+        assert list(tree_items(tree, 5, 50, reverse=True)) == [(key, tree[key]) for key in tree.between(5, 50)][::-1]
@@ -0,0 +1,47 @@
+import pytest
+
+from baseparser import BaseParser, ParsingException, TokenCursor
+from sqltoken import TokenType
+from sqltokenizer import Tokenizer
+
+
+class TestTokenCursor:
+    def setup_method(self):
+        self.tokenizer = Tokenizer()
+
+    def test_peek_and_advance(self):
+        cursor = TokenCursor(self.tokenizer.tokenize("a , b"))
+        assert cursor.peek().value == "a"
+        assert cursor.peek(1).type == TokenType.COMMA
+        assert cursor.peek(10) is None
+        assert cursor.advance().value == "a"
+        assert cursor[0].type == TokenType.COMMA
+        assert len(cursor) == 3
+
+    def test_mark_and_reset(self):
+        cursor = TokenCursor(self.tokenizer.tokenize("a b c"))
+        mark = cursor.mark()
+        cursor.advance()
+        cursor.advance()
+        assert cursor[0].value == "c"
+        cursor.reset(mark)
+        assert [t.value for t in cursor] == ["a", "b", "c", ""]
+
+    def test_advance_past_end(self):
+        cursor = TokenCursor([])
+        assert not cursor
+        with pytest.raises(ParsingException):
+            cursor.advance()
+
+    def test_sub_parsers_share_cursor(self):
+        """A parser built from another parser's tokens consumes from the
+        same position instead of a copy."""
+        tokens = self.tokenizer.tokenize("a . b")
+        outer = BaseParser(tokens)
+        inner = BaseParser(outer.tokens)
+        inner.consume(TokenType.IDENTIFIER)
+        inner.consume(TokenType.DOT)
+        assert outer.tokens is inner.tokens
+        assert outer.consume(TokenType.IDENTIFIER).value == "b"
+        # the caller's list is left untouched
+        assert len(tokens) == 4
@@ -0,0 +1,87 @@
+from collections import namedtuple
+
+import pytest
+
+from batchevaluator import evaluate_batch, filter_entries, referenced_columns
+from data import Entry
+from expressionparser import ExpressionParser
+from sqltokenizer import Tokenizer
+
+
+Row = namedtuple("Row", ["a", "b", "s"])
+
+ROWS = [
+    Row(1, 2, "x"),
+    Row(5, -3, "y"),
+    Row(0, 0, ""),
+    Row(None, 4, "z"),
+    Row(7, None, None),
+    Row(None, None, "w"),
+]
+
+
+class TestBatchEvaluator:
+    def setup_method(self):
+        self.tokenizer = Tokenizer()
+        self.parse = lambda sql: ExpressionParser(self.tokenizer.tokenize(sql)).parse()
+        self.columns = {name: [getattr(row, name) for row in ROWS] for name in Row._fields}
+
+    @pytest.mark.parametrize(
+        "sql",
+        [
+            "a",
+            "7",
+            "NULL",
+            "-a",
+            "NOT b",
+            "a + b * 2",
+            "s || 'suffix'",
+            "a < b",
+            "a > 0 AND b > 0",
+            "a > 0 OR b > 0",
+            "a AND b",
+            "a OR NULL",
+            "a IS NULL",
+            "a IS NOT b",
+            "b ISNULL",
+            "b NOTNULL",
+            "s LIKE 'X%'",
+            "s NOT GLOB '[xy]'",
+            "s LIKE s",
+            "a LIKE '1%' ESCAPE '$'",
+            "s LIKE 'x' ESCAPE NULL",
+            "s REGEXP '^[a-x]'",
+            "a BETWEEN 0 AND b",
+            "a NOT BETWEEN b AND 4",
+            "(a - 1)",
+        ],
+    )
+    def test_matches_evaluate(self, sql):
+        expr = self.parse(sql)
+        values, nulls = evaluate_batch(expr, self.columns, len(ROWS))
+        expected = [expr.evaluate(row._asdict()) for row in ROWS]
+        assert values == expected
+        assert nulls == [value is None for value in expected]
+
+    def test_between(self):
+        columns = {name: vector[:3] for name, vector in self.columns.items()}
+        values, nulls = evaluate_batch(self.parse("a NOT BETWEEN b AND 4"), columns, 3)
+        assert values == [True, True, False]
+        assert nulls == [False] * 3
+
+    def test_blob_operators(self):
+        columns = {"mask": [b"\x0f\xf0", b"\xff", None], "flag": [b"\x01\x00", b"\x01\x01", b"\x01"]}
+        values, nulls = evaluate_batch(self.parse("(mask & flag) | ~flag"), columns, 3)
+        assert values == [b"\xff\xff", b"\xff\xfe", None]
+        assert nulls == [False, False, True]
+
+    def test_filter_entries(self):
+        entries = [Entry(row) for row in ROWS] * 3
+        where = self.parse("a >= 1 AND b IS NOT NULL OR s = 'w'")
+        expected = [entry for entry in entries if where.evaluate(entry)]
+        assert list(filter_entries(entries, where, Row._fields, batch_size=4)) == expected
+        assert len(expected) == 9
+
+    def test_referenced_columns(self):
+        assert referenced_columns(self.parse("a + 1 > (b, s)")) == {"a", "b", "s"}
+        assert referenced_columns(self.parse("1 = 1")) == set()
@@ -0,0 +1,76 @@
+import copy
+
+from constantfolding import fold_constants
+from expressionparser import ExpressionParser
+from sqltokenizer import Tokenizer
+from statements import BinaryOperator, ColumnAddress, Expression, Literal
+
+
+class TestConstantFolding:
+    def setup_method(self):
+        self.tokenizer = Tokenizer()
+        self.parse = lambda sql: ExpressionParser(self.tokenizer.tokenize(sql)).parse()
+        self.literal = lambda dtype, value: Expression(route=1, lead_expr=Literal(dtype, value))
+        self.column = lambda name: Expression(route=3, lead_expr=ColumnAddress(name))
+
+    def test_unary(self):
+        assert fold_constants(self.parse("-5")) == self.literal(int, -5)
+        assert fold_constants(self.parse("- -2.5")) == self.literal(float, 2.5)
+        assert fold_constants(self.parse("NOT FALSE")) == self.literal(bool, True)
+        assert fold_constants(self.parse("-NULL")) == self.literal(type(None), None)
+
+    def test_binary(self):
+        assert fold_constants(self.parse("1 + 2 * 3")) == self.literal(int, 7)
+        assert fold_constants(self.parse("'a' || 'b'")) == self.literal(str, "ab")
+        assert fold_constants(self.parse("2 < 3 AND NULL ISNULL")) == self.literal(bool, True)
+        assert fold_constants(self.parse("1 BETWEEN 0 AND 2")) == self.literal(bool, True)
+        assert fold_constants(self.parse("NULL IS NULL")) == self.literal(bool, True)
+        assert fold_constants(self.parse("'abc' LIKE 'A%'")) == self.literal(bool, True)
+
+    def test_partial(self):
+        folded = fold_constants(self.parse("col_a + (2 * 3)"))
+        assert folded == Expression(
+            route=6,
+            lead_expr=self.column("col_a"),
+            binary_op=BinaryOperator.PLUS,
+            second_expr=self.literal(int, 6),
+        )
+
+    def test_failing_operation_kept(self):
+        expr = self.parse("col_a + 1 / 0")
+        assert fold_constants(expr) == expr
+
+    def test_logical_simplification(self):
+        comparison = fold_constants(self.parse("col_a = 1"))
+        assert fold_constants(self.parse("col_a = 1 AND TRUE")) == comparison
+        assert fold_constants(self.parse("TRUE AND col_a = 1")) == comparison
+        assert fold_constants(self.parse("col_a = 1 OR FALSE")) == comparison
+        assert fold_constants(self.parse("FALSE OR col_a")) == self.column("col_a")
+        assert fold_constants(self.parse("col_a = 1 OR 1 = 1")) == self.literal(bool, True)
+        assert fold_constants(self.parse("FALSE AND col_a")) == self.literal(bool, False)
+
+    def test_non_boolean_operand_not_simplified(self):
+        # col_a AND TRUE is TRUE for col_a = 5, not 5
+        expr = self.parse("col_a AND TRUE")
+        assert fold_constants(expr) == expr
+
+    def test_parentheses_collapsed(self):
+        folded = fold_constants(self.parse("((col_a)) = (((1)))"))
+        assert folded == Expression(
+            route=6,
+            lead_expr=self.column("col_a"),
+            binary_op=BinaryOperator.EQLS,
+            second_expr=self.literal(int, 1),
+        )
+        # a top-level list is kept
+        assert fold_constants(self.parse("(1 + 1)")) == Expression(route=8, expr_array=[self.literal(int, 2)])
+
+    def test_non_mutating(self):
+        expr = self.parse("-5 + col_a * (2 + 3)")
+        before = copy.deepcopy(expr)
+        folded = fold_constants(expr)
+        assert expr == before
+        assert fold_constants(expr) == folded
+        # an unchanged subtree is shared rather than copied
+        unchanged = self.parse("col_a * col_b")
+        assert fold_constants(unchanged) is unchanged
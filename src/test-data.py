@@ -0,0 +1,42 @@
+from data import Column, Table
+
+
+class TestTable:
+    def setup_method(self):
+        self.table = Table.from_dict({"k": Column(type=int), "v": Column(type=str)})
+        self.table.add_rows({"k": [1, 1, 1, None], "v": ["a", "a", "b", "a"]})
+
+    def test_rowids(self):
+        assert list(self.table.entries) == [1, 2, 3, 4]
+        self.table.add_row({})
+        assert self.table.get_rows()[-1].rowid == 5
+        assert self.table.row_count() == 5
+
+    def test_delete_entry(self):
+        first, second = self.table["v"].get("a")[:2]
+        assert first == second
+        # the rowid tells apart rows holding the same values
+        assert self.table.delete_entry(second)
+        assert not self.table.delete_entry(second)
+        assert [entry.rowid for entry in self.table["k"].get(1)] == [1, 3]
+        assert [entry.rowid for entry in self.table["v"].get("a")] == [1, 4]
+        assert self.table.row_count() == self.table["k"].rows == self.table["v"].rows == 3
+        for entry in self.table.get_rows():
+            assert self.table.delete_entry(entry)
+        assert len(self.table["k"].tree) == len(self.table["v"].tree) == 0
+        assert self.table.entries == {}
+
+    def test_update_entry(self):
+        old = self.table["k"].get(None)[0]
+        assert self.table.update_entry(old, old._replace(k=2))
+        assert self.table.entries[4] == (2, "a")
+        assert self.table["k"].get(None) == []
+        assert [entry.rowid for entry in self.table["k"].get(2)] == [4]
+        # a Column whose value did not change keeps the Entry in its place
+        assert [entry.rowid for entry in self.table["v"].get("a")] == [1, 2, 4]
+        assert self.table["v"].get("a")[2]["k"] == 2
+        old = self.table["k"].get(1)[1]
+        assert self.table.update_entry(old, old._replace(v="c"))
+        assert [entry["v"] for entry in self.table["k"].get(1)] == ["a", "c", "b"]
+        self.table.delete_entry(old)
+        assert not self.table.update_entry(old, old._replace(v="d"))
@@ -0,0 +1,159 @@
+import random
+from collections import namedtuple
+
+import pytest
+
+from baseexecuter import ExecutingException
+from expressioncompiler import compile_expression
+from expressionparser import ExpressionParser
+from sqltokenizer import Tokenizer
+from statements import (
+    TYPED_BINARY_FUNCTIONS,
+    BinaryOperator,
+    UnaryOperator,
+    binary_function,
+    bitwise_and,
+    bitwise_not,
+    bitwise_or,
+)
+
+
+Row = namedtuple("Row", ["a", "b", "s"])
+
+ROWS = [
+    Row(1, 2, "x"),
+    Row(5, -3, "y"),
+    Row(0, 0, ""),
+    Row(None, 4, "z"),
+    Row(7, None, None),
+]
+
+
+class TestExpressionCompiler:
+    def setup_method(self):
+        self.tokenizer = Tokenizer()
+        self.parse = lambda sql: ExpressionParser(self.tokenizer.tokenize(sql)).parse()
+
+    @pytest.mark.parametrize(
+        "sql",
+        [
+            "a",
+            "-5",
+            "NOT TRUE",
+            "-a",
+            "NOT a",
+            "a + b * 2",
+            "(a - b) % 3",
+            "s || 'suffix'",
+            "a < b",
+            "a >= 1 AND b <> 2",
+            "a = 1 OR b = 4 OR s = 'y'",
+            "a IS NULL",
+            "a IS NOT b",
+            "b ISNULL",
+            "b NOTNULL",
+            "a NOT NULL",
+            "s LIKE 'X%'",
+            "s NOT GLOB '[xy]'",
+            "s LIKE s",
+            "a LIKE '1%' ESCAPE '$'",
+            "s LIKE 'x' ESCAPE NULL",
+            "s REGEXP '^[a-x]'",
+            "a BETWEEN 0 AND b",
+            "a NOT BETWEEN b AND 4",
+            "(a + 1, b)",
+        ],
+    )
+    def test_matches_evaluate(self, sql):
+        expr = self.parse(sql)
+        by_position = compile_expression(expr, Row._fields)
+        by_name = compile_expression(expr)
+        for row in ROWS:
+            mapping = row._asdict()
+            expected = expr.evaluate(mapping)
+            assert by_position(row) == expected
+            assert by_name(mapping) == expected
+
+    def test_between(self):
+        expr = self.parse("a BETWEEN 1 AND b + 10")
+        not_expr = self.parse("a NOT BETWEEN 1 AND 5")
+        compiled = compile_expression(expr, Row._fields)
+        not_compiled = compile_expression(not_expr, Row._fields)
+        assert [compiled(row) for row in ROWS[:3]] == [True, True, False]
+        assert [not_compiled(row) for row in ROWS[:3]] == [False, False, True]
+        # NULL as in low <= a AND a <= high: unless one bound decides it
+        assert [compiled(row) for row in ROWS[3:]] == [None, None]
+        assert [not_compiled(row) for row in ROWS[3:]] == [None, True]
+        assert compile_expression(self.parse("a BETWEEN b AND 0"), Row._fields)(ROWS[4]) is False
+
+    def test_expression_unchanged(self):
+        expr = self.parse("-a + -5 * b")
+        before = repr(expr)
+        compiled = compile_expression(expr, Row._fields)
+        assert [compiled(row) for row in ROWS[:2]] == [-11, 10]
+        assert repr(expr) == before
+
+    def test_unknown_column(self):
+        with pytest.raises(ExecutingException):
+            compile_expression(self.parse("missing + 1"), Row._fields)
+
+    def test_unbound_parameter(self):
+        with pytest.raises(ValueError):
+            compile_expression(self.parse("a = ?"), Row._fields)
+
+
+class TestOperatorTables:
+    def test_execute_op_null_handling(self):
+        for op in BinaryOperator:
+            if op in (BinaryOperator.AND, BinaryOperator.OR):
+                continue
+            assert op.execute_op(None, 1) is None
+            assert op.execute_op(1, None) is None
+        assert BinaryOperator.AND.execute_op(None, False) is False
+        assert BinaryOperator.AND.execute_op(None, True) is None
+        assert BinaryOperator.OR.execute_op(True, None) is True
+        assert BinaryOperator.OR.execute_op(False, None) is None
+        assert UnaryOperator.NEGATIVE.execute_op(None) is None
+
+    def test_bitwise_operators(self):
+        assert BinaryOperator.AMPERSAND.execute_op(6, 3) == 2
+        assert BinaryOperator.BAR.execute_op(6, 3) == 7
+        assert BinaryOperator.AMPERSAND.execute_op(b"\x0f\xf0", b"\xff\x0f") == b"\x0f\x00"
+        assert UnaryOperator.BITWISE_NOT.execute_op(b"\x0f") == b"\xf0"
+        assert UnaryOperator.BITWISE_NOT.execute_op(5) == -6
+
+    def test_bitwise_blobs_of_different_lengths(self):
+        # the shorter blob is padded with zero bytes at the end
+        assert bitwise_and(b"\xff\xff\xff", b"\x0f") == b"\x0f\x00\x00"
+        assert bitwise_and(b"\x0f", b"\xff\xff\xff") == b"\x0f\x00\x00"
+        assert bitwise_or(b"\x01", b"\x10\x20") == b"\x11\x20"
+        assert bitwise_or(b"", b"\x10") == b"\x10"
+        assert bitwise_not(b"") == b""
+
+    def test_bitwise_blobs_match_bytewise(self):
+        rng = random.Random(3)
+        for length in (1, 7, 64, 4096):
+            a = bytes(rng.randrange(256) for _ in range(length))
+            b = bytes(rng.randrange(256) for _ in range(length))
+            assert bitwise_and(a, b) == bytes(x & y for x, y in zip(a, b))
+            assert bitwise_or(a, b) == bytes(x | y for x, y in zip(a, b))
+            assert bitwise_not(a) == bytes(~x & 0xFF for x in a)
+
+    @pytest.mark.parametrize(
+        "types, a, b",
+        [((int, int), 7, 3), ((float, float), 7.5, 2.5), ((str, str), "ab", "cd"), ((bytes, bytes), b"\x0c", b"\x0a")],
+    )
+    def test_typed_variants_match_generic(self, types, a, b):
+        for op, function in TYPED_BINARY_FUNCTIONS[types].items():
+            assert binary_function(op, *types) is function
+            assert function(a, b) == op.execute_op(a, b)
+
+    def test_compile_with_column_types(self):
+        parse = lambda sql: ExpressionParser(Tokenizer().tokenize(sql)).parse()
+        column_types = {"a": int, "b": int, "s": str}
+        for sql in ["a & b", "a | 1", "(a + b) / 2 > b", "s || 'x' = 'xx'", "a * b - a % 2"]:
+            expr = parse(sql)
+            typed = compile_expression(expr, Row._fields, column_types)
+            untyped = compile_expression(expr, Row._fields)
+            for row in ROWS:
+                assert typed(row) == untyped(row) == expr.evaluate(row._asdict())
@@ -1,7 +1,9 @@
+import tracemalloc
+
 import pytest
 from expressionparser import ExpressionParser, Expression
 from sqltokenizer import Tokenizer
-from baseparser import ParsingException
+from baseparser import ParsingException, TokenCursor
 from statements import BinaryOperator, UnaryOperator, ColumnAddress, Literal
 
 
@@ -172,20 +174,21 @@ class TestLiteralParser:
                 )
             ],
         )
+        # NOT binds tighter than OR
         expect_5 = Expression(
-            route=5,
-            unary_op=UnaryOperator("NOT"),
+            route=6,
             lead_expr=Expression(
-                route=6,
+                route=5,
+                unary_op=UnaryOperator("NOT"),
                 lead_expr=Expression(route=8, expr_array=[Expression(
             route=6,
             lead_expr=self.TRUE_LITERAL,
             binary_op=BinaryOperator("AND"),
             second_expr=self.FALSE_LITERAL,
         )]),
-                binary_op=BinaryOperator("OR"),
-                second_expr=second_parentheses,
             ),
+            binary_op=BinaryOperator("OR"),
+            second_expr=second_parentheses,
         )
         assert expr_5 == expect_5
 
@@ -508,3 +511,101 @@ class TestLiteralParser:
             route=14
         )
         assert expect_2 == ExpressionParser(case_2).parse()
+
+    def test_failed_route_rewinds_tokens(self):
+        """A literal probe that fails must leave the column address intact."""
+        tokens = self.tokenizer.tokenize("x.y = 1")
+        parser = ExpressionParser(tokens)
+        result = parser.parse()
+        assert result.lead_expr == Expression(route=3, lead_expr=ColumnAddress("y", "x"))
+        assert len(parser.tokens) == 1
+
+    def test_allocations_independent_of_remaining_tokens(self):
+        """Probing routes must not copy the tokens that follow the expression."""
+        peaks = []
+        for trailing in (10, 10000):
+            cursor = TokenCursor(self.tokenizer.tokenize("a = 1 AND b <> 'x' " + "z " * trailing))
+            tracemalloc.start()
+            ExpressionParser(cursor).parse()
+            peaks.append(tracemalloc.get_traced_memory()[1])
+            tracemalloc.stop()
+        assert peaks[1] < 2 * peaks[0]
+
+    def test_precedence_and_over_or(self):
+        col = lambda name: Expression(route=3, lead_expr=ColumnAddress(name))
+        case_1 = self.tokenizer.tokenize("x AND y OR z")
+        expect_1 = Expression(
+            route=6,
+            lead_expr=Expression(
+                route=6, lead_expr=col("x"), binary_op=BinaryOperator("AND"), second_expr=col("y")
+            ),
+            binary_op=BinaryOperator("OR"),
+            second_expr=col("z"),
+        )
+        assert expect_1 == ExpressionParser(case_1).parse()
+
+    def test_precedence_arithmetic(self):
+        """'-a * b + c = d' parses as '(((-a) * b) + c) = d'."""
+        col = lambda name: Expression(route=3, lead_expr=ColumnAddress(name))
+        case_1 = self.tokenizer.tokenize("-a * b + c = d")
+        negative_a = Expression(route=5, unary_op=UnaryOperator("-"), lead_expr=col("a"))
+        product = Expression(route=6, lead_expr=negative_a, binary_op=BinaryOperator("*"), second_expr=col("b"))
+        total = Expression(route=6, lead_expr=product, binary_op=BinaryOperator("+"), second_expr=col("c"))
+        expect_1 = Expression(route=6, lead_expr=total, binary_op=BinaryOperator("="), second_expr=col("d"))
+        assert expect_1 == ExpressionParser(case_1).parse()
+
+    def test_left_associative(self):
+        case_1 = self.tokenizer.tokenize("8 - 4 - 2")
+        expect_1 = Expression(
+            route=6,
+            lead_expr=Expression(
+                route=6, lead_expr=self.int_literal(8), binary_op=BinaryOperator("-"), second_expr=self.int_literal(4)
+            ),
+            binary_op=BinaryOperator("-"),
+            second_expr=self.int_literal(2),
+        )
+        assert expect_1 == ExpressionParser(case_1).parse()
+
+    def test_not_binds_looser_than_comparison(self):
+        case_1 = self.tokenizer.tokenize("NOT 1 = 2")
+        expect_1 = Expression(
+            route=5,
+            unary_op=UnaryOperator("NOT"),
+            lead_expr=Expression(
+                route=6, lead_expr=self.int_literal(1), binary_op=BinaryOperator("="), second_expr=self.int_literal(2)
+            ),
+        )
+        assert expect_1 == ExpressionParser(case_1).parse()
+
+    def test_between_inside_and(self):
+        case_1 = self.tokenizer.tokenize("a BETWEEN 1 AND 2 AND TRUE")
+        result = ExpressionParser(case_1).parse()
+        assert result.route == 6 and result.binary_op == BinaryOperator.AND
+        assert result.lead_expr.route == 14
+        assert result.lead_expr.third_expr == self.int_literal(2)
+        assert result.second_expr == self.TRUE_LITERAL
+
+    def test_long_or_chain_is_balanced(self):
+        def depth(expr):
+            if not isinstance(expr, Expression) or expr.route != 6:
+                return 0
+            return 1 + max(depth(expr.lead_expr), depth(expr.second_expr))
+
+        case_1 = self.tokenizer.tokenize(" OR ".join(f"a = {i}" for i in range(5000)))
+        result = ExpressionParser(case_1).parse()
+        # log2(5000) OR levels plus the '=' comparison
+        assert depth(result) <= 15
+        assert result.evaluate({"a": 4999}) is True
+        assert result.evaluate({"a": 5000}) is False
+
+    def test_route_7_function_call(self):
+        col_a_expr = Expression(lead_expr=ColumnAddress(column_name="col_A"), route=3)
+        expect_1 = Expression(route=7, unary_op="COUNT", expr_array=None)
+        expect_2 = Expression(route=7, unary_op="SUM", expr_array=[col_a_expr], binary_op="DISTINCT")
+        expect_3 = Expression(route=7, unary_op="COALESCE", expr_array=[col_a_expr, self.int_literal(1)])
+        assert expect_1 == ExpressionParser(self.tokenizer.tokenize("count(*)")).parse()
+        assert expect_2 == ExpressionParser(self.tokenizer.tokenize("Sum(DISTINCT col_A)")).parse()
+        assert expect_3 == ExpressionParser(self.tokenizer.tokenize("coalesce(col_A, 1)")).parse()
+        for case in ("max(col_A", "min(,)", "avg(DISTINCT *)"):
+            with pytest.raises(ParsingException):
+                ExpressionParser(self.tokenizer.tokenize(case)).parse()
@@ -145,3 +145,61 @@ class TestLiteralParser:
         assert p_err.errisinstance(ExecutingException)
         assert len(target_tbl["col4"].get(1)) == 0 
 
+
+    def test_multi_row(self):
+        schema = "test_schema"
+        tbl = "test_table1"
+        target_tbl = self.db[schema][tbl]
+        tokens = self.tokenizer.tokenize(
+            f"INSERT INTO {schema}.{tbl} (col1, col3) VALUES (1, 3), (2, NULL), (1, -3)"
+        )
+        insert_statement = InsertStatementParser(tokens).parse()
+        self.exec.execute(self.db, insert_statement)
+        assert len(target_tbl.get_rows()) == 3
+        assert len(target_tbl["col1"].get(1)) == 2
+        assert len(target_tbl["col2"].get(10)) == 3
+        assert sorted(target_tbl["col3"].between()) == [-3, 3]
+        assert target_tbl["col3"].get(None)[0]["col1"] == 2
+
+    def test_multi_row_wrong_datatype_inserts_nothing(self):
+        schema = "test_schema"
+        tbl = "test_table3"
+        target_tbl = self.db[schema][tbl]
+        tokens = self.tokenizer.tokenize(f"INSERT INTO {schema}.{tbl} VALUES (1, 2), (3, 'ROW_VAL')")
+        insert_statement = InsertStatementParser(tokens).parse()
+        with pytest.raises(ExecutingException):
+            self.exec.execute(self.db, insert_statement)
+        assert len(target_tbl["col4"].get(1)) == 0
+
+    def test_multi_row_wrong_length(self):
+        schema = "test_schema"
+        tbl = "test_table3"
+        target_tbl = self.db[schema][tbl]
+        tokens = self.tokenizer.tokenize(f"INSERT INTO {schema}.{tbl} VALUES (1, 2), (3)")
+        insert_statement = InsertStatementParser(tokens).parse()
+        with pytest.raises(ExecutingException):
+            self.exec.execute(self.db, insert_statement)
+        assert len(target_tbl["col4"].get(1)) == 0
+
+    def test_multi_row_batches_merge_into_index(self):
+        schema = "test_schema"
+        tbl = "test_table1"
+        target_tbl = self.db[schema][tbl]
+        for start in (0, 50, 25):
+            rows = ", ".join(f"({i}, {i}, {i % 7})" for i in range(start, start + 50))
+            tokens = self.tokenizer.tokenize(f"INSERT INTO {schema}.{tbl} VALUES {rows}")
+            self.exec.execute(self.db, InsertStatementParser(tokens).parse())
+        assert len(target_tbl.get_rows()) == 150
+        assert list(target_tbl["col1"].between()) == list(range(100))
+        assert len(target_tbl["col1"].get(30)) == 2
+        assert len(target_tbl["col1"].get(60)) == 2
+        assert len(target_tbl["col1"].get(99)) == 1
+        assert target_tbl["col3"].minimum() == 0 and target_tbl["col3"].maximum() == 6
+
+    def test_constant_expressions(self):
+        schema = "test_schema"
+        tbl = "test_table1"
+        target_tbl = self.db[schema][tbl]
+        tokens = self.tokenizer.tokenize(f"INSERT INTO {schema}.{tbl} VALUES (1 + 1, -(2 * 3), NULL)")
+        self.exec.execute(self.db, InsertStatementParser(tokens).parse())
+        assert target_tbl.get_rows() == [(2, -6, None)]
@@ -33,8 +33,9 @@ def test_insert_with_schema_alias_and_columns():
     assert stmt.alias == "u"
     assert stmt.column_names == ["id", "name"]
 
-    assert isinstance(stmt.values, list) and len(stmt.values) == 2
-    v1, v2 = stmt.values
+    assert isinstance(stmt.values, list) and len(stmt.values) == 1
+    assert len(stmt.values[0]) == 2
+    v1, v2 = stmt.values[0]
 
     # 1 → Expression(route=1, lead_expr=Literal(dtype=int, value=1))
     assert isinstance(v1, Expression) and v1.route == 1
@@ -63,12 +64,33 @@ def test_insert_without_schema_alias_or_column_list():
     assert stmt.alias is None
     assert stmt.column_names is None
 
-    assert isinstance(stmt.values, list) and len(stmt.values) == 2
-    v1, v2 = stmt.values
+    assert isinstance(stmt.values, list) and len(stmt.values) == 1
+    assert len(stmt.values[0]) == 2
+    v1, v2 = stmt.values[0]
     assert isinstance(v1.lead_expr, Literal) and v1.lead_expr.dtype is int and v1.lead_expr.value == 2
     assert isinstance(v2.lead_expr, Literal) and v2.lead_expr.dtype is str and v2.lead_expr.value == "bob"
 
 
+def test_insert_multiple_rows():
+    sql = "INSERT INTO users (id, name) VALUES (1, 'a'), (2, 'b'), (3, NULL)"
+    tokens = Tokenizer().tokenize(sql)
+    parser = InsertStatementParser(tokens)
+    stmt = parser.parse()
+
+    assert len(stmt.values) == 3
+    assert [row[0].lead_expr.value for row in stmt.values] == [1, 2, 3]
+    assert [row[1].lead_expr.value for row in stmt.values] == ["a", "b", None]
+    assert len(parser.tokens) == 1  # only EOF remains
+
+
+def test_insert_row_without_parentheses_raises():
+    sql = "INSERT INTO users VALUES (1, 'a'), 2"
+    tokens = Tokenizer().tokenize(sql)
+    parser = InsertStatementParser(tokens)
+    with pytest.raises(ParsingException):
+        parser.parse()
+
+
 def test_insert_missing_comma_in_values_raises():
     """
     VALUES list must be comma-separated. ExpressionParser already raises on malformed tuples.
@@ -0,0 +1,83 @@
+import pytest
+
+from baseexecuter import ExecutingException
+from data import Column, Table
+from expressionparser import ExpressionParser
+from joinplanner import (
+    HASH_JOIN,
+    INDEX_NESTED_LOOP_JOIN,
+    NESTED_LOOP_JOIN,
+    JoinScope,
+    TableInput,
+    plan_join,
+)
+from sqltokenizer import Tokenizer
+
+
+class TestJoinPlanner:
+    def setup_method(self):
+        self.tokenizer = Tokenizer()
+        self.parse = lambda sql: ExpressionParser(self.tokenizer.tokenize(sql)).parse()
+        self.big = Table.from_dict({"id": Column(type=int), "kind": Column(type=int)})
+        self.big.add_rows({"id": list(range(1000)), "kind": [i % 10 for i in range(1000)]})
+        self.small = Table.from_dict({"kind": Column(type=int), "label": Column(type=str)})
+        self.small.add_rows({"kind": list(range(10)), "label": [f"k{i}" for i in range(10)]})
+        self.other = Table.from_dict({"big_id": Column(type=int)})
+        self.other.add_rows({"big_id": list(range(0, 1000, 5))})
+        self.scope = JoinScope(
+            [
+                ("b", None, "big", self.big),
+                ("s", None, "small", self.small),
+                ("o", None, "other", self.other),
+            ]
+        )
+
+    def plan(self, where):
+        return plan_join(self.scope, self.scope.qualify(self.parse(where)))
+
+    def test_qualify(self):
+        expr = self.scope.qualify(self.parse("id + s.kind = big_id"))
+        assert expr.lead_expr.lead_expr.lead_expr.column_name == "b.id"
+        assert expr.lead_expr.second_expr.lead_expr.column_name == "s.kind"
+        assert expr.second_expr.lead_expr.column_name == "o.big_id"
+        for sql in ("kind = 1", "nope = 1", "x.id = 1", "b.label = 1"):
+            with pytest.raises(ExecutingException):
+                self.scope.qualify(self.parse(sql))
+        with pytest.raises(ExecutingException):
+            JoinScope([("t", None, "t", self.big), ("t", None, "t", self.small)])
+
+    def details(self, where):
+        return [node["detail"] for node in self.plan(where).explain().flatten()]
+
+    def test_join_methods(self):
+        plan = self.plan("b.kind = s.kind AND b.id = o.big_id AND label = 'k1'")
+        # the lookup on label is pushed down to small, whose only row then
+        # looks up its kind in big, and the rows found are fewer than those
+        # of other so read into the dict of the hash join
+        assert plan.tables == ["s", "b", "o"]
+        assert (plan.left.method, plan.method, plan.build_left) == (INDEX_NESTED_LOOP_JOIN, HASH_JOIN, True)
+        assert self.details("b.kind = s.kind AND b.id = o.big_id AND label = 'k1'") == [
+            "HASH JOIN BUILD s, b",
+            "INDEX NESTED LOOP JOIN",
+            "SEARCH small AS s USING INDEX label (label=?)",
+            "SEARCH big AS b USING INDEX kind (kind=?)",
+            "SCAN other AS o",
+        ]
+        assert round(plan.left.rows) == 100
+        # two whole tables joined on their columns are merged from the trees
+        assert self.details("b.id = o.big_id AND s.kind = 1")[1:4] == [
+            "MERGE JOIN",
+            "SCAN big AS b USING INDEX id",
+            "SCAN other AS o USING INDEX big_id",
+        ]
+        # keys that are not columns can only be hashed
+        assert self.details("b.id + 0 = o.big_id AND s.kind = 1")[1:2] == ["HASH JOIN BUILD o"]
+
+    def test_nested_loop_join(self):
+        plan = self.plan("b.id < o.big_id AND s.kind = 2")
+        assert plan.method == NESTED_LOOP_JOIN
+        assert plan.residual is not None
+        assert isinstance(plan.left, TableInput) or plan.left.residual is None
+        # without any condition, every pair of rows is joined
+        plan = plan_join(self.scope, None)
+        assert plan.rows == 1000 * 10 * 200
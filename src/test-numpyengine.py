@@ -0,0 +1,81 @@
+import random
+from collections import namedtuple
+
+import pytest
+
+np = pytest.importorskip("numpy")
+
+import numpyengine
+from batchevaluator import filter_entries
+from data import Entry
+from expressionparser import ExpressionParser
+from sqltokenizer import Tokenizer
+
+
+Row = namedtuple("Row", ["i", "j", "f", "s"])
+COLUMN_TYPES = {"i": int, "j": int, "f": float, "s": str}
+
+SUPPORTED = [
+    "i > 3",
+    "i + j * 2 >= f",
+    "i - 3 < 0 AND f > 1.5",
+    "i % 4 = 1 OR j <> 2",
+    "NOT i = 2 OR j ISNULL",
+    "i / 2 > f",
+    "-i < j AND TRUE",
+    "i IS j OR f IS NOT NULL",
+    "j NOTNULL AND i BETWEEN 2 AND 6",
+    "i NOT BETWEEN f AND 5",
+    "j NOT BETWEEN 0 AND f",
+    "(i + 1) * (j - 1) > 10",
+    "NOT (i < 2 AND j > 3)",
+    "i > NULL OR j < 4",
+]
+
+
+def make_entries(count, nulls=True):
+    rng = random.Random(7)
+    entries = []
+    for _ in range(count):
+        j = None if nulls and rng.random() < 0.2 else rng.randrange(-5, 10)
+        f = None if nulls and rng.random() < 0.2 else rng.uniform(-5, 10)
+        entries.append(Entry(Row(rng.randrange(0, 10), j, f, rng.choice("abc"))))
+    return entries
+
+
+class TestNumpyEngine:
+    def setup_method(self):
+        self.tokenizer = Tokenizer()
+        self.parse = lambda sql: ExpressionParser(self.tokenizer.tokenize(sql)).parse()
+
+    @pytest.mark.parametrize("sql", SUPPORTED)
+    def test_matches_python(self, sql):
+        where = self.parse(sql)
+        assert numpyengine.supports(where, COLUMN_TYPES)
+        entries = make_entries(500)
+        expected = [entry for entry in entries if where.evaluate(entry)]
+        assert list(filter_entries(entries, where, Row._fields, column_types=COLUMN_TYPES)) == expected
+
+    @pytest.mark.parametrize("sql", ["s = 'a'", "i || 'x'", "i AND j", "TRUE + 1"])
+    def test_unsupported(self, sql):
+        assert not numpyengine.supports(self.parse(sql), COLUMN_TYPES)
+
+    def test_evaluate_values(self):
+        arrays = {
+            "i": numpyengine.to_array([1, None, 3], int),
+            "f": numpyengine.to_array([0.5, 2.0, None], float),
+        }
+        values, nulls = numpyengine.evaluate(self.parse("i * 2 + f"), arrays, 3)
+        assert numpyengine.to_list(values, nulls) == [2.5, None, None]
+
+    def test_fallback_on_division_by_zero(self):
+        entries = [Entry(Row(1, 0, 1.0, "a"))]
+        where = self.parse("i / j > 0")
+        with pytest.raises(ZeroDivisionError):
+            list(filter_entries(entries, where, Row._fields, column_types=COLUMN_TYPES))
+
+    def test_fallback_on_large_integers(self):
+        big = 1 << 62
+        entries = [Entry(Row(big, 2, 1.0, "a")), Entry(Row(1, 2, 1.0, "a"))]
+        where = self.parse("i * j > 4")
+        assert list(filter_entries(entries, where, Row._fields, column_types=COLUMN_TYPES)) == entries[:1]
@@ -0,0 +1,300 @@
+import pytest
+
+from cursor import Cursor
+from data import Column, Database, Schema, Table
+from expressionparser import ExpressionParser
+from operators import (
+    Filter,
+    HashJoin,
+    IndexNestedLoopJoin,
+    Limit,
+    MergeJoin,
+    NestedLoopJoin,
+    Project,
+    Sort,
+    TableScan,
+    join_key,
+    key_groups,
+)
+from ordering import sort_key
+from selectexecuter import SelectExecuter
+from selectparser import SelectStatementParser
+from sqltokenizer import Tokenizer
+from baseexecuter import ExecutingException
+
+
+class CountingScan(TableScan):
+    """A TableScan recording how many Entries have been pulled from it."""
+
+    pulled = 0
+
+    def __iter__(self):
+        for entry in super().__iter__():
+            self.pulled += 1
+            yield entry
+
+
+class TestOperators:
+    def setup_method(self):
+        self.tokenizer = Tokenizer()
+        self.parse = lambda sql: ExpressionParser(self.tokenizer.tokenize(sql)).parse()
+        self.db = Database()
+        self.db["s"] = Schema()
+        self.table = Table.from_dict({"id": Column(type=int), "name": Column(type=str)})
+        self.db["s"]["t"] = self.table
+        self.table.add_rows({"id": [3, None, 1, 2, 3], "name": ["c", "n", "a", "b", "c2"]})
+
+    def test_scan(self):
+        ids = [entry["id"] for entry in TableScan(self.table)]
+        assert ids == [1, 2, 3, 3, None]
+
+    def test_pipeline(self):
+        scan = CountingScan(self.table)
+        where = Filter(scan, self.parse("id > 1"), self.table.ordered_columns, batch_size=2)
+        rows = Limit(Project(where, ["name"], self.table.ordered_columns), 2)
+        assert scan.pulled == 0
+        assert list(rows) == [{"name": "b"}, {"name": "c"}]
+        # the filter reads one batch past the rows the limit needed
+        assert scan.pulled == 4
+
+    def test_project_order(self):
+        rows = list(Project(TableScan(self.table), ["name", "id"], self.table.ordered_columns))
+        assert list(rows[0]) == ["name", "id"]
+
+    def test_limit_offset(self):
+        ids = [entry["id"] for entry in Limit(TableScan(self.table), 2, offset=1)]
+        assert ids == [2, 3]
+        assert len(list(Limit(TableScan(self.table), None, offset=4))) == 1
+        with pytest.raises(ValueError):
+            Limit([], -1)
+
+    def test_joins(self):
+        key = join_key([self.parse("id")], self.table.ordered_columns)
+        for build_left in (False, True):
+            join = HashJoin(TableScan(self.table), TableScan(self.table), key, key, build_left)
+            # NULL keys match nothing, duplicate keys match each other
+            assert sorted((entry[0], entry[1], entry[3]) for entry in join) == [
+                (1, "a", "a"),
+                (2, "b", "b"),
+                (3, "c", "c"),
+                (3, "c", "c2"),
+                (3, "c2", "c"),
+                (3, "c2", "c2"),
+            ]
+        pairs = list(NestedLoopJoin(TableScan(self.table), Limit(TableScan(self.table), 2)))
+        assert [(entry[0], entry[2]) for entry in pairs[:3]] == [(1, 1), (1, 2), (2, 1)]
+        assert len(pairs) == 10
+        assert list(NestedLoopJoin(TableScan(self.table), [])) == []
+        ids = self.table["id"]
+        ordered = Sort(TableScan(self.table), lambda entry: sort_key(entry[0]))
+        merged = MergeJoin(ids.items_between(), key_groups(ordered, lambda row: row[0]))
+        assert sorted((entry[0], entry[1], entry[3]) for entry in merged) == sorted(
+            (entry[0], entry[1], entry[3]) for entry in join
+        )
+        assert list(MergeJoin(ids.items_between(), [])) == []
+        looked_up = IndexNestedLoopJoin(TableScan(self.table), ids, lambda row: row[0], lambda row: row[1] != "c")
+        assert [(entry[1], entry[3]) for entry in looked_up] == [("a", "a"), ("b", "b"), ("c", "c2"), ("c2", "c2")]
+        # integer keys cannot be searched for in the tree of a TEXT column
+        assert list(IndexNestedLoopJoin(TableScan(self.table), self.table["name"], lambda row: row[0])) == []
+
+    def test_sort(self):
+        key = lambda entry: sort_key(entry["name"])
+        names = [entry["name"] for entry in Sort(TableScan(self.table), key, limit=2)]
+        assert names == ["a", "b"]
+        names = [entry["name"] for entry in Sort(TableScan(self.table), key, reverse=True)]
+        assert names == ["n", "c2", "c", "b", "a"]
+        # NULL first, then numbers, then text
+        assert sorted(["x", None, 2.5, True, b"b", 1], key=sort_key) == [None, True, 1, 2.5, "x", b"b"]
+
+    def test_cursor(self):
+        statement = SelectStatementParser(self.tokenizer.tokenize("SELECT id FROM s.t")).parse()
+        cursor = SelectExecuter().open(self.db, statement)
+        assert cursor.columns == ["id"]
+        assert cursor.fetchone() == {"id": 1}
+        assert cursor.fetchmany(2) == [{"id": 2}, {"id": 3}]
+        assert next(cursor) == {"id": 3}
+        assert cursor.fetchall() == [{"id": None}]
+        assert cursor.fetchone() is None
+        cursor.close()
+        with pytest.raises(ExecutingException):
+            cursor.fetchone()
+
+    def test_cursor_is_lazy(self):
+        scan = CountingScan(self.table)
+        with Cursor(scan, ["id"]) as cursor:
+            cursor.fetchone()
+        assert scan.pulled == 1
+
+    def test_execute_returns_all_rows(self):
+        statement = SelectStatementParser(self.tokenizer.tokenize("SELECT * FROM s.t")).parse()
+        rows = SelectExecuter().execute(self.db, statement)
+        # Entries with NULL in the first column are returned exactly once
+        assert len(rows) == 5
+        assert rows[-1] == {"id": None, "name": "n"}
+
+    @pytest.mark.parametrize(
+        "where",
+        [
+            "id = 3",
+            "id IS NULL",
+            "id IS 3",
+            "id < 3",
+            "2 <= id",
+            "id NOT NULL AND id BETWEEN 2 AND 3",
+            "id NOT BETWEEN 1 AND 2",
+            "id + 0 BETWEEN 1 AND 5",
+            "id BETWEEN NULL AND 2",
+            "id > 1 AND id < 3",
+            "id > 1 AND name = 'c2'",
+            "name LIKE 'C%'",
+            "id = 3 OR id = 1",
+            "id = 'x'",
+        ],
+    )
+    def test_select_where(self, where):
+        statement = SelectStatementParser(self.tokenizer.tokenize(f"SELECT * FROM s.t WHERE {where}")).parse()
+        rows = SelectExecuter().execute(self.db, statement)
+        expected = [entry for entry in TableScan(self.table) if self.parse(where).evaluate(entry)]
+        key = lambda row: (str(row["id"]), row["name"])
+        assert sorted(rows, key=key) == sorted((dict(entry) for entry in expected), key=key)
+
+    @pytest.mark.parametrize(
+        "query, ids",
+        [
+            ("ORDER BY id", [None, 1, 2, 3, 3]),
+            ("ORDER BY id DESC LIMIT 3", [3, 3, 2]),
+            ("ORDER BY name DESC", [None, 3, 3, 2, 1]),
+            ("ORDER BY id DESC, name DESC", [3, 3, 2, 1, None]),
+            ("ORDER BY id, name DESC LIMIT 2 OFFSET 2", [2, 3]),
+            ("WHERE id > 1 ORDER BY id DESC", [3, 3, 2]),
+            ("WHERE id < 3 ORDER BY name DESC LIMIT 1", [2]),
+            ("ORDER BY -id LIMIT 3", [None, 3, 3]),
+            ("ORDER BY 2 LIMIT 1", [1]),
+            ("LIMIT 2, 1", [3]),
+            ("LIMIT -1 OFFSET 3", [3, None]),
+        ],
+    )
+    def test_select_order_by(self, query, ids):
+        statement = SelectStatementParser(self.tokenizer.tokenize(f"SELECT id, name FROM s.t {query}")).parse()
+        rows = SelectExecuter().execute(self.db, statement)
+        if "ORDER BY id DESC, name" in query:
+            assert [row["name"] for row in rows] == ["c2", "c", "b", "a", "n"]
+        assert [row["id"] for row in rows] == ids
+
+    def test_select_order_by_index(self):
+        """Ordering by a column reads its tree in order instead of sorting."""
+        plan = lambda query: SelectExecuter().plan(
+            self.db, SelectStatementParser(self.tokenizer.tokenize(f"SELECT id FROM s.t {query}")).parse()
+        )
+        assert [row["detail"] for row in plan("ORDER BY id DESC LIMIT 2").flatten()] == [
+            "LIMIT 2",
+            "SCAN t USING INDEX id",
+        ]
+        assert plan("ORDER BY id DESC LIMIT 2").rows == 2
+        assert [row["detail"] for row in plan("ORDER BY id + 1 LIMIT 2").flatten()] == [
+            "LIMIT 2",
+            "SORT TOP 2",
+            "SCAN t",
+        ]
+        with pytest.raises(ExecutingException):
+            plan("ORDER BY 3")
+        with pytest.raises(ExecutingException):
+            plan("LIMIT 'x'")
+
+    @pytest.mark.parametrize(
+        "query, rows",
+        [
+            ("SELECT COUNT(*), COUNT(id), MIN(id), MAX(name) FROM s.t", [(5, 4, 1, "n")]),
+            ("SELECT COUNT(DISTINCT id), SUM(id), AVG(id) FROM s.t", [(3, 9, 2.25)]),
+            ("SELECT COUNT(*), SUM(id), TOTAL(id) FROM s.t WHERE id > 5", [(0, None, 0.0)]),
+            ("SELECT id, COUNT(*) FROM s.t GROUP BY id", [(None, 1), (1, 1), (2, 1), (3, 2)]),
+            ("SELECT id, COUNT(*) AS n FROM s.t GROUP BY id HAVING n > 1", [(3, 2)]),
+            ("SELECT id % 2 AS odd, COUNT(*) FROM s.t GROUP BY id % 2 ORDER BY odd DESC", [(1, 3), (0, 1), (None, 1)]),
+            ("SELECT MAX(name) || '!' FROM s.t WHERE id < 3 GROUP BY id ORDER BY 1", [("a!",), ("b!",)]),
+            ("SELECT id, name FROM s.t WHERE id = 1 GROUP BY id", [(1, "a")]),
+            ("SELECT COUNT(*) FROM s.t GROUP BY name LIMIT 2 OFFSET 4", [(1,)]),
+        ],
+    )
+    def test_select_group_by(self, query, rows):
+        statement = SelectStatementParser(self.tokenizer.tokenize(query)).parse()
+        assert [tuple(row.values()) for row in SelectExecuter().execute(self.db, statement)] == rows
+
+    def test_select_aggregate_plans(self):
+        """Aggregates are read from indexes when they can be, and a group
+        by column is streamed from its tree instead of hashed."""
+        plan = lambda query: [
+            row["detail"]
+            for row in SelectExecuter()
+            .plan(self.db, SelectStatementParser(self.tokenizer.tokenize(query)).parse())
+            .flatten()
+        ]
+        assert plan("SELECT COUNT(*), MIN(id), MAX(id), COUNT(DISTINCT name) FROM s.t") == [
+            "SEARCH t USING INDEX STATISTICS"
+        ]
+        assert plan("SELECT name, COUNT(*) FROM s.t GROUP BY name") == [
+            "STREAM AGGREGATE USING INDEX name",
+            "SCAN t USING INDEX name",
+        ]
+        assert plan("SELECT COUNT(*) FROM s.t GROUP BY id + 1 HAVING COUNT(*) > 1") == [
+            "FILTER",
+            "HASH AGGREGATE",
+            "SCAN t",
+        ]
+        for query in ("SELECT SUM(*) FROM s.t", "SELECT MAX(MIN(id)) FROM s.t", "SELECT NOPE(id) FROM s.t"):
+            with pytest.raises(ExecutingException):
+                plan(query)
+
+    @pytest.mark.parametrize(
+        "query, rows",
+        [
+            ("SELECT t.name, u.name FROM s.t, s.t AS u WHERE t.id = u.id AND t.name < u.name", [("c", "c2")]),
+            ("SELECT t.name, v FROM s.t JOIN s.u ON id = tid WHERE v > 10 ORDER BY v", [("a", 11), ("c", 30), ("c2", 30)]),
+            ("SELECT * FROM s.t INNER JOIN s.u ON id = tid AND name = 'a' LIMIT 1", [(1, "a", 1, 10)]),
+            ("SELECT id, COUNT(*) AS n FROM s.t, s.u WHERE id = tid GROUP BY id HAVING n > 1", [(1, 2), (3, 2)]),
+            ("SELECT COUNT(*) FROM s.t CROSS JOIN s.u", [(25,)]),
+            ("SELECT id, tid FROM s.t, s.u WHERE id + 1 = tid OR id IS NULL AND tid IS NULL", [(None, None), (2, 3)]),
+        ],
+    )
+    def test_select_join(self, query, rows):
+        u = Table.from_dict({"tid": Column(type=int), "v": Column(type=int)})
+        u.add_rows({"tid": [1, 1, 3, None, 5], "v": [10, 11, 30, 40, 50]})
+        self.db["s"]["u"] = u
+        statement = SelectStatementParser(self.tokenizer.tokenize(query)).parse()
+        assert sorted(
+            (tuple(row.values()) for row in SelectExecuter().execute(self.db, statement)), key=str
+        ) == sorted(rows, key=str)
+
+    @pytest.mark.parametrize(
+        "where, method",
+        [
+            ("id = tid", "MERGE JOIN"),
+            ("id = tid AND v < 5", "INDEX NESTED LOOP JOIN"),
+            ("id = tid AND id > 190", "INDEX NESTED LOOP JOIN"),
+            ("id = tid + 0 AND v % 2 = 0", "HASH JOIN"),
+            ("id = tid AND id % 2 = 0 AND v % 3 = 0", "MERGE JOIN"),
+            ("id = tid AND name > 'n1'", "INDEX NESTED LOOP JOIN"),
+            ("id = tid AND v > 10", "HASH JOIN"),
+            # TEXT = INTEGER keys match nothing and are not looked up
+            ("name = tid AND v < 5", "INDEX NESTED LOOP JOIN"),
+            ("id < tid AND v = 3", "NESTED LOOP JOIN"),
+        ],
+    )
+    def test_select_join_methods(self, where, method):
+        t = Table.from_dict({"id": Column(type=int), "name": Column(type=str)})
+        t.add_rows({"id": [*range(200), None], "name": [f"n{i}" for i in range(200)] + [None]})
+        u = Table.from_dict({"tid": Column(type=int), "v": Column(type=int)})
+        u.add_rows({"tid": [i * 7 % 250 for i in range(300)] + [None], "v": [*range(300), 0]})
+        self.db["s"]["t"], self.db["s"]["u"] = t, u
+        query = SelectStatementParser(self.tokenizer.tokenize(f"SELECT id, name, tid, v FROM s.t, s.u WHERE {where}"))
+        statement = query.parse()
+        executer = SelectExecuter()
+        assert method in [row["detail"].split(" BUILD")[0] for row in executer.plan(self.db, statement).flatten()]
+        condition = self.parse(where)
+        expected = [
+            (*left, *right)
+            for left in TableScan(t)
+            for right in TableScan(u)
+            if condition.evaluate({**dict(left), **dict(right)})
+        ]
+        rows = [tuple(row.values()) for row in executer.execute(self.db, statement)]
+        assert sorted(rows, key=str) == sorted(expected, key=str)
@@ -0,0 +1,88 @@
+import pytest
+
+from patternmatching import (
+    compile_pattern,
+    literal_prefix,
+    match_pattern,
+    prefix_ranges,
+    prefix_upper_bound,
+)
+
+
+class TestPatternMatching:
+    def test_like(self):
+        assert match_pattern("LIKE", "abcdef", "abc%")
+        assert match_pattern("LIKE", "ABCdef", "abc%")
+        assert match_pattern("LIKE", "abc", "a_c")
+        assert not match_pattern("LIKE", "abbc", "a_c")
+        assert not match_pattern("LIKE", "xabc", "abc%")
+        assert match_pattern("LIKE", "a\nb", "a%b")
+        assert match_pattern("LIKE", "a.*b", "a.*b")
+        # only ASCII letters are compared ignoring case
+        assert not match_pattern("LIKE", "Ä", "ä")
+        assert match_pattern("LIKE", 123, "12%")
+        assert match_pattern("NOT LIKE", "abc", "x%")
+        assert not match_pattern("NOT LIKE", "abc", "a%")
+
+    def test_like_escape(self):
+        assert match_pattern("LIKE", "100%", "100$%", "$")
+        assert not match_pattern("LIKE", "1000", "100$%", "$")
+        assert match_pattern("LIKE", "a_b", "a$_b", "$")
+        assert not match_pattern("LIKE", "axb", "a$_b", "$")
+        with pytest.raises(ValueError):
+            match_pattern("LIKE", "abc", "abc", "$$")
+
+    def test_glob(self):
+        assert match_pattern("GLOB", "abcdef", "abc*")
+        assert not match_pattern("GLOB", "ABCdef", "abc*")
+        assert match_pattern("GLOB", "abc", "a?c")
+        assert match_pattern("GLOB", "b1", "[a-c][0-9]")
+        assert not match_pattern("GLOB", "d1", "[a-c][0-9]")
+        assert match_pattern("GLOB", "d", "[^a-c]")
+        assert match_pattern("GLOB", "]", "[]]")
+        assert match_pattern("GLOB", "-", "[a-]")
+        assert match_pattern("GLOB", "a[", "a[")
+        assert match_pattern("GLOB", "100%", "100%")
+
+    def test_regexp(self):
+        assert match_pattern("REGEXP", "abc123", "[0-9]+")
+        assert not match_pattern("REGEXP", "abc", "^b")
+        assert match_pattern("NOT REGEXP", "abc", "^b")
+
+    def test_null(self):
+        assert match_pattern("LIKE", None, "a%") is None
+        assert match_pattern("LIKE", "a", None) is None
+        assert match_pattern("NOT GLOB", None, "a*") is None
+
+    def test_unsupported(self):
+        with pytest.raises(ValueError):
+            match_pattern("MATCH", "abc", "abc")
+        with pytest.raises(ValueError):
+            match_pattern("GLOB", "abc", "abc", "$")
+
+    def test_cache(self):
+        compile_pattern.cache_clear()
+        for value in ["a", "ab", "abc"]:
+            match_pattern("LIKE", value, "a%")
+        info = compile_pattern.cache_info()
+        assert info.misses == 1 and info.hits == 2
+        # the same text under another operator is another pattern
+        match_pattern("GLOB", "a", "a%")
+        assert compile_pattern.cache_info().misses == 2
+
+    def test_prefix(self):
+        assert literal_prefix("LIKE", "abc%def") == "abc"
+        assert literal_prefix("LIKE", "ab_") == "ab"
+        assert literal_prefix("LIKE", "a$%b%", "$") == "a%b"
+        assert literal_prefix("LIKE", "%abc") == ""
+        assert literal_prefix("GLOB", "ab[c]*") == "ab"
+        assert literal_prefix("GLOB", "ab%*") == "ab%"
+        assert prefix_upper_bound("abc") == "abd"
+        assert prefix_upper_bound("a\U0010FFFF") == "b"
+        assert prefix_upper_bound("\U0010FFFF") is None
+
+    def test_prefix_ranges(self):
+        assert prefix_ranges("GLOB", "ab") == [("ab", "ac")]
+        assert prefix_ranges("LIKE", "1a") == [("1A", "1B"), ("1a", "1b")]
+        assert len(prefix_ranges("LIKE", "abcdefgh")) == 16
+        assert prefix_ranges("LIKE", "") == []
@@ -0,0 +1,127 @@
+from data import Column, Table
+from expressionparser import ExpressionParser
+from planner import (
+    IndexLookup,
+    KeyRange,
+    NullLookup,
+    OrderedScan,
+    PlanNode,
+    RangeScan,
+    access_plans,
+    candidate_entries,
+    choose_access_path,
+    pattern_scan,
+    plan_table_access,
+)
+from sqltokenizer import Tokenizer
+
+
+class TestPlanner:
+    def setup_method(self):
+        self.tokenizer = Tokenizer()
+        self.parse = lambda sql: ExpressionParser(self.tokenizer.tokenize(sql)).parse()
+        self.table = Table.from_dict({"name": Column(type=str), "n": Column(type=int)})
+        names = ["apple", "Apricot", "banana", "apex", "cherry", None, "ap"]
+        self.table.add_rows({"name": names, "n": [0, 1, 2, 3, 4, 5, None]})
+
+    def names(self, where):
+        return sorted(str(entry["name"]) for entry in candidate_entries(self.table, self.parse(where)))
+
+    def path(self, where):
+        return choose_access_path(self.table, self.parse(where))
+
+    def test_pattern_scan(self):
+        assert pattern_scan(self.parse("name GLOB 'ap*'"), self.table) == RangeScan(
+            "name", [KeyRange("ap", "aq", include_stop=False)]
+        )
+        assert pattern_scan(self.parse("name LIKE 'a%'"), self.table) == RangeScan(
+            "name", [KeyRange("A", "B", include_stop=False), KeyRange("a", "b", include_stop=False)]
+        )
+        # no constant prefix, a non-TEXT column, or NOT: no range scan
+        assert pattern_scan(self.parse("name LIKE '%a'"), self.table) is None
+        assert pattern_scan(self.parse("n LIKE '1%'"), self.table) is None
+        assert pattern_scan(self.parse("name NOT LIKE 'a%'"), self.table) is None
+
+    def test_lookups(self):
+        assert self.path("n = 3") == (IndexLookup("n", 3), None)
+        assert self.path("3 == n") == (IndexLookup("n", 3), None)
+        assert self.path("n IS 3") == (IndexLookup("n", 3), None)
+        assert self.path("n IS NULL") == (NullLookup("n"), None)
+        assert self.path("name ISNULL") == (NullLookup("name"), None)
+        # the cheapest lookup is used, the other is left to check: reading
+        # the one NULL costs less than searching a tree for a missing key
+        path, residual = self.path("n IS NULL AND name = 'nothing'")
+        assert path == NullLookup("n")
+        assert residual == self.parse("name = 'nothing'")
+        path, residual = self.path("n = 5 AND name = 'nothing'")
+        assert path == IndexLookup("name", "nothing")
+        assert residual == self.parse("n = 5")
+
+    def test_ranges(self):
+        assert self.path("n < 3") == (RangeScan("n", [KeyRange(stop=3, include_stop=False)]), None)
+        assert self.path("3 <= n") == (RangeScan("n", [KeyRange(start=3)]), None)
+        assert self.path("n BETWEEN 1 AND 2") == (RangeScan("n", [KeyRange(1, 2)]), None)
+        path, residual = self.path("n > 1 AND name <> 'x' AND n <= 4 AND n >= 2")
+        assert path == RangeScan("n", [KeyRange(2, 4)])
+        assert residual == self.parse("name <> 'x'")
+
+    def test_no_path(self):
+        # a column compared with a value of another type, or with NULL
+        assert self.path("name < 5")[0] is None
+        assert self.path("n = NULL")[0] is None
+        assert self.path("n + 1 = 3")[0] is None
+        assert self.path("n = 1 OR n = 2")[0] is None
+        assert choose_access_path(self.table, None) == (None, None)
+
+    def test_candidates(self):
+        assert self.names("name GLOB 'ap*'") == ["ap", "apex", "apple"]
+        assert self.names("name LIKE 'ap%'") == ["Apricot", "ap", "apex", "apple"]
+        assert self.names("n > 1 AND n < 4") == ["apex", "banana"]
+        assert self.names("n >= 4 AND n < 4") == []
+        assert self.names("n = 2 AND name LIKE 'a%'") == ["banana"]
+        assert self.names("name IS NULL") == ["None"]
+        assert len(list(candidate_entries(self.table, self.parse("name LIKE '%p%'")))) == 7
+        assert len(list(candidate_entries(self.table, None))) == 7
+
+    def test_key_range(self):
+        assert KeyRange(1, 5).intersect(KeyRange(start=3, include_start=False)) == KeyRange(3, 5, False, True)
+        assert KeyRange(stop=5).intersect(KeyRange(stop=5, include_stop=False)) == KeyRange(stop=5, include_stop=False)
+        assert KeyRange(3, 3, True, False).is_empty()
+        assert KeyRange(4, 3).is_empty()
+        assert not KeyRange(3, 3).is_empty()
+
+    def test_costs(self):
+        plans = access_plans(self.table, self.parse("n > 1 AND name LIKE 'b%'"))
+        assert [plan.path for plan in plans] == [
+            None,
+            RangeScan("name", [KeyRange("B", "C", include_stop=False), KeyRange("b", "c", include_stop=False)]),
+            RangeScan("n", [KeyRange(start=1, include_start=False)]),
+        ]
+        # the scan reads every row and filters them all
+        assert plans[0].rows_read == 7
+        assert plans[0].cost > max(plan.cost for plan in plans[1:])
+        assert plan_table_access(self.table, None).cost == 7
+
+    def test_explain(self):
+        plan = plan_table_access(self.table, self.parse("n = 2")).explain("t")
+        assert plan == PlanNode("SEARCH t USING INDEX n (n=?)", 1, plan.cost)
+        plan = plan_table_access(self.table, self.parse("n > 1 AND n <= 3 AND name LIKE '%x'")).explain("t")
+        assert plan.detail == "FILTER"
+        assert [child.detail for child in plan.children] == ["SEARCH t USING INDEX n (n>? AND n<=?)"]
+        assert [row["detail"] for row in plan.flatten()] == ["FILTER", "SEARCH t USING INDEX n (n>? AND n<=?)"]
+        assert [(row["id"], row["parent"]) for row in plan.flatten()] == [(1, 0), (2, 1)]
+        plan = plan_table_access(self.table, self.parse("n + 1 = 2")).explain("t")
+        assert [row["detail"] for row in plan.flatten()] == ["FILTER", "SCAN t"]
+
+    def test_ordered_plans(self):
+        n = lambda path: [entry["n"] for entry in path.entries(self.table)]
+        assert n(OrderedScan("n")) == [None, 0, 1, 2, 3, 4, 5]
+        assert n(OrderedScan("n", descending=True)) == [5, 4, 3, 2, 1, 0, None]
+        assert n(RangeScan("n", [KeyRange(1, 4, include_start=False)], descending=True)) == [4, 3, 2]
+        # a range on the ordering column is read in that order
+        plan = plan_table_access(self.table, self.parse("n > 1"), ("n", True))
+        assert (plan.path, plan.ordered) == (RangeScan("n", [KeyRange(start=1, include_start=False)], True), True)
+        plan = plan_table_access(self.table, None, ("name", False), limit=2)
+        assert (plan.path, plan.ordered, plan.rows) == (OrderedScan("name"), True, 2)
+        # without an order, a limit only scales the estimates
+        assert plan_table_access(self.table, None, limit=2).path is None
@@ -0,0 +1,103 @@
+import pytest
+
+from baseexecuter import ExecutingException
+from baseparser import ParsingException
+from data import Column as OutColumn
+from data import Database, Schema, Table
+from prepared import prepare
+from statementcache import StatementCache
+from statements import Expression, Literal, Parameter
+
+
+class TestPreparedStatement:
+    def setup_method(self):
+        self.db = Database()
+        self.db["test_schema"] = Schema()
+        self.db["test_schema"]["test_table1"] = Table.from_dict(
+            {
+                "col1": OutColumn(type=int, default=None),
+                "col2": OutColumn(type=str, default=""),
+            }
+        )
+        self.table = self.db["test_schema"]["test_table1"]
+
+    def test_parameter_numbering(self):
+        stmt = prepare("UPDATE test_schema.test_table1 SET col1 = ?, col2 = :name WHERE col1 = ?5 OR col2 = :name")
+        assert stmt.parameter_count == 5
+        assert stmt.parameter_names == {"name": 2}
+        assert stmt.statement.set_assignments[0]["expression"] == Expression(route=2, lead_expr=Parameter())
+
+    def test_insert_positional(self):
+        stmt = prepare("INSERT INTO test_schema.test_table1 VALUES (?, ?)")
+        for i in range(5):
+            stmt.execute(self.db, [i, f"row{i}"])
+        assert sorted(row["col1"] for row in self.table.get_rows()) == [0, 1, 2, 3, 4]
+        assert self.table["col2"].get("row3")[0]["col1"] == 3
+        # the prepared statement itself still holds the parameters
+        assert stmt.statement.values[0][0].route == 2
+
+    def test_insert_named(self):
+        stmt = prepare("INSERT INTO test_schema.test_table1 (col2, col1) VALUES (:text, :num)")
+        stmt.execute(self.db, {"num": 7, "text": "seven"})
+        assert self.table.get_rows() == [(7, "seven")]
+
+    def test_update_and_select(self):
+        insert = prepare("INSERT INTO test_schema.test_table1 VALUES (?, ?)")
+        insert.execute(self.db, (1, "a"))
+        insert.execute(self.db, (2, "b"))
+        update = prepare("UPDATE test_schema.test_table1 SET col2 = :text WHERE col1 = :id")
+        update.execute(self.db, {"id": 2, "text": "changed"})
+        select = prepare("SELECT col1, col2 FROM test_schema.test_table1")
+        rows = sorted(select.execute(self.db), key=lambda row: row["col1"])
+        assert rows == [{"col1": 1, "col2": "a"}, {"col1": 2, "col2": "changed"}]
+
+    def test_bind_shares_unparameterized_parts(self):
+        stmt = prepare("UPDATE test_schema.test_table1 SET col2 = 'x' WHERE col1 = ?")
+        bound = stmt.bind([3])
+        assert bound.where_expr.second_expr == Expression(route=1, lead_expr=Literal(int, 3))
+        assert bound.set_assignments[0] is stmt.statement.set_assignments[0]
+        assert bound.table is stmt.statement.table
+
+    def test_wrong_parameter_values(self):
+        stmt = prepare("INSERT INTO test_schema.test_table1 VALUES (?, :name)")
+        with pytest.raises(ExecutingException):
+            stmt.execute(self.db, [1])
+        with pytest.raises(ExecutingException):
+            stmt.execute(self.db, {"name": "x"})
+
+    def test_trailing_tokens(self):
+        for sql in (
+            "INSERT INTO test_schema.test_table1 VALUES (1, 'a') garbage",
+            "SELECT col1 FROM test_schema.test_table1 WHERE col1 IN (1, 2)",
+        ):
+            with pytest.raises(ParsingException):
+                prepare(sql)
+        assert prepare("SELECT col1 FROM test_schema.test_table1;").statement.columns == ["col1"]
+
+    def test_prepare_through_cache(self):
+        cache = StatementCache()
+        sql = "INSERT INTO test_schema.test_table1 VALUES (?, ?)"
+        first = prepare(sql, cache)
+        second = prepare(sql, cache)
+        assert first.statement == second.statement
+        first.execute(self.db, [1, "a"])
+        second.execute(self.db, [2, "b"])
+        assert len(self.table.get_rows()) == 2
+        assert cache.info().hits == 1
+
+    def test_explain_query_plan(self):
+        self.table.add_rows({"col1": list(range(100)), "col2": [str(i) for i in range(100)]})
+        explain = prepare("EXPLAIN QUERY PLAN SELECT col2 FROM test_schema.test_table1 WHERE col1 = ?")
+        assert [row["detail"] for row in explain.execute(self.db, [3])] == [
+            "SEARCH test_table1 USING INDEX col1 (col1=?)"
+        ]
+        explain = prepare("EXPLAIN QUERY PLAN UPDATE test_schema.test_table1 SET col2 = 'x' WHERE col2 LIKE '%1'")
+        rows = explain.execute(self.db)
+        assert [(row["parent"], row["detail"]) for row in rows] == [
+            (0, "UPDATE test_table1"),
+            (1, "FILTER"),
+            (2, "SCAN test_table1"),
+        ]
+        assert rows[2]["rows"] == 100
+        # nothing is run
+        assert self.table["col2"].get("x") == []
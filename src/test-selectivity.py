@@ -0,0 +1,146 @@
+from batchevaluator import evaluate_batch
+from data import Column, ColumnStatistics, Entry
+from expressioncompiler import compile_expression
+from expressionparser import ExpressionParser
+from selectivity import estimate_cost, estimate_selectivity, reorder_predicates
+from sqltokenizer import Tokenizer
+from statements import BinaryOperator, logical_and, logical_or
+
+STATISTICS = {
+    # 1000 rows, 100 of them NULL, values 0 to 899 all distinct
+    "id": ColumnStatistics(1000, 900, 100, 0, 899),
+    # 1000 rows holding only 0 or 1
+    "flag": ColumnStatistics(1000, 2, 0, 0, 1),
+    "name": ColumnStatistics(1000, 1000, 0, "a", "z"),
+}
+
+
+class TestSelectivity:
+    def setup_method(self):
+        self.tokenizer = Tokenizer()
+        self.parse = lambda sql: ExpressionParser(self.tokenizer.tokenize(sql)).parse()
+        self.estimate = lambda sql: estimate_selectivity(self.parse(sql), STATISTICS)
+        self.order = lambda sql: self.flatten(reorder_predicates(self.parse(sql), STATISTICS))
+
+    def flatten(self, expr):
+        if expr.route == 6 and expr.binary_op in (BinaryOperator.AND, BinaryOperator.OR):
+            return self.flatten(expr.lead_expr) + self.flatten(expr.second_expr)
+        return [expr]
+
+    def test_column_statistics(self):
+        column = Column(int)
+        assert column.statistics() == ColumnStatistics(0, 0, 0, None, None)
+        w, x, y, z = (Entry((name,), rowid) for rowid, name in enumerate("wxyz"))
+        column.extend([3, 1, 3, None], [w, x, y, z])
+        assert column.statistics() == ColumnStatistics(4, 2, 1, 1, 3)
+        # counts are kept up to date, and keys left empty leave the tree
+        assert column.remove(1, x) and column.remove(None, z)
+        assert not column.remove(3, x)
+        assert column.statistics() == ColumnStatistics(2, 1, 0, 3, 3)
+        del column[3]
+        assert column.statistics() == ColumnStatistics(0, 0, 0, None, None)
+
+    def test_estimates(self):
+        assert self.estimate("id = 5") == 0.9 / 900
+        assert self.estimate("5 = id") == 0.9 / 900
+        assert self.estimate("flag = 1") == 0.5
+        assert self.estimate("id ISNULL") == 0.1
+        assert self.estimate("id IS NOT NULL") == 0.9
+        assert abs(self.estimate("id < 449.5") - 0.45) < 1e-9
+        assert abs(self.estimate("449.5 < id") - 0.45) < 1e-9
+        assert abs(self.estimate("id BETWEEN 0 AND 89.9") - 0.09) < 1e-9
+        assert self.estimate("name < 'm'") == 1 / 3
+        assert self.estimate("name LIKE 'a%'") == 0.1
+        assert self.estimate("NOT name LIKE 'a%'") == 0.9
+        assert self.estimate("flag = 1 AND flag = 0") == 0.25
+        assert self.estimate("unknown = 1") == 0.5
+
+    def test_cost(self):
+        assert estimate_cost(self.parse("id")) == 0
+        assert estimate_cost(self.parse("id + 1 > 2")) == 2
+        assert estimate_cost(self.parse("name LIKE 'a%'")) == 10
+
+    def test_reorder_and(self):
+        # the most selective (and cheap) conjunct is tested first
+        ordered = self.order("flag = 1 AND name LIKE 'a%' AND id = 5")
+        assert ordered == [self.parse("id = 5"), self.parse("flag = 1"), self.parse("name LIKE 'a%'")]
+
+    def test_reorder_or(self):
+        ordered = self.order("id = 5 OR id IS NOT NULL")
+        assert ordered == [self.parse("id IS NOT NULL"), self.parse("id = 5")]
+
+    def test_division_stays_in_place(self):
+        ordered = self.order("flag <> 0 AND id / flag > 1 AND id = 5")
+        assert ordered == [self.parse("flag <> 0"), self.parse("id / flag > 1"), self.parse("id = 5")]
+
+    def test_null_guard_stays_first(self):
+        # BETWEEN would raise comparing NULL, so it is not moved before the
+        # IS NOT NULL guarding it
+        expr = self.parse("id IS NOT NULL AND id BETWEEN 1 AND 5 AND flag = 1")
+        ordered = reorder_predicates(expr, STATISTICS)
+        assert self.flatten(ordered) == [
+            self.parse("id IS NOT NULL"),
+            self.parse("id BETWEEN 1 AND 5"),
+            self.parse("flag = 1"),
+        ]
+        assert ordered.evaluate({"id": None, "flag": 1}) is False
+        # range comparisons between mismatched types raise as well
+        ordered = self.order("flag = 1 AND name > 1 AND id = 5")
+        assert ordered == [self.parse("flag = 1"), self.parse("name > 1"), self.parse("id = 5")]
+
+    def test_input_unchanged(self):
+        expr = self.parse("flag = 1 AND id = 5")
+        reorder_predicates(expr, STATISTICS)
+        assert expr == self.parse("flag = 1 AND id = 5")
+
+
+class TestShortCircuit:
+    def setup_method(self):
+        self.tokenizer = Tokenizer()
+        self.parse = lambda sql: ExpressionParser(self.tokenizer.tokenize(sql)).parse()
+
+    def test_three_valued_logic(self):
+        values = [True, False, None]
+        for a in values:
+            for b in values:
+                and_expected = False if False in (a, b) else (None if None in (a, b) else True)
+                or_expected = True if True in (a, b) else (None if None in (a, b) else False)
+                assert logical_and(a, b) is and_expected
+                assert logical_or(a, b) is or_expected
+
+    def test_second_operand_skipped(self):
+        rows = [{"a": 0, "b": 0}, {"a": 1, "b": 0}]
+        guarded = self.parse("a = 0 OR 1 / b > 0")
+        assert guarded.evaluate(rows[0]) is True
+        assert compile_expression(guarded)(rows[0]) is True
+        assert self.parse("a <> 0 AND 1 / b > 0").evaluate(rows[0]) is False
+        # the rows needing it still evaluate the second operand
+        try:
+            guarded.evaluate(rows[1])
+            assert False, "expected division by zero"
+        except ZeroDivisionError:
+            pass
+
+    def test_batch_second_operand_subset(self):
+        columns = {"a": [0, 1, None, 2, None], "b": [0, 1, 4, 2, 1]}
+        values, nulls = evaluate_batch(self.parse("a <> 0 AND 4 / b > 1"), columns, 5)
+        assert values == [False, True, False, True, None]
+        assert nulls == [False, False, False, False, True]
+
+    def test_non_boolean_operands(self):
+        # as BinaryOperator.execute_op: a NULL second operand turns a
+        # deciding 0 or 5 into a boolean, any other keeps it as it is
+        cases = {
+            "a AND b": [(0, None, False), (0, 1, 0), (5, 0, 0), (None, 0, False), (5, None, None)],
+            "a OR b": [(5, None, True), (5, 0, 5), (0, 7, 7), (None, 7, True), (0, None, None)],
+        }
+        for sql, rows in cases.items():
+            expr = self.parse(sql)
+            compiled = compile_expression(expr)
+            columns = {"a": [a for a, _, _ in rows], "b": [b for _, b, _ in rows]}
+            values, _ = evaluate_batch(expr, columns, len(rows))
+            for (a, b, expected), batch_value in zip(rows, values):
+                row = {"a": a, "b": b}
+                assert expr.evaluate(row) is expected
+                assert compiled(row) is expected
+                assert batch_value is expected
@@ -3,6 +3,7 @@ import pytest
 from baseparser import ParsingException
 from selectparser import SelectStatementParser
 from sqltokenizer import Tokenizer
+from statements import BinaryOperator
 
 
 class TestSelectParser:
@@ -50,3 +51,69 @@ class TestSelectParser:
         parser = SelectStatementParser(tokens)
         with pytest.raises(ParsingException):
             parser.parse()
+
+    def test_parse_select_statement_with_where(self):
+        tokens = self.tokenizer.tokenize("SELECT id FROM users AS u WHERE id > 2 AND name = 'x'")
+        statement = SelectStatementParser(tokens).parse()
+        assert statement.alias == "u"
+        assert statement.where_expr is not None
+        assert statement.where_expr.binary_op == BinaryOperator.AND
+        assert SelectStatementParser(self.tokenizer.tokenize("SELECT id FROM users")).parse().where_expr is None
+
+    def test_parse_select_statement_with_order_by_and_limit(self):
+        tokens = self.tokenizer.tokenize("SELECT id FROM users WHERE id > 2 ORDER BY name DESC, id + 1 LIMIT 10 OFFSET 5")
+        statement = SelectStatementParser(tokens).parse()
+        assert statement.where_expr.binary_op == BinaryOperator.GREATER
+        assert [term.descending for term in statement.order_by] == [True, False]
+        assert statement.order_by[0].expr.lead_expr.column_name == "name"
+        assert statement.order_by[1].expr.binary_op == BinaryOperator.PLUS
+        assert statement.limit_expr.lead_expr.value == 10
+        assert statement.offset_expr.lead_expr.value == 5
+        # LIMIT offset, count
+        statement = SelectStatementParser(self.tokenizer.tokenize("SELECT id FROM users LIMIT 5, 10")).parse()
+        assert (statement.limit_expr.lead_expr.value, statement.offset_expr.lead_expr.value) == (10, 5)
+        assert statement.order_by is None
+
+    def test_parse_select_statement_with_group_by(self):
+        tokens = self.tokenizer.tokenize(
+            "SELECT g, COUNT(*) AS n, max(id) + 1, SUM(DISTINCT id) total FROM t GROUP BY g, id % 2 HAVING n > 1"
+        )
+        statement = SelectStatementParser(tokens).parse()
+        assert statement.columns == ["g", "n", "max(id) + 1", "total"]
+        assert statement.column_exprs[1].route == 7 and statement.column_exprs[1].expr_array is None
+        assert statement.column_exprs[2].lead_expr.unary_op == "MAX"
+        assert statement.column_exprs[3].binary_op == "DISTINCT"
+        assert [expr.route for expr in statement.group_by] == [3, 6]
+        assert statement.having_expr.binary_op == BinaryOperator.GREATER
+        # plain columns need no expressions
+        statement = SelectStatementParser(self.tokenizer.tokenize("SELECT id, name FROM t")).parse()
+        assert statement.column_exprs is None and statement.group_by is None
+        with pytest.raises(ParsingException):
+            SelectStatementParser(self.tokenizer.tokenize("SELECT id FROM t GROUP BY")).parse()
+
+    def test_parse_select_statement_with_joins(self):
+        tokens = self.tokenizer.tokenize(
+            "SELECT t.id, u.v FROM s.t AS t, u JOIN w x ON x.id = t.id INNER JOIN y ON y.a = 1 CROSS JOIN z WHERE 1"
+        )
+        statement = SelectStatementParser(tokens).parse()
+        assert (statement.schema_name, statement.table_name, statement.alias) == ("s", "t", "t")
+        assert [(join.table.table_name, join.table.alias) for join in statement.joins] == [
+            ("u", None),
+            ("w", "x"),
+            ("y", None),
+            ("z", None),
+        ]
+        assert [join.on_expr is None for join in statement.joins] == [True, False, False, True]
+        assert statement.joins[1].on_expr.binary_op == BinaryOperator.EQLS
+        assert statement.where_expr is not None
+        for sql in ("SELECT * FROM t LEFT JOIN u ON a = b", "SELECT * FROM t JOIN u USING (a)", "SELECT * FROM t,"):
+            with pytest.raises(ParsingException):
+                SelectStatementParser(self.tokenizer.tokenize(sql)).parse()
+
+    def test_trailing_tokens(self):
+        # a single identifier after the table is its alias, a second one is trailing
+        for sql in ("SELECT a FROM t WHERE a IN (1,2)", "SELECT a FROM t garbage more", "SELECT a FROM t LIMIT 1 2"):
+            with pytest.raises(ParsingException):
+                SelectStatementParser(self.tokenizer.tokenize(sql)).parse()
+        assert SelectStatementParser(self.tokenizer.tokenize("SELECT a FROM t garbage")).parse().alias == "garbage"
+        assert SelectStatementParser(self.tokenizer.tokenize("SELECT a FROM t LIMIT 1;")).parse().limit_expr is not None
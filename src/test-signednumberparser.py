@@ -14,7 +14,7 @@ class TestSignedNumberParser:
         result = parser.parse()
         assert isinstance(result, int)
         assert result == 8456
-        assert len(tokens) == 1
+        assert len(parser.tokens) == 1
 
     def test_parse_positive_integer_with_sign(self):
         tokens = self.tokenizer.tokenize('+8153')
@@ -22,7 +22,7 @@ class TestSignedNumberParser:
         result = parser.parse()
         assert isinstance(result, int)
         assert result == 8153
-        assert len(tokens) == 1
+        assert len(parser.tokens) == 1
 
     def test_parse_negative_integer(self):
         tokens = self.tokenizer.tokenize('-8346')
@@ -30,7 +30,7 @@ class TestSignedNumberParser:
         result = parser.parse()
         assert isinstance(result, int)
         assert result == -8346
-        assert len(tokens) == 1
+        assert len(parser.tokens) == 1
 
     def test_parse_positive_float(self):
         tokens = self.tokenizer.tokenize('8.816')
@@ -38,7 +38,7 @@ class TestSignedNumberParser:
         result = parser.parse()
         assert isinstance(result, float)
         assert result == 8.816
-        assert len(tokens) == 1
+        assert len(parser.tokens) == 1
 
     def test_parse_positive_float_with_sign(self):
         tokens = self.tokenizer.tokenize('+815.3')
@@ -46,7 +46,7 @@ class TestSignedNumberParser:
         result = parser.parse()
         assert isinstance(result, float)
         assert result == 815.3
-        assert len(tokens) == 1
+        assert len(parser.tokens) == 1
 
     def test_parse_negative_float(self):
         tokens = self.tokenizer.tokenize('-885.6')
@@ -54,7 +54,7 @@ class TestSignedNumberParser:
         result = parser.parse()
         assert isinstance(result, float)
         assert result == -885.6
-        assert len(tokens) == 1
+        assert len(parser.tokens) == 1
 
     def test_parse_zero(self):
         tokens = self.tokenizer.tokenize('0')
@@ -62,7 +62,7 @@ class TestSignedNumberParser:
         result = parser.parse()
         assert isinstance(result, int)
         assert result == 0
-        assert len(tokens) == 1
+        assert len(parser.tokens) == 1
 
     def test_parse_float_zero(self):
         tokens = self.tokenizer.tokenize('0.0')
@@ -70,7 +70,7 @@ class TestSignedNumberParser:
         result = parser.parse()
         assert isinstance(result, float)
         assert result == 0.0
-        assert len(tokens) == 1
+        assert len(parser.tokens) == 1
 
     def test_parse_blank(self):
         tokens = self.tokenizer.tokenize('')
@@ -85,7 +85,7 @@ class TestSignedNumberParser:
         result = parser.parse()
         assert isinstance(result, int)
         assert result == 813
-        assert len(tokens) == 2
+        assert len(parser.tokens) == 2
 
     def test_parse_leading_dot(self):
         tokens = self.tokenizer.tokenize('.8453')
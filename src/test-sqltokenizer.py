@@ -0,0 +1,138 @@
+import io
+
+from sqltoken import Token, TokenType
+from sqltokenizer import Tokenizer, iter_statements, iter_tokens
+
+
+class TestTokenizer:
+    def setup_method(self):
+        self.tokenizer = Tokenizer()
+
+    def test_simple_select(self):
+        tokens = self.tokenizer.tokenize("SELECT a, b.c FROM t WHERE a >= 10.5")
+        assert tokens == [
+            Token(TokenType.KEYWORD, "SELECT"),
+            Token(TokenType.IDENTIFIER, "a"),
+            Token(TokenType.COMMA, ","),
+            Token(TokenType.IDENTIFIER, "b"),
+            Token(TokenType.DOT, "."),
+            Token(TokenType.IDENTIFIER, "c"),
+            Token(TokenType.KEYWORD, "FROM"),
+            Token(TokenType.IDENTIFIER, "t"),
+            Token(TokenType.KEYWORD, "WHERE"),
+            Token(TokenType.IDENTIFIER, "a"),
+            Token(TokenType.COMPARISON, ">="),
+            Token(TokenType.NUMBER_LITERAL, "10.5"),
+            Token(TokenType.EOF, ""),
+        ]
+
+    def test_comments_and_whitespace_dropped(self):
+        tokens = self.tokenizer.tokenize("  1 /* block\n comment */ - 2 \n\t ")
+        assert tokens == [
+            Token(TokenType.NUMBER_LITERAL, "1"),
+            Token(TokenType.OPERATOR, "-"),
+            Token(TokenType.NUMBER_LITERAL, "2"),
+            Token(TokenType.EOF, ""),
+        ]
+
+    def test_quoted_literals_and_identifiers(self):
+        tokens = self.tokenizer.tokenize("'a b' \"c\" `d e` [f g] x'0aff'")
+        assert [(t.type, t.value) for t in tokens] == [
+            (TokenType.STRING_LITERAL, "'a b'"),
+            (TokenType.STRING_LITERAL, '"c"'),
+            (TokenType.IDENTIFIER, "`d e`"),
+            (TokenType.IDENTIFIER, "[f g]"),
+            (TokenType.IDENTIFIER, "x"),
+            (TokenType.STRING_LITERAL, "'0aff'"),
+            (TokenType.EOF, ""),
+        ]
+
+    def test_operators(self):
+        tokens = self.tokenizer.tokenize("a||b<>c!=d==e%f&~g|h")
+        assert [t.value for t in tokens if t.type != TokenType.IDENTIFIER] == [
+            "||", "<>", "!=", "==", "%", "&", "~", "|", "",
+        ]
+
+    def test_unknown_characters(self):
+        """Characters no pattern accepts become single UNKNOWN tokens,
+        including word characters stuck behind a number."""
+        tokens = self.tokenizer.tokenize("$ 1ab '")
+        assert [(t.type, t.value) for t in tokens] == [
+            (TokenType.UNKNOWN, "$"),
+            (TokenType.UNKNOWN, "1"),
+            (TokenType.UNKNOWN, "a"),
+            (TokenType.UNKNOWN, "b"),
+            (TokenType.UNKNOWN, "'"),
+            (TokenType.EOF, ""),
+        ]
+
+    def test_parameters(self):
+        tokens = self.tokenizer.tokenize("a = ? AND b = ?12 AND c = :name_1 AND d = :")
+        assert [t.value for t in tokens if t.type == TokenType.PARAMETER] == ["?", "?12", ":name_1"]
+        assert tokens[-2] == Token(TokenType.UNKNOWN, ":")
+
+    def test_keywords_are_case_insensitive(self):
+        tokens = self.tokenizer.tokenize("select Null tRuE")
+        assert all(t.type == TokenType.KEYWORD for t in tokens[:-1])
+        assert [t.value for t in tokens[:-1]] == ["select", "Null", "tRuE"]
+
+
+class TestIterTokens:
+    def setup_method(self):
+        self.tokenizer = Tokenizer()
+        self.script = (
+            "CREATE TABLE t (a INTEGER, b TEXT);\n"
+            "INSERT INTO t VALUES (12.5, 'a long; string literal');\n"
+            "/* a block comment\n spanning lines; */ UPDATE t SET a = a <> 1;\n"
+            "SELECT a FROM t -- trailing comment"
+        )
+
+    def test_string_source(self):
+        assert list(iter_tokens(self.script)) == self.tokenizer.tokenize(self.script)
+
+    def test_tokens_spanning_chunks(self):
+        """Every chunk size must give the same tokens as tokenizing at once,
+        including strings, comments and numbers cut by a chunk boundary."""
+        expected = self.tokenizer.tokenize(self.script)
+        for chunk_size in range(1, 20):
+            tokens = list(iter_tokens(io.StringIO(self.script), chunk_size))
+            assert tokens == expected, chunk_size
+
+    def test_unterminated_tokens_at_end_of_file(self):
+        for sql in ["SELECT 'abc", "1 /* open", "[ident", "x 1."]:
+            tokens = list(iter_tokens(io.StringIO(sql), chunk_size=2))
+            assert tokens == self.tokenizer.tokenize(sql)
+
+    def test_long_tokens_spanning_many_chunks(self):
+        sql = "INSERT INTO t VALUES ('" + "a\\'b\\\\" * 5000 + "', [" + "c" * 3000 + "]) /* " + "*" * 3000 + " */"
+        sql += " -- " + "d" * 3000 + "\nSELECT 1"
+        tokens = list(iter_tokens(io.StringIO(sql), chunk_size=64))
+        assert tokens == self.tokenizer.tokenize(sql)
+        assert len(tokens[5].value) == 30002
+
+    def test_unclosed_quote_limit(self):
+        # past max_token_length the quote is taken to be unterminated, as
+        # it is at the end of the input
+        sql = "SELECT 'abc" + " x" * 500
+        tokens = list(iter_tokens(io.StringIO(sql), chunk_size=16, max_token_length=100))
+        assert tokens == self.tokenizer.tokenize(sql)
+        assert tokens[1] == Token(TokenType.UNKNOWN, "'")
+
+    def test_empty_source(self):
+        assert list(iter_tokens(io.StringIO(""))) == [Token(TokenType.EOF, "")]
+
+
+class TestIterStatements:
+    def test_split_on_semicolons(self):
+        script = "SELECT 'a;b' FROM t;; /* ; */ INSERT INTO t VALUES (1);"
+        statements = list(iter_statements(io.StringIO(script), chunk_size=3))
+        assert [[t.value for t in stmt] for stmt in statements] == [
+            ["SELECT", "'a;b'", "FROM", "t", ""],
+            ["INSERT", "INTO", "t", "VALUES", "(", "1", ")", ""],
+        ]
+        assert all(stmt[-1].type == TokenType.EOF for stmt in statements)
+
+    def test_last_statement_without_semicolon(self):
+        statements = list(iter_statements("SELECT a FROM t; SELECT b FROM u"))
+        assert len(statements) == 2
+        assert statements[1] == Tokenizer().tokenize("SELECT b FROM u")
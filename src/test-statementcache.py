@@ -0,0 +1,81 @@
+import pytest
+
+from baseparser import ParsingException
+from data import Column as OutColumn
+from data import Database, Schema, Table
+from insertexecutor import InsertTableExecutor
+from statementcache import StatementCache
+from statements import InsertStatement, SelectStatement
+from updateexecutor import UpdateExecutor
+
+
+class TestStatementCache:
+    def setup_method(self):
+        self.db = Database()
+        self.db["test_schema"] = Schema()
+        self.db["test_schema"]["test_table1"] = Table.from_dict(
+            {
+                "col1": OutColumn(type=int, default=None),
+                "col2": OutColumn(type=int, default=10),
+            }
+        )
+        self.cache = StatementCache(capacity=2)
+
+    def test_hit_returns_same_statement(self):
+        first = self.cache.parse("SELECT col1 FROM test_schema.test_table1")
+        second = self.cache.parse("SELECT col1 FROM test_schema.test_table1")
+        assert isinstance(first, SelectStatement)
+        assert first == second
+        assert self.cache.info() == (1, 1, 0, 2, 1)
+
+    def test_callers_cannot_change_cached_statement(self):
+        sql = "SELECT col1 FROM test_schema.test_table1 WHERE col1 = 1"
+        first = self.cache.parse(sql)
+        first.columns.append("z")
+        first.where_expr.second_expr.lead_expr.value = 2
+        second = self.cache.parse(sql)
+        assert second != first
+        assert second.columns is not first.columns
+        assert second.where_expr.second_expr.lead_expr.value == 1
+        assert second == self.cache.parse(sql)
+
+    def test_least_recently_used_is_evicted(self):
+        self.cache.parse("SELECT col1 FROM t1")
+        self.cache.parse("SELECT col1 FROM t2")
+        self.cache.parse("SELECT col1 FROM t1")
+        self.cache.parse("SELECT col1 FROM t3")
+        assert "SELECT col1 FROM t1" in self.cache
+        assert "SELECT col1 FROM t2" not in self.cache
+        assert self.cache.evictions == 1
+        assert len(self.cache) == 2
+
+    def test_parse_failure_not_cached(self):
+        with pytest.raises(ParsingException):
+            self.cache.parse("NOT A STATEMENT")
+        assert len(self.cache) == 0
+        assert self.cache.misses == 1
+
+    def test_invalid_capacity(self):
+        with pytest.raises(ValueError):
+            StatementCache(capacity=0)
+
+    def test_cached_insert_reused(self):
+        """Executing a cached statement must not alter it, e.g. by
+        negating its literal in place."""
+        sql = "INSERT INTO test_schema.test_table1 VALUES (-5, +3)"
+        for _ in range(3):
+            statement = self.cache.parse(sql)
+            assert isinstance(statement, InsertStatement)
+            InsertTableExecutor().execute(self.db, statement)
+        table = self.db["test_schema"]["test_table1"]
+        assert len(table["col1"].get(-5)) == 3
+        assert len(table["col2"].get(3)) == 3
+
+    def test_cached_update_reused(self):
+        table = self.db["test_schema"]["test_table1"]
+        table.add_row({})
+        sql = "UPDATE test_schema.test_table1 SET col2 = col2 + -1 WHERE NOT FALSE"
+        for _ in range(3):
+            UpdateExecutor().execute(self.db, self.cache.parse(sql))
+        assert [row["col2"] for row in table.get_rows()] == [7]
+        assert self.cache.info().hits == 2
@@ -0,0 +1,72 @@
+from expressioncompiler import compile_expression
+from expressionparser import ExpressionParser
+from sqltokenizer import Tokenizer
+from subexpressions import SharedSubexpressions, expression_key
+
+
+class CountingRow(dict):
+    """A row counting how many times its columns are read."""
+
+    reads = 0
+
+    def __getitem__(self, key):
+        self.reads += 1
+        return super().__getitem__(key)
+
+
+class TestSubexpressions:
+    def setup_method(self):
+        self.tokenizer = Tokenizer()
+        self.parse = lambda sql: ExpressionParser(self.tokenizer.tokenize(sql)).parse()
+
+    def test_expression_key(self):
+        assert expression_key(self.parse("a * (b + 1)")) == expression_key(self.parse("a*(b+1)"))
+        assert expression_key(self.parse("a + 1")) != expression_key(self.parse("a + 1.0"))
+        assert expression_key(self.parse("a + 1")) != expression_key(self.parse("a + TRUE"))
+        assert expression_key(self.parse("a + b")) != expression_key(self.parse("b + a"))
+
+    def test_outermost_repeats_only(self):
+        exprs = [self.parse("(a + b) * c > 1"), self.parse("(a + b) * c"), self.parse("a - 1")]
+        shared = SharedSubexpressions(exprs)
+        assert len(shared) == 1
+        assert shared.slot(exprs[1]) is not None
+        # a + b only repeats inside (a + b) * c
+        assert shared.slot(exprs[1].lead_expr) is None
+        assert shared.uses_slots(exprs[0])
+        assert not shared.uses_slots(exprs[2])
+
+    def test_inner_repeat_elsewhere(self):
+        exprs = [self.parse("(a + b) * c"), self.parse("(a + b) * c"), self.parse("a + b")]
+        shared = SharedSubexpressions(exprs)
+        assert len(shared) == 2
+
+    def test_new_row_expressions(self):
+        set_exprs = [self.parse("a * b"), self.parse("c * 2")]
+        returning = [self.parse("a * b"), self.parse("c * 2"), self.parse("c * 2 + 1")]
+        # SET changes c, so RETURNING's c * 2 is not SET's
+        shared = SharedSubexpressions(set_exprs, returning, changed_columns=["c"])
+        assert shared.slot(returning[0]) == shared.slot(set_exprs[0]) is not None
+        assert shared.slot(set_exprs[1]) is None
+        assert shared.slot(returning[1]) is not None
+        assert shared.slot(returning[1]) == shared.slot(returning[2].lead_expr)
+
+    def test_computed_once_per_row(self):
+        exprs = [self.parse("a * b > 2"), self.parse("a * b + 1"), self.parse("a * b - 1")]
+        shared = SharedSubexpressions(exprs)
+        compiled = [compile_expression(expr, shared=shared) for expr in exprs]
+        for a, b in [(1, 2), (3, 4), (None, 1)]:
+            row = CountingRow(a=a, b=b)
+            shared.start_row()
+            assert [f(row) for f in compiled] == [expr.evaluate({"a": a, "b": b}) for expr in exprs]
+            assert row.reads == 2
+
+    def test_short_circuit_skips_slot(self):
+        exprs = [self.parse("a > 0 AND b * b > 1"), self.parse("b * b")]
+        shared = SharedSubexpressions(exprs)
+        where, value = (compile_expression(expr, shared=shared) for expr in exprs)
+        row = CountingRow(a=0, b=3)
+        shared.start_row()
+        assert where(row) is False
+        assert row.reads == 1
+        assert value(row) == 9
+        assert row.reads == 3
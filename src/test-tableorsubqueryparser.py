@@ -18,7 +18,7 @@ class TestTableOrSubqueryParser:
         assert result[0].table_name == "table_name"
         assert result[0].schema_name is None
         assert result[0].alias is None
-        assert len(tokens) == 1
+        assert len(parser.tokens) == 1
 
     def test_parse_table_name_with_schema_name(self):
         tokens = self.tokenizer.tokenize("schema_name.table_name")
@@ -28,7 +28,7 @@ class TestTableOrSubqueryParser:
         assert result[0].table_name == "table_name"
         assert result[0].schema_name == "schema_name"
         assert result[0].alias is None
-        assert len(tokens) == 1
+        assert len(parser.tokens) == 1
 
     def test_parse_table_name_with_missing_name(self):
         tokens = self.tokenizer.tokenize("schema_name.")
@@ -45,7 +45,7 @@ class TestTableOrSubqueryParser:
         assert result[0].table_name == "table_name"
         assert result[0].schema_name == "schema_name"
         assert result[0].alias == "alias"
-        assert len(tokens) == 1
+        assert len(parser.tokens) == 1
 
     def test_parse_table_name_with_implicit_alias(self):
         tokens = self.tokenizer.tokenize("schema_name.table_name alias")
@@ -55,7 +55,7 @@ class TestTableOrSubqueryParser:
         assert result[0].table_name == "table_name"
         assert result[0].schema_name == "schema_name"
         assert result[0].alias == "alias"
-        assert len(tokens) == 1
+        assert len(parser.tokens) == 1
 
     def test_comma_seperated_table_list(self):
         tokens = self.tokenizer.tokenize("table1, table2")
@@ -64,7 +64,7 @@ class TestTableOrSubqueryParser:
         assert isinstance(result, list)
         assert result[0] == Table("table1", None, None)
         assert result[1] == Table("table2", None, None)
-        assert len(tokens) == 1
+        assert len(parser.tokens) == 1
 
     def test_missing_comma(self):
         tokens = self.tokenizer.tokenize("table1 alias1 table2 alias2")
@@ -100,7 +100,7 @@ class TestTableOrSubqueryParser:
         result = parser.parse()
         assert isinstance(result, list)
         assert result[0][0] == Table("table1", None, None)
-        assert len(tokens) == 1
+        assert len(parser.tokens) == 1
 
     def test_parse_table_list_with_schema_in_parenthesis(self):
         tokens = self.tokenizer.tokenize("(schema_name.table1)")
@@ -108,7 +108,7 @@ class TestTableOrSubqueryParser:
         result = parser.parse()
         assert isinstance(result, list)
         assert result[0][0] == Table("table1", "schema_name", None)
-        assert len(tokens) == 1
+        assert len(parser.tokens) == 1
 
     def test_parse_table_list_with_schema_and_alias_in_parenthesis(self):
         tokens = self.tokenizer.tokenize("(schema_name.table1 AS table1_alias)")
@@ -116,7 +116,7 @@ class TestTableOrSubqueryParser:
         result = parser.parse()
         assert isinstance(result, list)
         assert result[0][0] == Table("table1", "schema_name", "table1_alias")
-        assert len(tokens) == 1
+        assert len(parser.tokens) == 1
 
     def test_parse_table_list_in_parenthesis(self):
         tokens = self.tokenizer.tokenize(
@@ -131,7 +131,7 @@ class TestTableOrSubqueryParser:
         assert items[1] == Table("table2", "schema2", None)
         assert items[2] == Table("table3", "schema3", "table3_alias")
         assert items[3] == Table("table4", "schema4", "table4_alias")
-        assert len(tokens) == 1
+        assert len(parser.tokens) == 1
 
     def test_parse_table_list_mixed_with_parenthesis(self):
         tokens = self.tokenizer.tokenize(
@@ -144,7 +144,7 @@ class TestTableOrSubqueryParser:
         assert result[1][0] == Table("table2", "schema2", None)
         assert result[1][1] == Table("table3", "schema3", "table3_alias")
         assert result[2] == Table("table4", "schema4", "table4_alias")
-        assert len(tokens) == 1
+        assert len(parser.tokens) == 1
 
     def test_alias_outside_parenthesis(self):
         tokens = self.tokenizer.tokenize("(table1) AS t1_alias")
@@ -160,7 +160,7 @@ class TestTableOrSubqueryParser:
         assert isinstance(result, list)
         assert result[0][0][0] == Table("table1", None, None)
         assert len(result[0]) == 1
-        assert len(tokens) == 1
+        assert len(parser.tokens) == 1
 
     def test_nested_parenthesis_extended(self):
         tokens = self.tokenizer.tokenize(
@@ -175,7 +175,7 @@ class TestTableOrSubqueryParser:
         assert items[0] == Table("table1", None, None)
         assert items[1][0] == Table("table2", "schema2", None)
         assert items[2][0][0] == Table("table3", "schema3", "table3_alias")
-        assert len(tokens) == 1
+        assert len(parser.tokens) == 1
 
     def test_parse_table_list_with_missing_table_name(self):
         tokens = self.tokenizer.tokenize("(table1,)")
@@ -130,3 +130,55 @@ class TestLiteralParser:
         final_rows.sort(key=lambda x: (x["col1"], x["col2"], x["col3"]))
         expected_rows.sort(key=lambda x: (x["col1"], x["col2"], x["col3"]))
         assert final_rows == expected_rows
+
+    def test_where_like(self):
+        """WHERE with a LIKE prefix, found by a range scan on the column."""
+        schema = self.db["test_schema"]
+        schema["names"] = Table.from_dict(
+            {"name": OutColumn(type=str), "n": OutColumn(type=int, default=0)}
+        )
+        tbl = schema["names"]
+        names = ["apple", "Apricot", "banana", "apex", None, "grape"]
+        tbl.add_rows({"name": names, "n": [0] * len(names)})
+        update = UpdateParser(
+            self.tokenizer.tokenize(
+                """UPDATE test_schema.names
+        SET n = 1
+        WHERE name LIKE 'ap%' AND name NOT LIKE '%x'"""
+            )
+        ).parse()
+        self.exec.execute(self.db, update)
+        updated = sorted(row["name"] for row in tbl.get_rows() if row["n"] == 1)
+        assert updated == ["Apricot", "apple"]
+
+    def test_returning_and_shared_subexpressions(self):
+        """SET, WHERE and RETURNING repeating the same arithmetic."""
+        schema = self.db["test_schema"]
+        schema["prices"] = Table.from_dict(
+            {
+                "price": OutColumn(type=int),
+                "rate": OutColumn(type=int),
+                "total": OutColumn(type=int, default=0),
+            }
+        )
+        tbl = schema["prices"]
+        tbl.add_rows({"price": [1, 5, 7, None], "rate": [2, 3, 1, 4], "total": [0, 0, 0, 0]})
+        update = UpdateParser(
+            self.tokenizer.tokenize(
+                """UPDATE test_schema.prices
+        SET total = price * rate, rate = rate + 1
+        WHERE price * rate > 5
+        RETURNING price * rate, total, price * rate - total"""
+            )
+        ).parse()
+        returned = self.exec.execute(self.db, update)
+        # RETURNING sees the updated rows: rate has changed, total has not
+        assert sorted(returned) == [(14, 7, 7), (20, 15, 5)]
+        totals = sorted((row["price"], row["total"]) for row in tbl.get_rows() if row["price"] is not None)
+        assert totals == [(1, 0), (5, 15), (7, 7)]
+
+    def test_no_returning(self):
+        tbl = self.db["test_schema"]["test_table1"]
+        tbl.add_row({})
+        update = UpdateParser(self.tokenizer.tokenize("UPDATE test_schema.test_table1 SET col1 = 1")).parse()
+        assert self.exec.execute(self.db, update) is None
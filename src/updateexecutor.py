@@ -1,8 +1,14 @@
 import math
-from typing import TypeAlias
+from typing import Optional, TypeAlias
 
+from batchevaluator import filter_entries
+from constantfolding import fold_constants
 from data import Database, Entry
+from expressioncompiler import CompiledExpression, compile_expression
+from planner import PlanNode, plan_table_access
+from selectivity import estimate_cost
 from statements import Expression, UpdateStatement
+from subexpressions import SharedSubexpressions
 
 
 def float_is_zero(f: float) -> bool:
@@ -14,23 +20,70 @@ SetAssignments: TypeAlias = list[dict[str, list[str] | Expression | bool]]
 
 
 class UpdateExecutor:
-    def execute(self, db: Database, input: UpdateStatement) -> None:
+    def execute(self, db: Database, input: UpdateStatement) -> Optional[list[tuple]]:
+        """Applies the update. With a RETURNING clause, returns a tuple of
+        the values of its expressions for each updated row, computed from
+        the row after the update; otherwise returns None."""
         table = db[input.table.schema_name][input.table.table_name]
-        assignments = self.simplify_set_assignments(input.set_assignments)
-        where: Expression = input.where_expr
-        rows = table.get_rows()
+        column_types = {name: table[name].type for name in table.ordered_columns}
+        set_exprs = {
+            field: fold_constants(expr)
+            for field, expr in self.simplify_set_assignments(input.set_assignments).items()
+        }
+        # the access path answers part of WHERE, the rest is checked per row
+        plan = plan_table_access(table, input.where_expr)
+        path, where = plan.path, plan.residual
+        returning_exprs = [fold_constants(expr) for expr in input.returning_exprs or []]
+
+        # Subexpressions repeated across WHERE, SET and RETURNING are
+        # computed once per row into slots all of them read
+        shared = SharedSubexpressions([where, *set_exprs.values()], returning_exprs, set_exprs)
+
+        def compile(expr: Expression) -> CompiledExpression:
+            return compile_expression(expr, table.ordered_columns, column_types, shared)
+
+        assignments = {field: compile(expr) for field, expr in set_exprs.items()}
+        returning = [compile(expr) for expr in returning_exprs]
+        rows = table.get_rows() if path is None else path.entries(table)
 
         # Step 1: filter rows based on where condition
-        target_rows = [row for row in rows if (where.evaluate(row) if where else True)]
+        matches = None
+        if where is not None and shared.uses_slots(where):
+            # row by row, so that SET reads what WHERE computed for the row
+            matches = compile(where)
+        elif where is not None:
+            rows = filter_entries(rows, where, table.ordered_columns, column_types=column_types)
 
         # Step 2: Create new record from old record + assignments
-        old_new_rows = [
-            self.evaluate_set_assignments(row, assignments) for row in target_rows
-        ]
+        old_new_rows = []
+        returned = []
+        for row in rows:
+            shared.start_row()
+            if matches is not None and not matches(row.row):
+                continue
+            old, new = self.evaluate_set_assignments(row, assignments)
+            old_new_rows.append((old, new))
+            if returning:
+                returned.append(tuple(expr(new.row) for expr in returning))
 
         # Step 3: Call update record on table
         for old, new in old_new_rows:
             table.update_entry(old, new)
+        return returned if input.returning_exprs is not None else None
+
+    def plan(self, db: Database, input: UpdateStatement) -> PlanNode:
+        """The plan execute would follow, for EXPLAIN QUERY PLAN: the rows
+        to update are found as a SELECT with the same WHERE would find
+        them, then every SET expression is evaluated for each."""
+        table = db[input.table.schema_name][input.table.table_name]
+        access = plan_table_access(table, input.where_expr)
+        set_exprs = self.simplify_set_assignments(input.set_assignments).values()
+        # each row is replaced in every Column's tree, and moved to another
+        # key of the Columns SET changes
+        row_cost = sum(estimate_cost(fold_constants(expr)) for expr in set_exprs)
+        row_cost += len(table.ordered_columns) + len(set_exprs)
+        cost = access.cost + access.rows * row_cost
+        return PlanNode(f"UPDATE {input.table.table_name}", access.rows, cost, [access.explain(input.table.table_name)])
 
     @staticmethod
     def simplify_set_assignments(assigns: SetAssignments) -> dict[str, Expression]:
@@ -50,7 +103,7 @@ class UpdateExecutor:
 
     @staticmethod
     def evaluate_set_assignments(
-        row: Entry, assigns: dict[str, Expression]
+        row: Entry, assigns: dict[str, CompiledExpression]
     ) -> tuple[Entry, Entry]:
-        new_assignments = {field: expr.evaluate(row) for field, expr in assigns.items()}
+        new_assignments = {field: expr(row.row) for field, expr in assigns.items()}
         return (row, row._replace(**new_assignments))